@@ -1,6 +1,6 @@
 import logging
-from typing import Dict, List
-from fastapi import APIRouter, HTTPException, Depends
+from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
 from fastapi.responses import JSONResponse, Response
 
 from app.models.models import (
@@ -8,6 +8,8 @@ from app.models.models import (
     LapTimeDeleteInput,
     DriverResponse,
     ExportResponse,
+    LapHistoryResponse,
+    LapStatsResponse,
     TrackNameInput,
     TrackNameResponse,
     TrackData,
@@ -17,15 +19,26 @@ from app.services.crud import (
     # get_all_drivers, # No longer used by this endpoint
     add_or_update_lap_time,
     delete_driver_lap_time,
+    get_ranked_drivers,
     get_track,
+    ranked_driver_copies,
     set_track,
     app_data,
     state_lock,
 )
-from app.utils.helpers import generate_csv_content, update_overall_fastest_lap
-from app.services.track_service import track_service
+from app.services.lap_history import lap_records_to_dicts
+from app.utils.helpers import (
+    generate_csv_content,
+    ms_to_laptime_str,
+    precompressed_response,
+)
+from app.services.track_service import TRACK_LOD_TOLERANCES_M, track_service
 from app.dependencies.auth import require_auth
-from app.api.telemetry import get_live_driver_data_for_api  # Import new helper
+from app.api.telemetry import (
+    SESSION_QUERY,
+    get_live_driver_data_for_api,
+    resolve_session,
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -41,12 +54,8 @@ async def get_drivers_endpoint():
     # drivers_response = await get_live_driver_data_for_api()
     # return drivers_response
 
-    # For now, return manually added times from admin panel
-    async with state_lock:
-        drivers_copy = {
-            name: driver.model_copy(deep=True)
-            for name, driver in app_data.drivers.items()
-        }
+    # For now, return manually added and captured times, fastest first
+    drivers_copy = await get_ranked_drivers()
 
     # Convert internal driver objects to API response format
     drivers_response = {
@@ -59,10 +68,11 @@ async def get_drivers_endpoint():
 @router.get(
     "/api/drivers/live", response_model=Dict[str, DriverResponse], tags=["Drivers"]
 )
-async def get_live_drivers_endpoint():
+async def get_live_drivers_endpoint(session: Optional[str] = SESSION_QUERY):
     """Gets live telemetry data from the game (positions, teams, etc.) for track visualization."""
-    # Fetch live driver data compiled from telemetry stores
-    drivers_response = await get_live_driver_data_for_api()
+    resolve_session(session)  # 404 for an unknown session
+    # Fetch live driver data compiled from the session's telemetry store
+    drivers_response = await get_live_driver_data_for_api(session)
     return drivers_response
 
 
@@ -105,10 +115,8 @@ async def delete_lap_time_endpoint(
     """
     deleted = await delete_driver_lap_time(delete_input)
     if deleted:
-        # Recalculate overall fastest after deletion (already done in crud, but good practice)
+        # crud has already updated the leaderboard and the overall fastest flag.
         # We don't need to return the full driver list here, just confirmation.
-        async with state_lock:
-            update_overall_fastest_lap(app_data.drivers)
         return {"message": "Lap time deleted successfully"}
     else:
         raise HTTPException(
@@ -116,6 +124,64 @@ async def delete_lap_time_endpoint(
         )
 
 
+@router.get(
+    "/api/drivers/{name}/laps", response_model=LapHistoryResponse, tags=["Lap Times"]
+)
+async def get_driver_laps_endpoint(
+    name: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    from_lap: Optional[int] = Query(None, ge=0, description="First in-game lap number"),
+    to_lap: Optional[int] = Query(None, ge=0, description="Last in-game lap number"),
+    valid_only: bool = Query(False, description="Leave out invalid and deleted laps"),
+):
+    """Gets a page of every lap a driver has set, oldest first (no auth required for display)."""
+    async with state_lock:
+        history = app_data.lap_history.get(name)
+        if history is None:
+            raise HTTPException(status_code=404, detail=f"No laps recorded for '{name}'")
+        indices = history.select(valid_only, from_lap, to_lap)
+        page = indices[offset : offset + limit]
+        laps = history.laps[page]  # Fancy indexing copies
+
+    return LapHistoryResponse(
+        name=name,
+        total=len(indices),
+        offset=offset,
+        limit=limit,
+        laps=lap_records_to_dicts(laps, page),
+    )
+
+
+@router.get(
+    "/api/drivers/{name}/laps/stats", response_model=LapStatsResponse, tags=["Lap Times"]
+)
+async def get_driver_lap_stats_endpoint(
+    name: str, last: int = Query(5, ge=1, le=100, description="Number of recent valid laps")
+):
+    """Gets a driver's best, mean and consistency over valid laps, plus the last N of them."""
+    async with state_lock:
+        history = app_data.lap_history.get(name)
+        if history is None:
+            raise HTTPException(status_code=404, detail=f"No laps recorded for '{name}'")
+        recent = history.last(last, valid_only=True)
+        recent_laps = history.laps[recent]
+        laps, valid_laps = history.count, history.valid_count
+        best_ms, mean_ms, stddev_ms = history.best_ms, history.mean_ms, history.stddev_ms
+
+    return LapStatsResponse(
+        name=name,
+        laps=laps,
+        valid_laps=valid_laps,
+        best_time=ms_to_laptime_str(best_ms) if best_ms is not None else None,
+        best_ms=best_ms,
+        mean_ms=mean_ms,
+        stddev_ms=stddev_ms,
+        last=lap_records_to_dicts(recent_laps, recent),
+        last_mean_ms=float(recent_laps["time_ms"].mean()) if len(recent_laps) else None,
+    )
+
+
 @router.get("/api/track", response_model=TrackNameResponse, tags=["Track"])
 async def get_track_name_endpoint():
     """Gets the currently set track name with case matching to available tracks (no auth required for display)."""
@@ -175,19 +241,44 @@ async def set_track_name_endpoint(
 
 
 @router.get("/api/track/data", response_model=TrackData, tags=["Track"])
-async def get_track_data_endpoint(track: str = None):
-    """Gets the track data for the specified track or currently set track (no auth required for display)."""
+async def get_track_data_endpoint(
+    track: str = None,
+    lod: Optional[int] = Query(
+        None,
+        ge=0,
+        le=len(TRACK_LOD_TOLERANCES_M) - 1,
+        description="Level of detail: 0 is every vertex, higher is coarser",
+    ),
+    max_points: Optional[int] = Query(
+        None, ge=2, description="Most detailed level with at most this many points"
+    ),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Gets the track data for the specified track or currently set track (no auth required for display).
+    Thumbnails and low-bandwidth screens can ask for a simplified line with lod or max_points.
+    """
+    if lod is not None and max_points is not None:
+        raise HTTPException(status_code=400, detail="Use either lod or max_points, not both")
     track_name = track if track else await get_track()
     if not track_name:
         raise HTTPException(status_code=404, detail="No track name set or specified")
 
-    track_data = await track_service.load_track_data(track_name)
-    if not track_data:
+    track = await track_service.load_track_geometry(track_name)
+    if not track:
         raise HTTPException(
             status_code=404, detail=f"Track data not found for '{track_name}'"
         )
 
-    return track_data
+    # Serialised and compressed once per track and level; the model is only for the docs
+    level, line = track.lod(lod, max_points)
+    return precompressed_response(
+        line.encoded_json(),
+        accept_encoding,
+        if_none_match,
+        extra_headers={"X-Track-LOD": str(level)},
+    )
 
 
 @router.get("/api/tracks", response_model=List[str], tags=["Track"])
@@ -202,11 +293,8 @@ async def export_lap_times_endpoint(current_user=Depends(require_auth)):
     # Acquire lock only to safely read the necessary data
     async with state_lock:
         current_track = app_data.track_name
-        # Pass a deep copy of drivers to the export function
-        drivers_copy = {
-            name: driver.model_copy(deep=True)
-            for name, driver in app_data.drivers.items()
-        }
+        # Pass a deep copy of drivers, already in leaderboard order, to the export function
+        drivers_copy = ranked_driver_copies()
 
     if not current_track:
         logger.warning("Export failed: Track name not set.")
@@ -224,7 +312,9 @@ async def export_lap_times_endpoint(current_user=Depends(require_auth)):
 
     try:
         # Generate CSV content
-        filename, csv_content = await generate_csv_content(drivers_copy, current_track)
+        filename, csv_content = await generate_csv_content(
+            drivers_copy, current_track, ranked=True
+        )
         logger.debug(f"Export successful. Filename: {filename}")
 
         # Return CSV as downloadable file
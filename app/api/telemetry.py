@@ -1,15 +1,57 @@
-import asyncio
 import os
 import socket
-import threading
 import time
 import logging
-import traceback
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
+import numpy as np
 from dotenv import load_dotenv
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Path, Query, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from app.models.models import DriverResponse, LapTime
+from app.utils.helpers import etag_matches, ms_to_laptime_str
+from app.services.live_store import (
+    LAP_DATA_KEYS,
+    MOTION_KEYS,
+    LiveTelemetryStore,
+    TelemetrySnapshot,
+)
+from app.services.car_telemetry_traces import (
+    CarTelemetryTraces,
+    TRACE_MAX_RATE_HZ,
+    trace_columns_to_json,
+)
+from app.services.crud import add_lap_times
+from app.services.lap_capture import LapCapture
+from app.services.lap_traces import LapTrace, LapTracePoller, compare_laps, get_grid_step_m
+from app.services.live_timing import UNKNOWN_GAP
+from app.services.telemetry_capture import CAPTURE_EXTENSION, CaptureReader
+from app.services.telemetry_metrics import (
+    PrometheusWriter,
+    packet_summaries,
+    udp_socket_queues,
+)
+from app.services.telemetry_sessions import TelemetrySession, TelemetrySessionRegistry
+from app.services.packet_filter import PacketFilter, parse_packet_rates
+from app.services.telemetry_decoder import (
+    HEADER_SIZE,
+    LIBRARY_FALLBACK_AVAILABLE,
+    MAX_CARS,
+    NATIVE_PACKET_IDS,
+    NUM_PACKET_IDS,
+    PACKET_NAMES,
+    PACKET_CAR_STATUS,
+    PACKET_CAR_TELEMETRY,
+    PACKET_LAP_DATA,
+    PACKET_MOTION,
+    PACKET_PARTICIPANTS,
+    PACKET_SESSION,
+    decode_with_library,
+    is_native_packet,
+    peek_packet_id,
+    unpack_session,
+    unpack_session_track,
+)
 
 # Load environment variables
 load_dotenv()
@@ -40,6 +82,7 @@ class LiveTelemetryResponse(BaseModel):
     drivers: List[LiveDriverData]
     sessionInfo: Optional[SessionInfo] = None
     activeDriversCount: int
+    version: int = 0  # Snapshot version the response was built from
 
 
 # Load environment variables from .env file
@@ -84,34 +127,65 @@ SESSION_TYPE_MAP = {
 }
 
 # --- Packet Filtering Configuration ---
-# Essential packets for performance optimization
+# Essential packets, decoded by default
 ESSENTIAL_PACKET_IDS = {
     0,  # MotionData - car positions
     1,  # SessionData - session info and track
     2,  # LapData - lap times and sector data
     4,  # ParticipantsData - driver names and teams
+    6,  # CarTelemetryData - speed/throttle/brake traces (copied raw into a ring)
     7,  # CarStatusData - car status information
 }
 
-# Optional packets that can be enabled for detailed telemetry
+# Optional packets that can be enabled for detailed telemetry (PUT /filter)
 OPTIONAL_PACKET_IDS = {
     3,  # EventData - session events
     5,  # CarSetupData - car setup information
-    6,  # CarTelemetryData - detailed car telemetry
-    8,  # CarDamageData - car damage information
-    9,  # SessionHistoryData - session history
-    10,  # TyreSetData - tyre set information
-    11,  # MotionExData - extended motion data
-    12,  # CarStatusDataEx - extended car status
-    13,  # FinalClassificationData - final classification
-    14,  # LobbyInfoData - lobby information
+    8,  # FinalClassificationData - final classification
+    9,  # LobbyInfoData - lobby information
+    10,  # CarDamageData - car damage information
+    11,  # SessionHistoryData - session history
+    12,  # TyreSetData - tyre set information
+    13,  # MotionExData - extended motion data
+    14,  # TimeTrialData - time trial data
 }
 
 # Performance filtering - set to True to only process essential packets
 ENABLE_PACKET_FILTERING = True
 
-# Session data enhancement - detailed session information storage
-enhanced_session_data_store: dict = {}
+
+def _default_enabled_packets() -> List[int]:
+    configured = os.getenv("TELEMETRY_ENABLED_PACKETS", "").strip()
+    if configured:
+        try:
+            packet_ids = [int(packet_id) for packet_id in configured.split(",") if packet_id.strip()]
+        except ValueError:
+            packet_ids = [-1]
+        if all(0 <= packet_id < NUM_PACKET_IDS for packet_id in packet_ids):
+            return packet_ids
+        logger.warning(
+            f"Invalid TELEMETRY_ENABLED_PACKETS (IDs are 0-{NUM_PACKET_IDS - 1}), "
+            "using the default packets"
+        )
+    if not ENABLE_PACKET_FILTERING:
+        return list(range(NUM_PACKET_IDS))
+    return sorted(ESSENTIAL_PACKET_IDS)
+
+
+def _default_packet_filter() -> PacketFilter:
+    enabled_ids = _default_enabled_packets()
+    try:
+        return PacketFilter(
+            enabled_ids, parse_packet_rates(os.getenv("TELEMETRY_PACKET_RATES", ""))
+        )
+    except ValueError as e:
+        logger.warning(f"Invalid TELEMETRY_PACKET_RATES ({e}), decoding at full rate")
+        return PacketFilter(enabled_ids)
+
+
+# Decides from the raw header byte which packets are decoded and how often;
+# reconfigured at runtime through PUT /api/telemetry/filter
+packet_filter = _default_packet_filter()
 
 
 def get_session_type_name(session_type_id: int) -> str:
@@ -120,312 +194,238 @@ def get_session_type_name(session_type_id: int) -> str:
 
 
 def should_process_packet(packet_id: int) -> bool:
-    """Determine if a packet should be processed based on filtering settings"""
-    if not ENABLE_PACKET_FILTERING:
-        return True
-    return packet_id in ESSENTIAL_PACKET_IDS
-
-
-# --- Utility Functions ---
-def ms_to_laptime_str(ms: Optional[int]) -> str:
-    if (
-        ms is None or ms <= 0
-    ):  # Handle cases where lap time might be 0, None, or invalid
-        # Depending on requirements, could return None, an empty string, or a placeholder
-        return (
-            "0:00.000"  # Or perhaps better to indicate no valid time, e.g., "--:--.---"
-        )
-
-    total_seconds = ms / 1000.0
-    minutes = int(total_seconds // 60)
-    seconds = int(total_seconds % 60)
-    milliseconds = int(round((total_seconds - (minutes * 60) - seconds) * 1000))
-    # Ensure milliseconds don't round up to 1000, which would break formatting
-    if milliseconds >= 1000:
-        milliseconds = 999
-    return f"{minutes}:{seconds:02d}.{milliseconds:03d}"
+    """Determine if a packet type is enabled by the packet filter (ignores decimation)"""
+    return packet_id < NUM_PACKET_IDS and packet_filter.enabled[packet_id]
 
 
 # --- New Helper Function for /api/drivers ---
-async def get_live_driver_data_for_api() -> Dict[str, DriverResponse]:
+async def get_live_driver_data_for_api(
+    session_id: Optional[str] = None,
+) -> Dict[str, DriverResponse]:
     """
-    Assembles live driver data from telemetry stores for the API.
+    Assembles live driver data from a session's telemetry store for the API.
     Returns a dictionary of DriverResponse objects, keyed by driver name.
     """
-    # Access global stores; ensure they are declared global if modified, but here we only read.
-    # It's assumed participant_data_store, lap_data_store, active_drivers_count are accessible in this scope.
-
     drivers_api_response: Dict[str, DriverResponse] = {}
 
-    # Ensure participant_data_store is a list and active_drivers_count is an int
-    logger.debug(
-        f"[get_live_driver_data_for_api] Called. active_drivers_count: {active_drivers_count}, participant_data_store items: {len(participant_data_store) if isinstance(participant_data_store, list) else 'Not a list'}"
-    )
-    if (
-        not isinstance(participant_data_store, list)
-        or not isinstance(active_drivers_count, int)
-        or active_drivers_count == 0
-    ):
-        logger.debug(
-            "[get_live_driver_data_for_api] Participant data store not ready, not a list, or no active drivers. Returning empty."
-        )
+    snapshot = current_snapshot(session_id)
+    count = snapshot.active_count()
+    logger.debug(f"[get_live_driver_data_for_api] Called. active drivers: {count}")
+    if count == 0:
         return drivers_api_response
 
-    # Iterate up to the number of active drivers, ensuring bounds are respected for stores
-    for i in range(min(active_drivers_count, len(participant_data_store))):
-        participant = participant_data_store[i]
-
-        # Check if lap_data_store is populated and index is valid
-        lap_data = None
-        if isinstance(lap_data_store, list) and i < len(lap_data_store):
-            lap_data = lap_data_store[i]
+    # One slice per column instead of one dict lookup per field per car
+    team_ids = snapshot.column("team_id", count).tolist()
+    telemetry_session = session_registry.get_session(session_id)
+    best_laps = (
+        lap_capture.best_laps(telemetry_session.session_id) if telemetry_session else None
+    )
+    if best_laps is not None:
+        # Best valid lap of each car this session; the session's fastest is flagged
+        lap_ms = best_laps[:count].tolist()
+        fastest_ms = min((ms for ms in lap_ms if ms > 0), default=0)
+    else:
+        lap_ms = snapshot.column("last_lap_time_ms", count).tolist()
+        fastest_ms = 0
+    if snapshot.motion_received:
+        world_xs = snapshot.column("world_x", count).tolist()
+        world_ys = snapshot.column("world_y", count).tolist()
+        world_zs = snapshot.column("world_z", count).tolist()
+    else:
+        world_xs = world_ys = world_zs = [None] * count
 
-        logger.debug(
-            f"[get_live_driver_data_for_api] Loop index {i}: Raw Participant Data from store: {participant}, Raw Lap Data from store: {lap_data}"
-        )
-        if (
-            not participant
-            or not isinstance(participant, dict)
-            or not participant.get("name")
-            or participant.get("name") == "N/A"
-        ):  # Removed startswith("Driver_") check
-            logger.debug(
-                f"[get_live_driver_data_for_api] Skipping index {i}: Participant data invalid, name is fallback/placeholder ('{participant.get('name') if participant else 'No PData'}'), or missing."
-            )
+    for i, driver_name in enumerate(snapshot.names[:count]):
+        if not driver_name:
             continue
 
-        driver_name = participant.get("name", f"Driver {i+1}")
-        team_id = participant.get("teamId", 255)
-        team_name = TEAM_ID_MAP.get(team_id, "Unknown Team")
-
         lap_times_list: List[LapTime] = []
-        last_lap_ms = lap_data.get("lastLapTimeInMS")
-        logger.debug(
-            f"[get_live_driver_data_for_api] Driver '{driver_name}' (idx {i}), Extracted lastLapTimeInMS: {last_lap_ms} (type: {type(last_lap_ms)}) "
-        )
-        if last_lap_ms is not None and isinstance(last_lap_ms, int) and last_lap_ms > 0:
-            lap_time_str = ms_to_laptime_str(last_lap_ms)
-            # For now, we'll consider this the "fastest" reported in this context,
-            # as we only handle one lap time per driver in the current API response structure.
-            # A true 'is_fastest' would require session-wide tracking.
-            lap_time_obj = LapTime(
-                time=lap_time_str, is_fastest=True
-            )  # Marking as 'fastest' for display purposes
-            lap_times_list.append(lap_time_obj)
-        else:
-            logger.debug(
-                f"[get_live_driver_data_for_api] Driver '{driver_name}' (idx {i}), No valid last lap time found (value: {last_lap_ms}), or it's 0. Lap times list will be empty."
-            )
-
-        # Fetch motion data for car position
-        motion_data = None
-        # Ensure latest_car_positions is a list and index i is valid
-        if isinstance(latest_car_positions, list) and i < len(latest_car_positions):
-            motion_data = latest_car_positions[i]
-
-        world_x, world_y, world_z = None, None, None
-        if motion_data and isinstance(motion_data, dict):
-            world_x = motion_data.get("worldPositionX")
-            world_y = motion_data.get("worldPositionY")
-            world_z = motion_data.get("worldPositionZ")
-            logger.debug(
-                f"[get_live_driver_data_for_api] Driver '{driver_name}' (idx {i}), MotionData: X={world_x}, Y={world_y}, Z={world_z}"
-            )
-        else:
-            logger.debug(
-                f"[get_live_driver_data_for_api] Driver '{driver_name}' (idx {i}), No motion data found or motion_data is not a dict. latest_car_positions type: {type(latest_car_positions)}, len: {len(latest_car_positions) if isinstance(latest_car_positions, list) else 'N/A'}, motion_data for index {i}: {motion_data}"
+        if lap_ms[i] > 0:
+            lap_times_list.append(
+                LapTime(
+                    time=ms_to_laptime_str(lap_ms[i]),
+                    time_ms=lap_ms[i],
+                    is_fastest=lap_ms[i] == fastest_ms,
+                )
             )
 
         drivers_api_response[driver_name] = DriverResponse(
             name=driver_name,
-            team=team_name,
+            team=TEAM_ID_MAP.get(team_ids[i], "Unknown Team"),
             lap_times=lap_times_list,
-            world_x=world_x,
-            world_y=world_y,
-            world_z=world_z,
-        )
-        logger.debug(
-            f"get_live_driver_data_for_api: Processed driver '{driver_name}', Team: '{team_name}', Laps: {len(lap_times_list)}"
+            world_x=world_xs[i],
+            world_y=world_ys[i],
+            world_z=world_zs[i],
         )
 
-    if not drivers_api_response and active_drivers_count > 0:
-        logger.warning(
-            "[get_live_driver_data_for_api] After loop, drivers_api_response is unexpectedly empty despite active_drivers_count > 0."
-        )
-    elif active_drivers_count > 0:
-        logger.debug(
-            f"[get_live_driver_data_for_api] After loop. Keys in drivers_api_response: {list(drivers_api_response.keys()) if drivers_api_response else 'Empty dict'}"
-        )
-        logger.debug(
-            f"[get_live_driver_data_for_api] Compiled data for {len(drivers_api_response)} drivers. Expected to process up to {min(active_drivers_count, len(participant_data_store))} entries."
-        )
+    logger.debug(
+        f"[get_live_driver_data_for_api] Compiled data for {len(drivers_api_response)} of {count} active drivers."
+    )
+    return drivers_api_response
 
-    # Detailed log of the actual content being returned
-    if drivers_api_response:
-        for name, driver_data in drivers_api_response.items():
-            lap_times_summary = [
-                (lt.time, lt.is_fastest) for lt in driver_data.lap_times
-            ]
-            logger.debug(
-                f"[get_live_driver_data_for_api] Returning driver: '{name}', Team: '{driver_data.team}', LapTimes Summary: {lap_times_summary}"
-            )
-    else:
-        logger.debug(
-            "[get_live_driver_data_for_api] Returning empty drivers_api_response dict."
-        )
 
-    return drivers_api_response
+def _build_session_info(session_source: dict) -> Optional[SessionInfo]:
+    if not session_source:
+        return None
+    return SessionInfo(
+        trackId=session_source.get("trackId"),
+        gamePaused=bool(session_source.get("gamePaused", 0)),
+        sessionType=session_source.get("sessionType"),
+        sessionTypeName=session_source.get("sessionTypeName"),
+        sessionTimeLeft=session_source.get("sessionTimeLeft"),
+        sessionDuration=session_source.get("sessionDuration"),
+    )
 
 
-async def get_full_live_telemetry_data() -> LiveTelemetryResponse:
+async def get_full_live_telemetry_data(
+    snapshot: Optional[TelemetrySnapshot] = None,
+) -> LiveTelemetryResponse:
     """Assembles full live telemetry data including driver positions and session info."""
-    global participant_data_store, latest_car_positions, session_data_store, enhanced_session_data_store, active_drivers_count, TEAM_ID_MAP
-
     live_drivers_list: List[LiveDriverData] = []
 
-    # Ensure participant_data_store is a list and active_drivers_count is an int
-    if (
-        isinstance(participant_data_store, list)
-        and isinstance(active_drivers_count, int)
-        and active_drivers_count > 0
-    ):
-        # Iterate up to the number of active drivers, ensuring bounds are respected for stores
-        for i in range(min(active_drivers_count, len(participant_data_store))):
-            participant = participant_data_store[i]
-
-            motion = None
-            if isinstance(latest_car_positions, list) and i < len(latest_car_positions):
-                motion = latest_car_positions[i]
-
-            if (
-                not participant
-                or not isinstance(participant, dict)
-                or not participant.get("name")
-            ):
-                logger.debug(
-                    f"get_full_live_telemetry_data: Skipping driver index {i}, missing participant data or name."
-                )
+    snapshot = snapshot or current_snapshot()
+    count = snapshot.active_count()
+    if count > 0:
+        team_ids = snapshot.column("team_id", count).tolist()
+        positions = (
+            snapshot.records(
+                {
+                    "worldPositionX": "world_x",
+                    "worldPositionY": "world_y",
+                    "worldPositionZ": "world_z",
+                },
+                count,
+            )
+            if snapshot.motion_received
+            else [{}] * count
+        )
+        for i, driver_name in enumerate(snapshot.names[:count]):
+            if not driver_name:
                 continue
-
-            driver_name = participant.get("name", f"Driver {i+1}")
-            team_id = participant.get("teamId", 255)
-            team_name = TEAM_ID_MAP.get(team_id, "Unknown Team")
-
-            pos_x, pos_y, pos_z = None, None, None
-            if motion and isinstance(motion, dict):
-                pos_x = motion.get("worldPositionX")
-                pos_y = motion.get("worldPositionY")
-                pos_z = motion.get("worldPositionZ")
-
             live_drivers_list.append(
                 LiveDriverData(
                     name=driver_name,
-                    team=team_name,
-                    worldPositionX=pos_x,
-                    worldPositionY=pos_y,
-                    worldPositionZ=pos_z,
+                    team=TEAM_ID_MAP.get(team_ids[i], "Unknown Team"),
+                    **positions[i],
                 )
             )
     else:
-        logger.debug(
-            "get_full_live_telemetry_data: Participant data store not ready or no active drivers."
-        )
+        logger.debug("get_full_live_telemetry_data: No active drivers.")
 
-    current_session_info = None
     # Use enhanced session data if available, fallback to basic session data
-    session_source = (
-        enhanced_session_data_store
-        if enhanced_session_data_store
-        else session_data_store
+    current_session_info = _build_session_info(
+        snapshot.enhanced_session or snapshot.session
     )
-    if isinstance(session_source, dict):
-        current_session_info = SessionInfo(
-            trackId=session_source.get("trackId"),
-            gamePaused=bool(session_source.get("gamePaused", 0)),
-            sessionType=session_source.get("sessionType"),
-            sessionTypeName=session_source.get("sessionTypeName"),
-            sessionTimeLeft=session_source.get("sessionTimeLeft"),
-            sessionDuration=session_source.get("sessionDuration"),
-        )
-    else:
-        logger.debug(
-            "get_full_live_telemetry_data: Session data store not ready or not a dict."
-        )
 
-    final_active_drivers_count = (
-        active_drivers_count if isinstance(active_drivers_count, int) else 0
-    )
     logger.debug(
         f"get_full_live_telemetry_data: Compiled data for {len(live_drivers_list)} drivers. "
-        f"Session trackId: {current_session_info.trackId if current_session_info else 'N/A'}, "
-        f"Session type: {current_session_info.sessionTypeName if current_session_info else 'N/A'}. "
-        f"Active drivers: {final_active_drivers_count}"
+        f"Session trackId: {current_session_info.trackId if current_session_info else 'N/A'}. "
+        f"Active drivers: {count}"
     )
 
     return LiveTelemetryResponse(
         drivers=live_drivers_list,
         sessionInfo=current_session_info,
-        activeDriversCount=final_active_drivers_count,
+        activeDriversCount=snapshot.active_drivers,
+        version=snapshot.version,
     )
 
 
-@telemetry_router.get(
-    "/live_data_v2", response_model=LiveTelemetryResponse, tags=["Telemetry"]
-)
-async def live_data_endpoint():
-    """Provides live telemetry data including driver positions, names, teams, and session info."""
-    return await get_full_live_telemetry_data()
-
+def get_live_positions() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Car indices with world_x/world_z for every named active car."""
+    snapshot = current_snapshot()
+    count = snapshot.active_count() if snapshot.motion_received else 0
+    named = np.fromiter(
+        (bool(name) for name in snapshot.names[:count]), dtype=bool, count=count
+    )
+    indices = np.flatnonzero(named)
+    return (
+        indices,
+        snapshot.column("world_x", count)[indices],
+        snapshot.column("world_z", count)[indices],
+    )
 
-# Global flag and event to control the listener thready listener
-try:
-    from f1_24_telemetry.listener import TelemetryListener
 
-    F1_TELEMETRY_AVAILABLE = True
-except ImportError:
-    TelemetryListener = None  # type: ignore
-    F1_TELEMETRY_AVAILABLE = False
-    print("WARNING: f1_24_telemetry library not found. UDP Telemetry will not work.")
+def get_live_traces() -> CarTelemetryTraces:
+    """CarTelemetry trace ring of the default session, streamed over /ws."""
+    return session_registry.traces()
+
+
+def get_live_roster() -> List[dict]:
+    """Car index to name/team mapping that accompanies the positions frames."""
+    snapshot = current_snapshot()
+    count = snapshot.active_count()
+    team_ids = snapshot.column("team_id", count).tolist()
+    return [
+        {"idx": i, "name": name, "team": TEAM_ID_MAP.get(team_ids[i], "Unknown Team")}
+        for i, name in enumerate(snapshot.names[:count])
+        if name
+    ]
+
+
+def build_timing_tower(snapshot: TelemetrySnapshot) -> List[dict]:
+    """Every placed car's gap and interval, in race position order."""
+    if not snapshot.lap_data_received:
+        return []
+    count = snapshot.active_count() or MAX_CARS
+    positions = snapshot.column("car_position", count)
+    order = [i for i in np.argsort(positions, kind="stable").tolist() if positions[i]]
+    columns = {
+        name: snapshot.column(name, count).tolist()
+        for name in (
+            "car_position",
+            "current_lap_num",
+            "gap_to_leader_ms",
+            "interval_ms",
+            "laps_behind_leader",
+        )
+    }
+    names = snapshot.names
+    return [
+        {
+            "idx": i,
+            "name": names[i] if i < len(names) else "",
+            "position": columns["car_position"][i],
+            "lap": columns["current_lap_num"][i],
+            "gap_to_leader_ms": None
+            if columns["gap_to_leader_ms"][i] == UNKNOWN_GAP
+            else columns["gap_to_leader_ms"][i],
+            "interval_ms": None
+            if columns["interval_ms"][i] == UNKNOWN_GAP
+            else columns["interval_ms"][i],
+            "laps_behind_leader": columns["laps_behind_leader"][i],
+        }
+        for i in order
+    ]
+
+
+def get_live_timing() -> List[dict]:
+    """Timing tower of the default session, streamed over /ws."""
+    return build_timing_tower(current_snapshot())
+
+
+# Packets without a native layout fall back to the f1_24_telemetry library when installed
+if not LIBRARY_FALLBACK_AVAILABLE:
     print(
-        "Please install it, possibly using: pip install git+https://github.com/xavierdubuc/f1-24-telemetry.git"
+        "NOTE: f1_24_telemetry library not found. Core packets are decoded natively; other packet types will be ignored."
     )
 
-# Global state for the telemetry listener
-listener_thread: Optional[threading.Thread] = None
-listener_stop_event: Optional[threading.Event] = None
-listener_port: Optional[int] = None
-listener_host: Optional[str] = None
-listener_error: Optional[str] = None
-active_drivers_count = 0  # Updated by participant packets
-
-# Enhanced telemetry data stores
-latest_car_positions: list = []  # Will store dicts of car positions
-participant_data_store: list = []  # Will store dicts of participant info
-session_data_store: dict = {}  # Will store basic session info
-enhanced_session_data_store: dict = {}  # Will store enhanced session info with types
-lap_data_store: list = []  # To store lap data for each car
-
-# Performance tracking
-packets_processed_count = 0
-packets_filtered_count = 0
+DEFAULT_LISTENER_MODE = os.getenv("TELEMETRY_LISTENER_MODE", "thread").lower()
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Where listeners record captures and replays look for them
+CAPTURE_DIR = os.getenv("TELEMETRY_CAPTURE_DIR", "captures")
 
 
 class TelemetryStatus(BaseModel):
     running: bool
     host: Optional[str] = None
     port: Optional[int] = None
+    ports: Optional[List[int]] = None  # Every port the session's listener is bound to
+    mode: Optional[str] = None
+    session_id: Optional[str] = None
     active_drivers: int = 0
     error: Optional[str] = None
 
 
-class TelemetryStats(BaseModel):
-    packets_processed: int = 0
-    packets_filtered: int = 0
-    filtering_enabled: bool = True
-    essential_packets: List[int] = []
-    optional_packets: List[int] = []
-
-
 class LiveDataResponse(BaseModel):
     session: Optional[dict] = None
     participants: Optional[list] = None  # List of participant data dicts
@@ -440,6 +440,27 @@ class StartResponse(BaseModel):
     message: str
     host: str
     port: int
+    ports: List[int] = []
+    mode: str = "thread"
+    routing: str = "port"
+    sessions: List[str] = []  # Created up front for routing=port; on first SessionData for routing=link
+    capture_file: Optional[str] = None  # Capture being recorded, relative to TELEMETRY_CAPTURE_DIR
+
+
+class CaptureInfo(BaseModel):
+    name: str
+    size_bytes: int
+    started_at: Optional[float] = None  # Unix time the recording began
+    recording: bool = False
+
+
+class ReplayResponse(BaseModel):
+    message: str
+    capture: str
+    speed: Optional[float] = None  # None: as fast as possible
+    loop: bool = False
+    routing: str = "port"
+    sessions: List[str] = []
 
 
 class TelemetryStats(BaseModel):
@@ -448,6 +469,168 @@ class TelemetryStats(BaseModel):
     filtering_enabled: bool = True
     essential_packets: List[int] = []
     optional_packets: List[int] = []
+    enabled_packets: List[int] = []  # Packet IDs currently decoded (see PUT /filter)
+    packet_rates: Dict[int, float] = {}  # Packet ID -> max decode rate in Hz
+    listener_mode: Optional[str] = None
+    session_id: Optional[str] = None
+    # Process mode only: age of the child's newest snapshot when the API picked it up
+    # (last and moving average); includes any time it sat unread between requests
+    ipc_lag_ms: Optional[float] = None
+    ipc_lag_avg_ms: Optional[float] = None
+
+
+class CarTraceResponse(BaseModel):
+    """One car's CarTelemetry samples, oldest first, as parallel arrays."""
+
+    session_id: Optional[str] = None
+    car_index: int
+    name: str = ""
+    cursor: int = 0  # Pass back as ?after= to fetch only newer samples
+    samples: int = 0
+    session_time: List[float] = []
+    frame: List[int] = []
+    lap_distance: List[float] = []  # Metres, from the latest LapData at the time
+    lap: List[int] = []
+    speed: List[int] = []  # km/h
+    throttle: List[float] = []  # 0.0-1.0
+    steer: List[float] = []  # -1.0 to 1.0
+    brake: List[float] = []  # 0.0-1.0
+    clutch: List[int] = []  # 0-100
+    gear: List[int] = []
+    engine_rpm: List[int] = []
+    drs: List[int] = []
+
+
+class TimingEntry(BaseModel):
+    idx: int
+    name: str = ""
+    position: int
+    lap: int
+    gap_to_leader_ms: Optional[int] = None  # None when no time gap is known yet
+    interval_ms: Optional[int] = None  # To the car one position ahead
+    laps_behind_leader: int = 0
+
+
+class TimingResponse(BaseModel):
+    """Timing tower ordered by race position, computed from lap distance."""
+
+    session_id: Optional[str] = None
+    version: int = 0
+    cars: List[TimingEntry] = []
+
+
+class LapTraceSummary(BaseModel):
+    lap: int
+    lap_time_ms: int
+    points: int
+    fastest: bool = False
+
+
+class DriverLapTracesResponse(BaseModel):
+    session_id: Optional[str] = None
+    car_index: int
+    name: str = ""
+    grid_step_m: float
+    laps: List[LapTraceSummary] = []
+
+
+class LapTraceResponse(BaseModel):
+    """One lap on the distance grid: point i is at i * grid_step_m metres from the line."""
+
+    car_index: int
+    lap: int
+    name: str = ""
+    lap_time_ms: int
+    grid_step_m: float
+    points: int
+    time: List[float] = []  # Seconds since the start of the lap
+    speed: List[int] = []
+    throttle: List[float] = []
+    brake: List[float] = []
+    steer: List[float] = []
+    gear: List[int] = []
+    engine_rpm: List[int] = []
+    drs: List[int] = []
+
+
+class LapCompareResponse(BaseModel):
+    """Two laps on the shared grid; deltas are B minus A (positive delta_time: B is slower)."""
+
+    session_id: Optional[str] = None
+    grid_step_m: float
+    points: int
+    a: LapTraceResponse
+    b: LapTraceResponse
+    delta_time: List[float] = []
+    delta_speed: List[float] = []
+    delta_throttle: List[float] = []
+    delta_brake: List[float] = []
+
+
+class PacketFilterEntry(BaseModel):
+    packet_id: int
+    name: str
+    enabled: bool
+    max_rate_hz: Optional[float] = None  # None: every packet is decoded
+    native: bool  # Decoded by the native struct decoder rather than the f1-packets fallback
+
+
+class PacketFilterResponse(BaseModel):
+    generation: int  # Bumped on every change
+    packets: List[PacketFilterEntry] = []
+
+
+class PacketFilterUpdate(BaseModel):
+    enable: List[int] = []
+    disable: List[int] = []
+    rates: Dict[int, Optional[float]] = {}  # Packet ID -> max Hz; null or 0 removes the limit
+
+
+class PacketTypeStats(BaseModel):
+    packet_id: int
+    name: str
+    received: int
+    bytes: int
+    filtered: int
+    decoded: int
+    # Decode plus snapshot publish; percentiles are histogram bucket upper bounds
+    decode_us_avg: Optional[float] = None
+    decode_us_p50: Optional[float] = None
+    decode_us_p99: Optional[float] = None
+    decode_histogram_us: Dict[str, int] = {}
+    interval_ms_avg: Optional[float] = None
+    interval_histogram_ms: Dict[str, int] = {}
+    jitter_ms: float = 0.0
+    # Packet types sent every frame only: estimates from frame identifier gaps
+    frames_missed: Optional[int] = None
+    frames_reordered: Optional[int] = None
+    estimated_loss: Optional[float] = None
+
+
+class SocketQueueStats(BaseModel):
+    port: int
+    rx_queue_bytes: int  # Waiting in the kernel to be read
+    drops: int  # Dropped by the kernel because the receive queue was full
+
+
+class PacketStatsResponse(BaseModel):
+    session_id: Optional[str] = None
+    listener_mode: Optional[str] = None
+    packets: List[PacketTypeStats] = []
+    sockets: List[SocketQueueStats] = []  # Linux only
+    packets_unrouted: int = 0
+
+
+class TelemetrySessionSummary(BaseModel):
+    session_id: str
+    port: int
+    mode: str
+    routing: str
+    running: bool
+    link_identifier: Optional[int] = None
+    active_drivers: int = 0
+    packets_processed: int = 0
+    last_packet_age_seconds: Optional[float] = None
 
 
 def get_local_ip():
@@ -468,788 +651,705 @@ def get_local_ip():
     return IP
 
 
-def telemetry_listener_worker(host: str, port: int, stop_event: threading.Event):
-    global listener_error, active_drivers_count, packets_processed_count, packets_filtered_count
-    global latest_car_positions, participant_data_store, session_data_store, enhanced_session_data_store, lap_data_store
+def _apply_session_packet(store: LiveTelemetryStore, data: bytes):
+    (
+        session_type,
+        track_id,
+        session_time_left,
+        session_duration,
+        pit_speed_limit,
+        game_paused,
+        network_game,
+        session_link_identifier,
+    ) = unpack_session(data)
+    total_laps, track_length = unpack_session_track(data)
+
+    # Basic session data (backwards compatibility)
+    session = {
+        "trackId": track_id,
+        "trackLength": track_length,
+        "totalLaps": total_laps,
+        "networkGame": network_game,
+        "gamePaused": game_paused,
+        "sessionType": session_type,
+        "sessionLinkIdentifier": session_link_identifier,
+        "sessionTimeLeft": session_time_left,
+        "sessionDuration": session_duration,
+        "pitSpeedLimit": pit_speed_limit,
+    }
 
-    listener_instance = None
-    try:
-        print(f"Attempting to start UDP telemetry listener on {host}:{port}")
-        listener_instance = TelemetryListener(port=port, host=host)
-        print(f"UDP Telemetry listener started on {host}:{port}")
-
-        # Ensure stores are initialized (though _clear_listener_state should handle this prior to thread start)
-        if not latest_car_positions or len(latest_car_positions) != 22:
-            latest_car_positions = [{} for _ in range(22)]
-        if not participant_data_store or len(participant_data_store) != 22:
-            participant_data_store = [{} for _ in range(22)]
-        if not session_data_store:
-            session_data_store = {}
-        if not lap_data_store or len(lap_data_store) != 22:
-            lap_data_store = [{} for _ in range(22)]
-
-        while not stop_event.is_set():
-            try:
-                packet = listener_instance.get()
-                if not packet:
-                    logger.warning(
-                        "listener_instance.get() returned a null/falsey packet. Skipping."
-                    )
-                    continue
-
-                logger.debug(
-                    f"Listener got a packet of type: {type(packet)}. Has 'header' attribute? {hasattr(packet, 'header')}"
-                )
+    # Enhanced session data with session type details
+    is_practice = session_type in (1, 2, 3, 4)
+    is_qualifying = session_type in (5, 6, 7, 8, 9)
+    is_race = session_type in (10, 11, 12)
+    enhanced_session = {
+        **session,
+        "sessionTypeName": get_session_type_name(session_type),
+        # Additional enhanced fields
+        "sessionTypeCategory": (
+            "Practice"
+            if is_practice
+            else "Qualifying" if is_qualifying else "Race" if is_race else "Other"
+        ),
+        "isRaceSession": is_race,
+        "isPracticeSession": is_practice,
+        "isQualifyingSession": is_qualifying,
+    }
+    store.set_session(session, enhanced_session)
 
-                if hasattr(packet, "header"):
-                    packet_id = packet.header.packet_id
-                    logger.debug(
-                        f"Received packet_id: {packet_id} (type: {type(packet_id)})"
-                    )  # Packet filtering for performance optimization
-                    if not should_process_packet(packet_id):
-                        packets_filtered_count += 1
-                        logger.debug(
-                            f"Packet ID {packet_id} filtered out for performance"
-                        )
-                        continue
-
-                    packets_processed_count += 1
-
-                    if packet_id == 0:  # MotionData
-                        logger.debug(
-                            f"Processing MotionData (ID 0). Cars: {len(packet.car_motion_data) if hasattr(packet, 'car_motion_data') else 'N/A'}"
-                        )
-                        # active_drivers_count = sum(1 for car_motion in packet.car_motion_data if car_motion.world_position_x != 0 or car_motion.world_position_y != 0 or car_motion.world_position_z != 0) # This is not the authoritative source for active_drivers_count
-                        for i, car_motion in enumerate(packet.car_motion_data):
-                            if i < 22:  # Ensure we don't exceed our list size
-                                latest_car_positions[i] = {
-                                    "worldPositionX": car_motion.world_position_x,
-                                    "worldPositionY": car_motion.world_position_y,
-                                    "worldPositionZ": car_motion.world_position_z,
-                                    "gForceLateral": car_motion.g_force_lateral,
-                                    "gForceLongitudinal": car_motion.g_force_longitudinal,
-                                    "gForceVertical": car_motion.g_force_vertical,
-                                    "yaw": car_motion.yaw,
-                                    "pitch": car_motion.pitch,
-                                    "roll": car_motion.roll,
-                                }
-
-                        logger.debug(
-                            f"Updated latest_car_positions for {len(packet.car_motion_data) if hasattr(packet, 'car_motion_data') else 'N/A'} cars. First car X: {latest_car_positions[0].get('worldPositionX') if latest_car_positions and latest_car_positions[0] else 'N/A'}"
-                        )
-                    elif packet_id == 1:  # SessionData
-                        logger.debug(
-                            f"Processing SessionData (ID 1). Track ID: {packet.track_id if hasattr(packet, 'track_id') else 'N/A'}"
-                        )
-
-                        # Update basic session data store (backwards compatibility)
-                        session_data_store.update(
-                            {
-                                "trackId": packet.track_id,
-                                "networkGame": packet.network_game,
-                                "gamePaused": packet.game_paused,
-                                "sessionType": packet.session_type,
-                                "sessionLinkIdentifier": packet.session_link_identifier,
-                                "sessionTimeLeft": packet.session_time_left,
-                                "sessionDuration": packet.session_duration,
-                                "pitSpeedLimit": packet.pit_speed_limit,
-                            }
-                        )
-
-                        # Update enhanced session data store with session type details
-                        session_type_name = get_session_type_name(packet.session_type)
-                        enhanced_session_data_store.update(
-                            {
-                                "trackId": packet.track_id,
-                                "networkGame": packet.network_game,
-                                "gamePaused": packet.game_paused,
-                                "sessionType": packet.session_type,
-                                "sessionTypeName": session_type_name,
-                                "sessionTimeLeft": packet.session_time_left,
-                                "sessionDuration": packet.session_duration,
-                                "pitSpeedLimit": packet.pit_speed_limit,
-                                "sessionLinkIdentifier": packet.session_link_identifier,
-                                # Additional enhanced fields
-                                "sessionTypeCategory": (
-                                    "Practice"
-                                    if packet.session_type in [1, 2, 3, 4]
-                                    else (
-                                        "Qualifying"
-                                        if packet.session_type in [5, 6, 7, 8, 9]
-                                        else (
-                                            "Race"
-                                            if packet.session_type in [10, 11, 12]
-                                            else "Other"
-                                        )
-                                    )
-                                ),
-                                "isRaceSession": packet.session_type in [10, 11, 12],
-                                "isPracticeSession": packet.session_type
-                                in [1, 2, 3, 4],
-                                "isQualifyingSession": packet.session_type
-                                in [5, 6, 7, 8, 9],
-                            }
-                        )
-
-                        logger.debug(
-                            f"Updated session data stores. Track ID: {session_data_store.get('trackId')}, "
-                            f"Session Type: {session_data_store.get('sessionType')} ({session_type_name})"
-                        )
-
-                    elif packet_id == 4:  # ParticipantsData
-                        num_cars_to_log = (
-                            str(packet.num_active_cars)
-                            if hasattr(packet, "num_active_cars")
-                            else (
-                                str(packet.m_numActiveCars)
-                                if hasattr(packet, "m_numActiveCars")
-                                else "N/A"                            )
-                        )
-                        logger.debug(
-                            f"Processing ParticipantsData (ID 4). Num Active Cars: {num_cars_to_log}"
-                        )
-                        if hasattr(
-                            packet, "num_active_cars"
-                        ):  # Check for 'num_active_cars' first
-                            active_drivers_count = packet.num_active_cars
-                            logger.debug(
-                                f"[telemetry_listener_worker] active_drivers_count set to: {active_drivers_count} from packet.num_active_cars"
-                            )
-                        elif hasattr(
-                            packet, "m_numActiveCars"
-                        ):  # Fallback to 'm_numActiveCars'
-                            active_drivers_count = packet.m_numActiveCars
-                            logger.debug(
-                                f"[telemetry_listener_worker] active_drivers_count set to: {active_drivers_count} from packet.m_numActiveCars (fallback)"
-                            )
-                        else:
-                            logger.warning(
-                                f"[telemetry_listener_worker] PacketParticipantsData (ID 4) received, but NEITHER 'num_active_cars' NOR 'm_numActiveCars' attribute is present. Cannot update active_drivers_count from packet header."
-                            )
-
-                        if hasattr(packet, "participants"):
-                            # Ensure participant_data_store is initialized as a list of 22 empty dicts if not already
-                            # This check is important if the listener starts after some packets have been missed
-                            if (
-                                not isinstance(participant_data_store, list)
-                                or len(participant_data_store) != 22
-                            ):
-                                logger.warning(
-                                    "participant_data_store is not a list of 22 elements. Re-initializing."
-                                )
-                                participant_data_store[:] = [
-                                    {} for _ in range(22)
-                                ]  # Modify in place
-
-                            num_to_process = 0
-                            if hasattr(packet, "m_numActiveCars"):  # F1 2020+
-                                num_to_process = packet.m_numActiveCars
-                            elif hasattr(packet, "header") and hasattr(
-                                packet.header, "player_car_index"
-                            ):  # Fallback for older games
-                                num_to_process = len(packet.participants)
-                            else:
-                                num_to_process = len(
-                                    packet.participants
-                                )  # Default to length of participants array if count is missing
-
-                            logger.debug(
-                                f"ParticipantsData: num_to_process = {num_to_process}, actual len(packet.participants) = {len(packet.participants)}"
-                            )
-
-                            # Clear only the relevant portion of the store before repopulating
-                            # for i in range(22):
-                            #     participant_data_store[i] = {}
-
-                            processed_indices = set()
-                            for i in range(
-                                min(num_to_process, len(packet.participants), 22)
-                            ):
-                                participant = packet.participants[i]
-                                processed_indices.add(i)
-                                try:
-                                    name_bytes = getattr(participant, "name", b"")
-                                    name_str = (
-                                        name_bytes.decode("utf-8", errors="replace")
-                                        .split("\x00")[0]
-                                        .strip()
-                                    )
-                                    if (
-                                        not name_str
-                                        or name_str == "???????????????"
-                                        or name_str.lower() == "player"
-                                        or name_str.isspace()
-                                    ):
-                                        race_num = getattr(
-                                            participant, "race_number", 0
-                                        )
-                                        name_str = f"Driver {race_num if race_num != 0 else i + 1}"
-                                except Exception as e:
-                                    logger.error(
-                                        f"Error decoding participant name for index {i}: {e}"
-                                    )
-                                    race_num = getattr(participant, "race_number", 0)
-                                    name_str = (
-                                        f"Driver {race_num if race_num != 0 else i + 1}"
-                                    )
-
-                                participant_data_store[i] = {
-                                    "aiControlled": getattr(
-                                        participant, "ai_controlled", 1
-                                    ),
-                                    "driverId": getattr(participant, "driver_id", 255),
-                                    "networkId": getattr(
-                                        participant, "network_id", 255
-                                    ),
-                                    "teamId": getattr(participant, "team_id", 255),
-                                    "myTeam": getattr(participant, "my_team", 0),
-                                    "raceNumber": getattr(
-                                        participant, "race_number", 0
-                                    ),
-                                    "nationality": getattr(
-                                        participant, "nationality", 0
-                                    ),
-                                    "name": name_str,
-                                    "yourTelemetry": getattr(
-                                        participant, "your_telemetry", 0
-                                    ),
-                                    "is_online_player": (
-                                        True
-                                        if hasattr(participant, "network_id")
-                                        and participant.network_id != 0
-                                        and participant.network_id != 255
-                                        and getattr(participant, "driver_id", 255)
-                                        == 255
-                                        else False
-                                    ),
-                                    "raw_name_bytes": (
-                                        name_bytes.hex()
-                                        if isinstance(name_bytes, bytes)
-                                        else ""
-                                    ),
-                                }
-                            # Clear data for cars that are no longer active in this packet
-                            for i in range(22):
-                                if i not in processed_indices and i >= num_to_process:
-                                    participant_data_store[i] = {}
-
-                        logger.debug(
-                            f"Participant data store updated. Active drivers: {active_drivers_count}. Processed up to {min(num_to_process, len(packet.participants), 22)} participants."
-                        )
-                        if (
-                            participant_data_store
-                            and len(participant_data_store) > 0
-                            and participant_data_store[0]
-                        ):
-                            logger.debug(
-                                f"First participant after update: Name='{participant_data_store[0].get('name')}', TeamID='{participant_data_store[0].get('teamId')}'"
-                            )
-                        else:
-                            logger.debug(
-                                "Participant_data_store is empty or first element is empty after update."
-                            )                    
-                    elif packet_id == 2:  # LapData
-                        logger.debug(
-                            f"Processing LapData (ID 2). Cars: {len(packet.lap_data) if hasattr(packet, 'lap_data') else 'N/A'}"
-                        )
-                        for i, car_lap in enumerate(packet.lap_data):
-                            if i < 22:
-                                # Combine minute and millisecond parts for sector times
-                                sector1_time_ms = (
-                                    (car_lap.sector_1_time_minutes_part * 60 * 1000)
-                                    + car_lap.sector_1_time_ms_part
-                                    if hasattr(car_lap, "sector_1_time_minutes_part")
-                                    and hasattr(car_lap, "sector_1_time_ms_part")
-                                    else 0
-                                )
-                                sector2_time_ms = (
-                                    (car_lap.sector_2_time_minutes_part * 60 * 1000)
-                                    + car_lap.sector_2_time_ms_part
-                                    if hasattr(car_lap, "sector_2_time_minutes_part")
-                                    and hasattr(car_lap, "sector_2_time_ms_part")
-                                    else 0
-                                )
-
-                                lap_data_store[i] = {
-                                    "lastLapTimeInMS": (
-                                        car_lap.last_lap_time_in_ms
-                                        if hasattr(car_lap, "last_lap_time_in_ms")
-                                        else 0
-                                    ),
-                                    "currentLapTimeInMS": (
-                                        car_lap.current_lap_time_in_ms
-                                        if hasattr(car_lap, "current_lap_time_in_ms")
-                                        else 0
-                                    ),
-                                    "sector1TimeInMS": sector1_time_ms,
-                                    "sector2TimeInMS": sector2_time_ms,
-                                    # Note: spec.h does not explicitly list sector3Time. It's typically calculated.
-                                    "lapDistance": (
-                                        car_lap.lap_distance
-                                        if hasattr(car_lap, "lap_distance")
-                                        else 0.0
-                                    ),
-                                    "totalDistance": (
-                                        car_lap.total_distance
-                                        if hasattr(car_lap, "total_distance")
-                                        else 0.0
-                                    ),
-                                    "safetyCarDelta": (
-                                        car_lap.safety_car_delta
-                                        if hasattr(car_lap, "safety_car_delta")
-                                        else 0.0
-                                    ),
-                                    "carPosition": (
-                                        car_lap.car_position
-                                        if hasattr(car_lap, "car_position")
-                                        else 0
-                                    ),
-                                    "currentLapNum": (
-                                        car_lap.current_lap_num
-                                        if hasattr(car_lap, "current_lap_num")
-                                        else 0
-                                    ),
-                                    "pitStatus": (
-                                        car_lap.pit_status
-                                        if hasattr(car_lap, "pit_status")
-                                        else 0
-                                    ),
-                                    "numPitStops": (
-                                        car_lap.num_pit_stops
-                                        if hasattr(car_lap, "num_pit_stops")
-                                        else 0
-                                    ),
-                                    "sector": (
-                                        car_lap.sector
-                                        if hasattr(car_lap, "sector")
-                                        else 0
-                                    ),
-                                    "currentLapInvalid": (
-                                        car_lap.current_lap_invalid
-                                        if hasattr(car_lap, "current_lap_invalid")
-                                        else 0
-                                    ),
-                                    "penalties": (
-                                        car_lap.penalties
-                                        if hasattr(car_lap, "penalties")
-                                        else 0
-                                    ),
-                                    "totalWarnings": (
-                                        car_lap.total_warnings
-                                        if hasattr(car_lap, "total_warnings")
-                                        else 0
-                                    ),  # Corrected from 'warnings'
-                                    "cornerCuttingWarnings": (
-                                        car_lap.corner_cutting_warnings
-                                        if hasattr(car_lap, "corner_cutting_warnings")
-                                        else 0
-                                    ),
-                                    "numUnservedDriveThroughPens": (
-                                        car_lap.num_unserved_drive_through_pens
-                                        if hasattr(
-                                            car_lap, "num_unserved_drive_through_pens"
-                                        )
-                                        else 0
-                                    ),
-                                    "numUnservedStopGoPens": (
-                                        car_lap.num_unserved_stop_go_pens
-                                        if hasattr(car_lap, "num_unserved_stop_go_pens")
-                                        else 0
-                                    ),
-                                    "gridPosition": (
-                                        car_lap.grid_position
-                                        if hasattr(car_lap, "grid_position")
-                                        else 0
-                                    ),
-                                    "driverStatus": (
-                                        car_lap.driver_status
-                                        if hasattr(car_lap, "driver_status")
-                                        else 0
-                                    ),
-                                    "resultStatus": (
-                                        car_lap.result_status
-                                        if hasattr(car_lap, "result_status")
-                                        else 0
-                                    ),
-                                    "pitLaneTimerActive": (
-                                        car_lap.pit_lane_timer_active
-                                        if hasattr(car_lap, "pit_lane_timer_active")
-                                        else 0
-                                    ),
-                                    "pitLaneTimeInLaneInMS": (
-                                        car_lap.pit_lane_time_in_lane_in_ms
-                                        if hasattr(
-                                            car_lap, "pit_lane_time_in_lane_in_ms"
-                                        )
-                                        else 0
-                                    ),
-                                    "pitStopTimerInMS": (
-                                        car_lap.pit_stop_timer_in_ms
-                                        if hasattr(car_lap, "pit_stop_timer_in_ms")
-                                        else 0
-                                    ),
-                                    "pitStopShouldServePen": (
-                                        car_lap.pit_stop_should_serve_pen
-                                        if hasattr(car_lap, "pit_stop_should_serve_pen")
-                                        else 0
-                                    ),
-                                    "speedTrapFastestSpeed": (
-                                        car_lap.speed_trap_fastest_speed
-                                        if hasattr(car_lap, "speed_trap_fastest_speed")
-                                        else 0.0
-                                    ),
-                                    "speedTrapFastestLap": (
-                                        car_lap.speed_trap_fastest_lap
-                                        if hasattr(car_lap, "speed_trap_fastest_lap")
-                                        else 0
-                                    ),
-                                }
-                        logger.debug(
-                            f"Updated lap_data_store for {len(packet.lap_data) if hasattr(packet, 'lap_data') else 'N/A'} cars."
-                        )
-                    elif packet_id == 7:  # CarStatusData
-                        logger.debug(
-                            f"Processing CarStatusData (ID 7). Cars: {len(packet.car_status_data) if hasattr(packet, 'car_status_data') else 'N/A'}"
-                        )
-                        if hasattr(packet, "car_status_data"):
-                            # Ensure car_status_store is initialized correctly
-                            # For now, we'll add basic car status to participant data if needed
-                            for i, status_data in enumerate(packet.car_status_data):
-                                if i < 22 and i < len(participant_data_store):
-                                    # Add some basic status info to participant data
-                                    if participant_data_store[i]:
-                                        participant_data_store[i].update(
-                                            {
-                                                "fuelMix": getattr(
-                                                    status_data, "fuel_mix", 0
-                                                ),
-                                                "frontLeftWingDamage": getattr(
-                                                    status_data,
-                                                    "front_left_wing_damage",
-                                                    0,
-                                                ),
-                                                "frontRightWingDamage": getattr(
-                                                    status_data,
-                                                    "front_right_wing_damage",
-                                                    0,
-                                                ),
-                                                "rearWingDamage": getattr(
-                                                    status_data, "rear_wing_damage", 0
-                                                ),
-                                                "drsAllowed": getattr(
-                                                    status_data, "drs_allowed", 0
-                                                ),
-                                                "tyresWear": [
-                                                    getattr(
-                                                        status_data, "tyres_wear_rl", 0
-                                                    ),
-                                                    getattr(
-                                                        status_data, "tyres_wear_rr", 0
-                                                    ),
-                                                    getattr(
-                                                        status_data, "tyres_wear_fl", 0
-                                                    ),
-                                                    getattr(
-                                                        status_data, "tyres_wear_fr", 0
-                                                    ),
-                                                ],
-                                                "tyreCompound": getattr(
-                                                    status_data,
-                                                    "actual_tyre_compound",
-                                                    0,
-                                                ),
-                                                "vehicleFiaFlags": getattr(
-                                                    status_data, "vehicle_fia_flags", 0
-                                                ),
-                                            }
-                                        )
-                            logger.debug(
-                                f"Updated car status data for {len(packet.car_status_data)} cars"
-                            )
-                else:
-                    logger.warning(
-                        f"Received packet (type: {type(packet)}) but it has no 'header' attribute. Cannot determine packet_id."
-                    )
-
-            except socket.timeout:
-                continue
-            except Exception as e:
-                if stop_event.is_set():
-                    print(
-                        "Telemetry worker: socket error during stop signal, likely normal."
-                    )
-                    break
-                listener_error = f"Error in telemetry worker: {type(e).__name__}: {e}"
-                print(f"ERROR IN TELEMETRY WORKER: {listener_error}")
-                traceback.print_exc()
-                break
-
-        print("UDP Telemetry listener worker signaled to stop or errored.")
-
-    except Exception as e:
-        listener_error = (
-            f"Failed to start/run telemetry listener: {type(e).__name__}: {e}"
+
+# Native handlers keyed by packet ID, called as handler(store, data)
+PACKET_HANDLERS = {
+    PACKET_MOTION: LiveTelemetryStore.apply_motion,
+    PACKET_SESSION: _apply_session_packet,
+    PACKET_LAP_DATA: LiveTelemetryStore.apply_lap_data,
+    PACKET_PARTICIPANTS: LiveTelemetryStore.apply_participants,
+    PACKET_CAR_STATUS: LiveTelemetryStore.apply_car_status,
+    PACKET_CAR_TELEMETRY: LiveTelemetryStore.apply_car_telemetry,
+}
+# Handled packets that leave the store columns untouched, so no snapshot is published
+UNPUBLISHED_PACKET_IDS = frozenset({PACKET_CAR_TELEMETRY})
+
+
+def process_datagram(data: bytes, store: LiveTelemetryStore) -> Optional[bool]:
+    """
+    Filter, decode and store a single raw telemetry datagram.
+
+    Returns True if the packet was processed, False if it was filtered out and
+    None for datagrams too short to carry a header.
+    """
+    arrival_ns = time.perf_counter_ns()
+    if len(data) < HEADER_SIZE:
+        logger.debug(f"Ignoring runt datagram of {len(data)} bytes")
+        return None
+
+    # Filter on the raw header byte before any decoding
+    packet_id = peek_packet_id(data)
+    metrics = store.metrics
+    metrics.on_packet(data, packet_id, arrival_ns)
+    if not packet_filter.allows(packet_id, arrival_ns, store.next_decode_ns):
+        store.packets_filtered += 1
+        metrics.on_filtered(packet_id)
+        return False
+
+    store.packets_processed += 1
+
+    handler = PACKET_HANDLERS.get(packet_id)
+    if handler is not None and is_native_packet(data, packet_id):
+        handler(store, data)
+        if packet_id not in UNPUBLISHED_PACKET_IDS:
+            store.publish()
+        metrics.on_decoded(packet_id, time.perf_counter_ns() - arrival_ns)
+        return True
+
+    packet = decode_with_library(data)
+    metrics.on_decoded(packet_id, time.perf_counter_ns() - arrival_ns)
+    logger.debug(
+        f"Packet ID {packet_id} has no native handler; library fallback returned {type(packet).__name__}"
+    )
+    return True
+
+
+# Every running listener and the per-rig sessions it feeds; each session has its own store
+session_registry = TelemetrySessionRegistry(process_datagram, packet_filter)
+# Turns each session's CarTelemetry ring into per-lap distance traces (started by the app lifespan)
+lap_trace_poller = LapTracePoller(session_registry.list_sessions)
+# Feeds valid laps completed in the game into the standings (started by the app lifespan)
+lap_capture = LapCapture(session_registry.list_sessions, add_lap_times, TEAM_ID_MAP)
+
+SESSION_QUERY = Query(
+    None, description="Telemetry session ID (see /sessions); defaults to the oldest active session"
+)
+
+
+def resolve_session(session_id: Optional[str]) -> Optional[TelemetrySession]:
+    """The requested session (404 if unknown), or the default session when none is named."""
+    session = session_registry.get_session(session_id)
+    if session is None and session_id is not None:
+        raise HTTPException(
+            status_code=404, detail=f"Telemetry session '{session_id}' not found"
         )
-        print(f"ERROR STARTING TELEMETRY LISTENER: {listener_error}")
-        traceback.print_exc()
-    finally:
-        if (
-            listener_instance
-            and hasattr(listener_instance, "socket")
-            and listener_instance.socket
-        ):
-            print("Closing telemetry listener socket.")
-            listener_instance.socket.close()
-        print("Telemetry listener worker finished.")
-
-
-def _clear_listener_state():
-    global listener_thread, listener_stop_event, listener_port, listener_host, listener_error, active_drivers_count
-    global latest_car_positions, participant_data_store, session_data_store, enhanced_session_data_store, lap_data_store
-    global packets_processed_count, packets_filtered_count
-
-    listener_thread = None
-    listener_stop_event = None
-    listener_port = None
-    listener_host = None
-    listener_error = None
-    active_drivers_count = 0
-
-    # Reset telemetry data stores
-    latest_car_positions = [{} for _ in range(22)]
-    participant_data_store = [{} for _ in range(22)]
-    session_data_store = {}
-    enhanced_session_data_store = {}
-    lap_data_store = [{} for _ in range(22)]
-
-    # Reset performance counters
-    packets_processed_count = 0
-    packets_filtered_count = 0
+    return session
 
 
-@telemetry_router.post("/start", response_model=StartResponse)
-async def start_telemetry(port: int = Query(20777, ge=1024, le=65535)):
-    global listener_thread, listener_stop_event, listener_port, listener_host, listener_error, active_drivers_count
+def current_snapshot(session_id: Optional[str] = None) -> TelemetrySnapshot:
+    """Latest telemetry snapshot of a session (the default session if none is named)."""
+    return session_registry.snapshot(session_id)
+
 
+def _snapshot_etag(session: Optional[TelemetrySession], snapshot: TelemetrySnapshot, *extra) -> str:
+    instance = session.instance if session else 0
+    return 'W/"' + "-".join(map(str, (instance, snapshot.version, *extra))) + '"'
+
+
+@telemetry_router.get(
+    "/live_data_v2", response_model=LiveTelemetryResponse, tags=["Telemetry"]
+)
+async def live_data_endpoint(
+    session: Optional[str] = SESSION_QUERY,
+    if_none_match: Optional[str] = Header(None),
+):
+    """Provides live telemetry data including driver positions, names, teams, and session info."""
+    telemetry_session = resolve_session(session)
+    snapshot = current_snapshot(session)
+    etag = _snapshot_etag(telemetry_session, snapshot)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response = await get_full_live_telemetry_data(snapshot)
+    return JSONResponse(content=response.model_dump(), headers={"ETag": etag})
+
+
+@telemetry_router.post("/start", response_model=StartResponse)
+async def start_telemetry(
+    port: int = Query(20777, ge=1024, le=65535),
+    mode: Optional[str] = Query(
+        None,
+        description="Listener backend: 'thread', 'process' or 'asyncio' (TELEMETRY_LISTENER_MODE)",
+    ),
+    extra_ports: List[int] = Query(
+        [], description="Additional UDP ports for the same listener, one session per port"
+    ),
+    routing: str = Query(
+        "port",
+        description="'port': one session per port; 'link': one session per game sessionLinkIdentifier",
+    ),
+    capture: bool = Query(
+        False, description="Record every received datagram to a capture file for later replay"
+    ),
+):
     # Get desired host from environment variable, default to 0.0.0.0
     desired_host = os.getenv("F1_TELEMETRY_LISTENER_HOST", "0.0.0.0")
+    mode = (mode or DEFAULT_LISTENER_MODE).lower()
 
-    if not F1_TELEMETRY_AVAILABLE:
-        raise HTTPException(
-            status_code=500,
-            detail="F1 Telemetry library (f1_24_telemetry) is not installed or available.",
-        )
+    ports = list(dict.fromkeys([port, *extra_ports]))
+    if any(not 1024 <= p <= 65535 for p in ports):
+        raise HTTPException(status_code=400, detail="Ports must be between 1024 and 65535")
+
+    capture_file = None
+    if capture:
+        capture_file = f"{time.strftime('%Y%m%d-%H%M%S')}-{'-'.join(map(str, ports))}{CAPTURE_EXTENSION}"
 
-    if listener_thread and listener_thread.is_alive():
+    try:
+        listener = await session_registry.start_listener(
+            desired_host,
+            ports,
+            mode,
+            routing,
+            capture_path=os.path.join(CAPTURE_DIR, capture_file) if capture_file else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (OSError, RuntimeError) as e:
+        detail = e if isinstance(e, RuntimeError) else f"{type(e).__name__}: {e}"
         raise HTTPException(
-            status_code=400,
-            detail=f"Telemetry listener is already running on host {listener_host}, port {listener_port}",
+            status_code=500, detail=f"Failed to start telemetry listener: {detail}"
         )
 
-    _clear_listener_state()  # Clear any previous error state before starting
-    listener_port = port
-    listener_host = desired_host
-    listener_stop_event = threading.Event()
-
-    listener_thread = threading.Thread(
-        target=telemetry_listener_worker,
-        args=(listener_host, listener_port, listener_stop_event),
-        daemon=True,
+    return StartResponse(
+        message=f"UDP telemetry listener ({mode}) started on host {desired_host}, port{'s' if len(ports) > 1 else ''} {', '.join(map(str, ports))}",
+        host=desired_host,
+        port=port,
+        ports=ports,
+        mode=mode,
+        routing=routing,
+        sessions=[session.session_id for session in listener.sessions],
+        capture_file=capture_file,
     )
-    listener_thread.start()
 
-    await asyncio.sleep(0.5)  # Give thread a moment to initialize
 
-    if listener_error:  # Check if worker thread set an error during startup
-        initial_error = listener_error
-        _clear_listener_state()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to start telemetry listener: {initial_error}",
+@telemetry_router.get("/captures", response_model=List[CaptureInfo])
+async def list_captures():
+    """Capture files available for replay, newest first."""
+    if not os.path.isdir(CAPTURE_DIR):
+        return []
+    recording = {
+        os.path.basename(listener.capture_path)
+        for listener in session_registry.listeners
+        if listener.capture_path
+    }
+    captures = []
+    for entry in os.scandir(CAPTURE_DIR):
+        if not entry.is_file() or not entry.name.endswith(CAPTURE_EXTENSION):
+            continue
+        started_at = None
+        try:
+            with CaptureReader(entry.path) as reader:
+                started_at = reader.started_at
+        except (OSError, ValueError):
+            pass
+        captures.append(
+            CaptureInfo(
+                name=entry.name,
+                size_bytes=entry.stat().st_size,
+                started_at=started_at,
+                recording=entry.name in recording,
+            )
         )
+    captures.sort(key=lambda capture: capture.started_at or 0, reverse=True)
+    return captures
+
+
+@telemetry_router.post("/replay", response_model=ReplayResponse)
+async def replay_telemetry(
+    capture: str = Query(..., description="Capture file name, as listed by /captures"),
+    speed: float = Query(
+        1.0, ge=0, description="Playback rate; 1 is real time, 0 replays as fast as possible"
+    ),
+    loop: bool = Query(False, description="Start over when the capture ends"),
+    routing: str = Query(
+        "port",
+        description="'port': the whole capture feeds one session; 'link': one session per sessionLinkIdentifier",
+    ),
+    session: Optional[str] = Query(
+        None, description="Session ID for routing=port (default: replay-<capture name>)"
+    ),
+):
+    """Feed a recorded capture through the decode path as if it came from the game."""
+    if os.path.basename(capture) != capture or not capture.endswith(CAPTURE_EXTENSION):
+        raise HTTPException(status_code=400, detail="Invalid capture file name")
+    path = os.path.join(CAPTURE_DIR, capture)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"Capture '{capture}' not found")
 
-    if not listener_thread.is_alive():
-        _clear_listener_state()
+    try:
+        listener = await session_registry.start_replay(
+            path, speed or None, loop, routing, session
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OSError as e:
         raise HTTPException(
-            status_code=500,
-            detail=f"Failed to start telemetry listener: Thread did not start.",
+            status_code=500, detail=f"Failed to open capture: {type(e).__name__}: {e}"
         )
 
-    local_ip = get_local_ip()
-    return StartResponse(
-        message=f"UDP telemetry listener started on host {listener_host}, port {listener_port}",
-        host=listener_host,
-        port=listener_port,
+    return ReplayResponse(
+        message=f"Replaying {capture} at {f'{speed:g}x' if speed else 'maximum'} speed",
+        capture=capture,
+        speed=speed or None,
+        loop=loop,
+        routing=routing,
+        sessions=[s.session_id for s in listener.sessions],
     )
 
 
 @telemetry_router.post("/stop")
-async def stop_telemetry():
-    global listener_thread, listener_stop_event
-
-    if not listener_thread or not listener_thread.is_alive() or not listener_stop_event:
+async def stop_telemetry(session: Optional[str] = SESSION_QUERY):
+    """Stop the listener feeding ``session``, or every listener when no session is named."""
+    if session is not None:
+        listeners = [resolve_session(session).listener]
+    else:
+        listeners = list(session_registry.listeners)
+    if not listeners:
         raise HTTPException(
             status_code=400, detail="Telemetry listener is not running."
         )
 
     print("Attempting to stop telemetry listener...")
-    listener_stop_event.set()
-    listener_thread.join(timeout=3.0)  # Wait for the thread to finish
-
-    if listener_thread.is_alive():
-        print("Telemetry listener thread did not stop gracefully after timeout.")
-        # Thread is daemon, so it will be killed if main app exits.
-        # Forcing a socket close might be an option if we had direct access from here.
-        # The worker itself tries to close its socket on stop_event.
-        # Not raising an error here, but logging it.
-        # Client will see success, but server might have lingering thread until socket timeout.
-
-    final_error = (
-        listener_error  # Capture error that might have occurred during shutdown
-    )
-    _clear_listener_state()
+    await session_registry.stop_listeners(listeners)
+
+    errors = []
+    for listener in listeners:
+        final_error = listener.error  # Captures errors that occurred during operation or shutdown
+        if final_error and "Error in telemetry worker" not in final_error:
+            errors.append(final_error)
     print("Telemetry listener stop process completed.")
 
     response_message = "UDP telemetry listener stopped."
-    if final_error and "Error in telemetry worker" not in final_error:
+    if errors:
         # If error is not just a normal stop-related socket error
         response_message += (
-            f" Note: An error occurred during operation or shutdown: {final_error}"
+            f" Note: An error occurred during operation or shutdown: {'; '.join(errors)}"
         )
 
     return {"message": response_message}
 
 
-@telemetry_router.get("/status", response_model=TelemetryStatus)
-async def get_telemetry_status():
-    is_running = listener_thread is not None and listener_thread.is_alive()
+@telemetry_router.get("/sessions", response_model=List[TelemetrySessionSummary])
+async def list_telemetry_sessions():
+    """All live telemetry sessions, oldest first."""
+    now = time.time()
+    summaries = []
+    for session in session_registry.list_sessions():
+        listener = session.listener
+        summaries.append(
+            TelemetrySessionSummary(
+                session_id=session.session_id,
+                port=session.port,
+                mode=listener.mode,
+                routing=listener.routing,
+                running=listener.is_alive(),
+                link_identifier=session.link_identifier,
+                active_drivers=session.snapshot().active_drivers,
+                packets_processed=session.packets_processed,
+                last_packet_age_seconds=(
+                    round(now - session.last_packet_at, 3)
+                    if session.last_packet_at
+                    else None
+                ),
+            )
+        )
+    return summaries
 
-    # Ensure error is cleared if not running and no specific stop error occurred
-    current_error = listener_error
-    if (
-        not is_running
-        and current_error == "Failed to start/run telemetry listener: timed out"
-    ):
-        current_error = None  # Clear timeout error if not running
+
+@telemetry_router.get("/status", response_model=TelemetryStatus)
+async def get_telemetry_status(session: Optional[str] = SESSION_QUERY):
+    telemetry_session = resolve_session(session)
+    # A routing=link listener has no sessions until the first SessionData arrives
+    listener = (
+        telemetry_session.listener
+        if telemetry_session
+        else next(iter(session_registry.listeners), None)
+    )
+    is_running = listener is not None and listener.is_alive()
+    current_error = listener.poll_error() if listener else None
+    active_drivers = telemetry_session.snapshot().active_drivers if telemetry_session else 0
 
     logger.debug(
-        f"[get_telemetry_status] is_running: {is_running}, current active_drivers_count global: {active_drivers_count}"
+        f"[get_telemetry_status] is_running: {is_running}, active drivers: {active_drivers}"
     )
     return TelemetryStatus(
         running=is_running,
-        host=listener_host if is_running else None,
-        port=listener_port if is_running else None,
-        active_drivers=active_drivers_count if is_running else 0,
+        host=listener.host if is_running else None,
+        port=(
+            telemetry_session.port
+            if telemetry_session
+            else next(iter(listener.ports), None)
+        )
+        if is_running
+        else None,
+        ports=listener.ports if is_running else None,
+        mode=listener.mode if is_running else None,
+        session_id=telemetry_session.session_id if telemetry_session else None,
+        active_drivers=active_drivers if is_running else 0,
         error=current_error,
     )
 
 
 @telemetry_router.get("/live_data")
-async def get_live_telemetry_data():
-    global listener_thread, active_drivers_count, listener_error, listener_status_message, latest_car_positions, participant_data_store, session_data_store, lap_data_store
-    logger.debug(f"API /live_data called. Active drivers count: {active_drivers_count}")
-    logger.debug(
-        f"Current participant_data_store (first 2): {dict(list(participant_data_store.items())[:2])}"
-    )
-    logger.debug(
-        f"Current latest_car_positions (first 2): {dict(list(latest_car_positions.items())[:2])}"
-    )
+async def get_live_telemetry_data(
+    session: Optional[str] = SESSION_QUERY,
+    if_none_match: Optional[str] = Header(None),
+):
+    telemetry_session = resolve_session(session)
+    is_running_status = telemetry_session is not None and telemetry_session.listener.is_alive()
+    listener_error = telemetry_session.listener.poll_error() if telemetry_session else None
+    snapshot = current_snapshot(session)
     logger.debug(
-        f"Current lap_data_store (first 2): {dict(list(lap_data_store.items())[:2])}"
+        f"API /live_data called. Active drivers: {snapshot.active_drivers}, listener running: {is_running_status}"
     )
-    logger.debug(f"Current session_data_store: {session_data_store}")
-    drivers = []
-    is_running_status = listener_thread is not None and listener_thread.is_alive()
+
+    # Unchanged since the client's last poll: same snapshot and listener state
+    etag = _snapshot_etag(telemetry_session, snapshot, int(is_running_status))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
 
     drivers_combined = []
     if is_running_status:
-        for i in range(22):  # Iterate up to max 22 cars
-            # Use .get(i, {}) on lists that might not be fully populated to avoid IndexError
-            # Or ensure they are always initialized to 22 empty dicts
-            participant_info = (
-                participant_data_store[i]
-                if i < len(participant_data_store) and participant_data_store[i]
-                else {}
-            )
-            position_info = (
-                latest_car_positions[i]
-                if i < len(latest_car_positions) and latest_car_positions[i]
-                else {}
-            )
-            lap_info = (
-                lap_data_store[i]
-                if i < len(lap_data_store) and lap_data_store[i]
-                else {}
+        count = snapshot.active_count()
+        participants = snapshot.participant_records(count)
+        positions = (
+            snapshot.records(MOTION_KEYS, count)
+            if snapshot.motion_received
+            else [{}] * count
+        )
+        laps = (
+            snapshot.records(LAP_DATA_KEYS, count)
+            if snapshot.lap_data_received
+            else [{}] * count
+        )
+        for i, participant_info in enumerate(participants):
+            drivers_combined.append(
+                {
+                    **participant_info,
+                    "position_data": positions[i],  # Nest position data
+                    "lap_data": laps[i],  # Nest lap data
+                    "car_index": i,  # Add car_index for reference
+                }
             )
 
-            # Only add driver if essential participant data exists (e.g., name or teamId is present)
-            if (
-                participant_info.get("name")
-                or participant_info.get("teamId") is not None
-            ):
-                drivers_combined.append(
-                    {
-                        **participant_info,
-                        "position_data": position_info,  # Nest position data
-                        "lap_data": lap_info,  # Nest lap data
-                        "car_index": i,  # Add car_index for reference
-                    }
-                )
-            elif (
-                not any(participant_info.values())
-                and not any(position_info.values())
-                and not any(lap_info.values())
-            ):
-                # If all data for this index is empty, we can skip or add a placeholder
-                # For now, we only add if participant_info.get('name') is present
-                pass  # Or add placeholder: drivers_combined.append({'car_index': i, 'status': 'inactive'})
-
     response_data = {
-        "session": session_data_store if is_running_status else {},
+        "session": snapshot.session if is_running_status else {},
         "drivers": drivers_combined,
-        "active_drivers": active_drivers_count if is_running_status else 0,
+        "active_drivers": snapshot.active_drivers if is_running_status else 0,
         "is_running": is_running_status,
         "error": listener_error if listener_error else None,
+        "version": snapshot.version,
+        "session_id": telemetry_session.session_id if telemetry_session else None,
     }
     logger.debug(
         f"API /live_data returning {len(drivers_combined)} drivers. Listener status: {is_running_status}"
     )
-    logger.debug(f"API /live_data full response: {response_data}")
-    from fastapi.responses import JSONResponse
+    return JSONResponse(content=response_data, headers={"ETag": etag})
+
+
+@telemetry_router.get("/traces/{car_index}", response_model=CarTraceResponse)
+async def get_car_trace(
+    car_index: int = Path(..., ge=0, lt=MAX_CARS),
+    seconds: Optional[float] = Query(
+        None, gt=0, description="Last N seconds of session time (default: everything buffered)"
+    ),
+    hz: Optional[float] = Query(
+        None, gt=0, le=TRACE_MAX_RATE_HZ, description="Downsample to at most this many samples per second"
+    ),
+    after: Optional[int] = Query(None, ge=0, description="Only samples newer than this cursor"),
+    session: Optional[str] = SESSION_QUERY,
+):
+    """Speed, throttle, brake, steering, gear, RPM and DRS history of one car."""
+    telemetry_session = resolve_session(session)
+    cursor, columns = session_registry.traces(session).read(car_index, seconds, hz, after)
+    names = current_snapshot(session).names
+    content = {
+        "session_id": telemetry_session.session_id if telemetry_session else None,
+        "car_index": car_index,
+        "name": names[car_index] if car_index < len(names) else "",
+        "cursor": cursor,
+        "samples": len(columns["session_time"]),
+        **trace_columns_to_json(columns),
+    }
+    # Thousands of samples per channel; skip re-validating them through the model
+    return JSONResponse(content=content)
+
 
-    return JSONResponse(content=response_data)
+def _lap_trace_json(trace: LapTrace, count: Optional[int] = None) -> dict:
+    channels = trace.channels(count)
+    return {
+        "car_index": trace.car_index,
+        "lap": trace.lap,
+        "name": trace.name,
+        "lap_time_ms": trace.lap_time_ms,
+        "grid_step_m": trace.grid_step_m,
+        "points": len(channels["time"]),
+        **{
+            name: (
+                np.round(values.astype(np.float64), 3) if values.dtype.kind == "f" else values
+            ).tolist()
+            for name, values in channels.items()
+        },
+    }
+
+
+def _find_lap_trace(telemetry_session: Optional[TelemetrySession], car_index: int, lap: str) -> LapTrace:
+    """A recorded lap (a number or 'fastest') of a car; 404 if it wasn't recorded."""
+    if lap != "fastest" and not lap.isdigit():
+        raise HTTPException(status_code=400, detail="lap must be a lap number or 'fastest'")
+    trace = (
+        telemetry_session.lap_traces.get(car_index, None if lap == "fastest" else int(lap))
+        if telemetry_session
+        else None
+    )
+    if trace is None:
+        raise HTTPException(
+            status_code=404, detail=f"No recorded trace for lap '{lap}' of car {car_index}"
+        )
+    return trace
+
+
+@telemetry_router.get("/laps/compare", response_model=LapCompareResponse)
+async def compare_lap_traces(
+    car_a: int = Query(..., ge=0, lt=MAX_CARS),
+    car_b: int = Query(..., ge=0, lt=MAX_CARS),
+    lap_a: str = Query("fastest", description="Lap number or 'fastest'"),
+    lap_b: str = Query("fastest", description="Lap number or 'fastest'"),
+    session: Optional[str] = SESSION_QUERY,
+):
+    """Overlay two recorded laps point by point on the lap-distance grid."""
+    telemetry_session = resolve_session(session)
+    a = _find_lap_trace(telemetry_session, car_a, lap_a)
+    b = _find_lap_trace(telemetry_session, car_b, lap_b)
+    count, deltas = compare_laps(a, b)
+    content = {
+        "session_id": telemetry_session.session_id,
+        "grid_step_m": a.grid_step_m,
+        "points": count,
+        "a": _lap_trace_json(a, count),
+        "b": _lap_trace_json(b, count),
+        **{f"delta_{name}": np.round(values, 3).tolist() for name, values in deltas.items()},
+    }
+    return JSONResponse(content=content)
+
+
+@telemetry_router.get("/laps/{car_index}", response_model=DriverLapTracesResponse)
+async def list_lap_traces(
+    car_index: int = Path(..., ge=0, lt=MAX_CARS),
+    session: Optional[str] = SESSION_QUERY,
+):
+    """Laps of one car with a recorded distance trace."""
+    telemetry_session = resolve_session(session)
+    recorder = telemetry_session.lap_traces if telemetry_session else None
+    traces = recorder.laps.get(car_index, {}) if recorder else {}
+    fastest = recorder.fastest.get(car_index) if recorder else None
+    names = current_snapshot(session).names
+    return DriverLapTracesResponse(
+        session_id=telemetry_session.session_id if telemetry_session else None,
+        car_index=car_index,
+        name=names[car_index] if car_index < len(names) else "",
+        grid_step_m=recorder.grid_step_m if recorder else get_grid_step_m(),
+        laps=[
+            LapTraceSummary(
+                lap=trace.lap,
+                lap_time_ms=trace.lap_time_ms,
+                points=len(trace.points),
+                fastest=trace.lap == fastest,
+            )
+            for trace in sorted(traces.values(), key=lambda t: t.lap)
+        ],
+    )
+
+
+@telemetry_router.get("/laps/{car_index}/{lap}", response_model=LapTraceResponse)
+async def get_lap_trace(
+    car_index: int = Path(..., ge=0, lt=MAX_CARS),
+    lap: str = Path(..., description="Lap number or 'fastest'"),
+    session: Optional[str] = SESSION_QUERY,
+):
+    """One recorded lap of a car on the lap-distance grid."""
+    trace = _find_lap_trace(resolve_session(session), car_index, lap)
+    return JSONResponse(content=_lap_trace_json(trace))
+
+
+@telemetry_router.get("/timing", response_model=TimingResponse)
+async def get_live_timing_tower(session: Optional[str] = SESSION_QUERY):
+    """Live gap to the leader and interval to the car ahead for every car."""
+    telemetry_session = resolve_session(session)
+    snapshot = current_snapshot(session)
+    return TimingResponse(
+        session_id=telemetry_session.session_id if telemetry_session else None,
+        version=snapshot.version,
+        cars=build_timing_tower(snapshot),
+    )
 
 
 @telemetry_router.get("/stats", response_model=TelemetryStats)
-async def get_telemetry_stats():
+async def get_telemetry_stats(session: Optional[str] = SESSION_QUERY):
     """Get telemetry performance statistics and packet filtering information."""
-    global packets_processed_count, packets_filtered_count
-
-    return TelemetryStats(
-        packets_processed=packets_processed_count,
-        packets_filtered=packets_filtered_count,
-        filtering_enabled=ENABLE_PACKET_FILTERING,
+    telemetry_session = resolve_session(session)
+    enabled = packet_filter.enabled_ids()
+    stats = TelemetryStats(
+        filtering_enabled=len(enabled) < NUM_PACKET_IDS,
         essential_packets=list(ESSENTIAL_PACKET_IDS),
         optional_packets=list(OPTIONAL_PACKET_IDS),
+        enabled_packets=enabled,
+        packet_rates={
+            packet_id: packet_filter.max_rate_hz(packet_id)
+            for packet_id in range(NUM_PACKET_IDS)
+            if packet_filter.min_interval_ns[packet_id]
+        },
     )
+    if telemetry_session is None:
+        return stats
+
+    listener = telemetry_session.listener
+    stats.packets_processed = telemetry_session.packets_processed
+    stats.packets_filtered = telemetry_session.packets_filtered
+    stats.listener_mode = listener.mode
+    stats.session_id = telemetry_session.session_id
+    if listener.process is not None:
+        stats.ipc_lag_ms = listener.process.ipc_lag_ms
+        stats.ipc_lag_avg_ms = listener.process.ipc_lag_avg_ms
+    return stats
+
+
+def packet_filter_response() -> PacketFilterResponse:
+    return PacketFilterResponse(
+        generation=packet_filter.generation,
+        packets=[
+            PacketFilterEntry(
+                packet_id=packet_id,
+                name=PACKET_NAMES.get(packet_id, f"Packet{packet_id}"),
+                enabled=packet_filter.enabled[packet_id],
+                max_rate_hz=packet_filter.max_rate_hz(packet_id),
+                native=packet_id in NATIVE_PACKET_IDS,
+            )
+            for packet_id in range(NUM_PACKET_IDS)
+        ],
+    )
+
+
+@telemetry_router.get("/filter", response_model=PacketFilterResponse)
+async def get_packet_filter():
+    """Which packet types are decoded, and their max decode rates."""
+    return packet_filter_response()
+
+
+@telemetry_router.put("/filter", response_model=PacketFilterResponse)
+async def update_packet_filter(update: PacketFilterUpdate):
+    """Enable/disable packet types and set max decode rates on running listeners."""
+    try:
+        packet_filter.configure(update.enable, update.disable, update.rates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    session_registry.apply_packet_filter()
+    logger.info(
+        f"Packet filter updated (generation {packet_filter.generation}): "
+        f"enabled {packet_filter.enabled_ids()}"
+    )
+    return packet_filter_response()
+
+
+@telemetry_router.get("/stats/packets", response_model=PacketStatsResponse)
+async def get_packet_stats(session: Optional[str] = SESSION_QUERY):
+    """Per-packet-type counts, bytes, decode time, inter-arrival jitter and loss estimates."""
+    telemetry_session = resolve_session(session)
+    if telemetry_session is None:
+        return PacketStatsResponse()
+
+    listener = telemetry_session.listener
+    ports = [telemetry_session.port] if listener.routing == "port" else listener.ports
+    queues = udp_socket_queues(ports)
+    return PacketStatsResponse(
+        session_id=telemetry_session.session_id,
+        listener_mode=listener.mode,
+        packets=[PacketTypeStats(**summary) for summary in packet_summaries(telemetry_session.metrics())],
+        sockets=[
+            SocketQueueStats(port=port, rx_queue_bytes=queued, drops=drops)
+            for port, (queued, drops) in sorted(queues.items())
+        ],
+        packets_unrouted=listener.packets_unrouted,
+    )
+
+
+@telemetry_router.get("/metrics", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """Listener metrics for every session in the Prometheus text format."""
+    writer = PrometheusWriter()
+    for telemetry_session in session_registry.list_sessions():
+        session_id = telemetry_session.session_id
+        writer.add_packet_metrics(session_id, telemetry_session.metrics())
+        process = telemetry_session.listener.process
+        if process is not None and process.ipc_lag_ms is not None:
+            writer.sample(
+                "ipc_lag_seconds",
+                "gauge",
+                "Age of the listener process's newest snapshot when the API read it",
+                {"session": session_id},
+                process.ipc_lag_ms / 1000,
+            )
+    for listener in list(session_registry.listeners):
+        if listener.routing == "link":
+            writer.sample(
+                "packets_unrouted_total",
+                "counter",
+                "Datagrams that arrived before their game session was identified",
+                {"ports": ",".join(map(str, listener.ports))},
+                listener.packets_unrouted,
+            )
+    ports = [port for listener in session_registry.listeners for port in listener.ports]
+    writer.add_socket_queues(udp_socket_queues(ports))
+    return PlainTextResponse(writer.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 
 @telemetry_router.get("/session", response_model=dict)
-async def get_enhanced_session_data():
+async def get_enhanced_session_data(session: Optional[str] = SESSION_QUERY):
     """Get enhanced session data including session type information."""
-    global enhanced_session_data_store, session_data_store
-
+    resolve_session(session)
     # Return enhanced session data if available, otherwise basic session data
-    session_data = (
-        enhanced_session_data_store
-        if enhanced_session_data_store
-        else session_data_store
-    )
+    snapshot = current_snapshot(session)
+    session_data = snapshot.enhanced_session or snapshot.session
 
     return {
         "session_data": session_data,
         "session_types": SESSION_TYPE_MAP,
-        "is_enhanced": bool(enhanced_session_data_store),
+        "is_enhanced": bool(snapshot.enhanced_session),
     }
 
 
@@ -1,3 +1,5 @@
+import asyncio
+import json
 import logging
 import os
 from contextlib import asynccontextmanager
@@ -13,6 +15,7 @@ from fastapi import WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 
 # Import models and CRUD operations
@@ -44,7 +47,20 @@ from app.services.crud import (
 )
 from app.utils.helpers import generate_csv_content, update_overall_fastest_lap
 from app.services.websocket import ConnectionManager
+from app.services.position_broadcaster import PositionBroadcaster, POSITIONS_CHANNEL
+from app.services.trace_broadcaster import TraceBroadcaster, TRACES_CHANNEL, trace_channel_for
+from app.services.timing_broadcaster import TimingBroadcaster, TIMING_CHANNEL
 from app.services.track_service import track_service
+from app.services.track_cache import prewarm_track_cache
+from app.api.telemetry import (
+    get_live_positions,
+    get_live_roster,
+    get_live_timing,
+    get_live_traces,
+    lap_capture,
+    lap_trace_poller,
+    session_registry,
+)
 from app.dependencies.auth import check_admin_auth_middleware, get_current_user
 
 # Configure logging based on DEBUG environment variable
@@ -66,6 +82,19 @@ if not debug_mode:
 # Create the WebSocket connection manager
 manager = ConnectionManager()
 
+# Pushes live car positions to subscribed /ws clients at LIVE_POSITIONS_HZ
+position_broadcaster = PositionBroadcaster(
+    manager,
+    get_live_positions,
+    get_live_roster,
+    # Quantise positions against the current track outline once it has been loaded
+    bounds_source=lambda: track_service.get_position_bounds(app_data.track_name),
+)
+# Streams a car's speed/throttle/brake trace to /ws clients subscribed to it
+trace_broadcaster = TraceBroadcaster(manager, get_live_traces)
+# Pushes the gap/interval timing tower to /ws clients at up to LIVE_TIMING_HZ
+timing_broadcaster = TimingBroadcaster(manager, get_live_timing)
+
 
 # --- Lifespan Management ---
 @asynccontextmanager
@@ -74,8 +103,28 @@ async def lifespan(app: FastAPI):
     # --- Add startup logic here ---
     # Assign the manager to crud.py
     set_websocket_manager(manager)
+    # Compile or map every circuit now so the first /api/track/data is as fast as the rest
+    try:
+        await asyncio.to_thread(prewarm_track_cache, track_service)
+    except Exception as e:
+        logger.warning(f"Track prewarm failed; circuits will load on first use: {e}")
+    track_service.refresh_track_index()
+    track_service.start_watching()
+    position_broadcaster.start()
+    trace_broadcaster.start()
+    timing_broadcaster.start()
+    lap_trace_poller.start()
+    lap_capture.start()
     yield
     # --- Add shutdown logic here ---
+    # Listeners first: closes capture files and frees listener processes' shared memory
+    await session_registry.stop_all()
+    await position_broadcaster.stop()
+    await trace_broadcaster.stop()
+    await timing_broadcaster.stop()
+    await lap_trace_poller.stop()
+    await lap_capture.stop()
+    await track_service.stop_watching()
     logger.info("Application shutdown...")
 
 
@@ -105,7 +154,32 @@ async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
         while True:
-            await websocket.receive_text()
+            # Clients opt in to high-rate channels, e.g. {"action": "subscribe", "channel": "positions"}
+            # or {"action": "subscribe", "channel": "car_telemetry", "car": 3, "hz": 10}
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            if not isinstance(message, dict):
+                continue
+            channel = message.get("channel")
+            if message.get("action") == "subscribe" and channel == POSITIONS_CHANNEL:
+                manager.subscribe(websocket, channel)
+                position_broadcaster.request_roster()
+            elif message.get("action") == "subscribe" and channel == TIMING_CHANNEL:
+                manager.subscribe(websocket, channel)
+                timing_broadcaster.request_tower()
+            elif message.get("action") == "subscribe" and channel == TRACES_CHANNEL:
+                car_channel = trace_channel_for(message)
+                if car_channel:
+                    manager.subscribe(websocket, car_channel)
+            elif message.get("action") == "unsubscribe" and channel == TRACES_CHANNEL:
+                # Drops one car's traces, or every car's when no car is given
+                car = message.get("car")
+                prefix = f"{TRACES_CHANNEL}:{car}:" if car is not None else f"{TRACES_CHANNEL}:"
+                manager.unsubscribe_prefix(websocket, prefix)
+            elif message.get("action") == "unsubscribe" and channel:
+                manager.unsubscribe(websocket, channel)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
         logger.info(f"Client disconnected")
@@ -118,7 +192,8 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     logger.error(f"Validation error for request {request.url}: {exc.errors()}")
     return JSONResponse(
         status_code=422,
-        content={"detail": exc.errors()},
+        # Validators' exceptions sit in the errors' ctx; send them as their message
+        content={"detail": jsonable_encoder(exc.errors(), custom_encoder={Exception: str})},
     )
 
 
@@ -1,6 +1,7 @@
 import logging
+import math
 from typing import Dict, List, Optional, Union
-from pydantic import BaseModel, Field, field_validator, computed_field
+from pydantic import BaseModel, Field, computed_field, field_validator, model_validator
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -9,50 +10,48 @@ logger = logging.getLogger(__name__)
 # --- Internal Data Structures ---
 
 
+# Lap and sector times are stored as int32 milliseconds (lap_history.LAP_RECORD)
+MAX_LAP_TIME_MS = 2**31 - 1
+
+
+def parse_lap_time_ms(time_str: str) -> int:
+    """
+    Parses a lap time string to integer milliseconds.
+    Accepts mm:ss.sss, mm.ss.sss, ss.sss and plain seconds; raises ValueError otherwise.
+    """
+    time_str = time_str.strip()
+    try:
+        if ":" in time_str:
+            parts = time_str.split(":")
+            seconds = float(parts[0]) * 60.0 + float(parts[1])
+        elif time_str.count(".") == 2:  # mm.ss.sss format (common in games)
+            minutes, secs, fraction = time_str.split(".")
+            seconds = float(minutes) * 60.0 + float(secs) + float(f"0.{fraction}")
+        else:  # ss.sss or plain seconds
+            seconds = float(time_str)
+    except (ValueError, IndexError):
+        raise ValueError(
+            f"Time must be in a recognizable format (mm:ss.sss, mm.ss.sss, ss.sss, or seconds): {time_str!r}"
+        )
+    if not math.isfinite(seconds) or seconds < 0:
+        raise ValueError(f"Lap time out of range: {time_str!r}")
+    time_ms = int(round(seconds * 1000))
+    if time_ms > MAX_LAP_TIME_MS:
+        raise ValueError(f"Lap time out of range: {time_str!r}")
+    return time_ms
+
+
 class LapTime(BaseModel):
     time: str  # Store as original string e.g., "1:23.456" or "83.456"
+    # Parsed once from time unless given; all comparisons use it
+    time_ms: int = Field(default_factory=lambda data: parse_lap_time_ms(data["time"]))
     is_fastest: bool = False
 
-    # Use computed_field for calculations without storing extra state
     @computed_field
     @property
     def time_seconds(self) -> float:
-        """Calculates lap time in seconds for comparison."""
-        time_str = self.time
-        if ":" in time_str:
-            try:
-                parts = time_str.split(":")
-                minutes = float(parts[0])
-                seconds = float(parts[1])
-                return minutes * 60.0 + seconds
-            except (ValueError, IndexError):
-                logger.warning(f"Could not parse time with colon: {time_str}")
-                return float("inf")
-        elif "." in time_str:
-            try:
-                parts = time_str.split(".")
-                if len(parts) == 3:  # mm.ss.sss format (common in games)
-                    minutes = float(parts[0])
-                    seconds = float(parts[1])
-                    millis = float(f"0.{parts[2]}")
-                    return minutes * 60.0 + seconds + millis
-                elif len(parts) == 2:  # ss.sss format
-                    # Handle potential whole second part correctly
-                    sec_part = float(parts[0])
-                    millis_part = float(f"0.{parts[1]}")
-                    return sec_part + millis_part
-                else:  # Unexpected format with dots
-                    logger.warning(f"Unexpected dot format: {time_str}")
-                    return float(time_str)  # Attempt direct parse
-            except (ValueError, IndexError):
-                logger.warning(f"Could not parse time with dot: {time_str}")
-                return float("inf")
-        else:  # Assume plain seconds
-            try:
-                return float(time_str)
-            except ValueError:
-                logger.warning(f"Could not parse plain time: {time_str}")
-                return float("inf")
+        """Lap time in seconds (kept for API compatibility)."""
+        return self.time_ms / 1000.0
 
 
 class Driver(BaseModel):
@@ -66,10 +65,7 @@ class Driver(BaseModel):
         new_lap = LapTime(time=new_lap_time_str)
         self.team = new_team  # Update team regardless
 
-        if (
-            self.fastest_lap is None
-            or new_lap.time_seconds < self.fastest_lap.time_seconds
-        ):
+        if self.fastest_lap is None or new_lap.time_ms < self.fastest_lap.time_ms:
             # New lap is faster or it's the first lap
             self.fastest_lap = new_lap
             return True  # Indicates lap was updated
@@ -91,19 +87,19 @@ class LapTimeInput(BaseModel):
     name: str  # Matches frontend 'name'
     team: str  # "RedBull" or "McLaren"
     time: str  # e.g., "1:23.456" or "83.456" or "1.23.456"
+    # Normalised from time on input; any value sent by the client is replaced
+    time_ms: int = Field(-1, description="Lap time in milliseconds, parsed from time")
+    # Optional detail kept in the driver's lap history (filled in for captured laps)
+    lap_number: int = Field(0, ge=0, le=65535, description="In-game lap number")
+    sector1_ms: int = Field(0, ge=0, le=MAX_LAP_TIME_MS, description="Sector 1 time in milliseconds")
+    sector2_ms: int = Field(0, ge=0, le=MAX_LAP_TIME_MS, description="Sector 2 time in milliseconds")
+    invalid: bool = Field(False, description="Invalid laps are kept in the history only")
+    captured: bool = Field(False, description="Captured from telemetry")
 
-    @field_validator("time")
-    def validate_time_format(cls, v):
-        # Basic validation - more strict parsing happens in LapTime model
-        if not any(c in v for c in ":."):
-            try:
-                float(v)  # Check if it's convertible to float if no separators
-            except ValueError:
-                raise ValueError(
-                    "Time must be in a recognizable format (mm:ss.sss, mm.ss.sss, ss.sss, or seconds)"
-                )
-        # Allow formats with separators
-        return v
+    @model_validator(mode="after")
+    def parse_time(self):
+        self.time_ms = parse_lap_time_ms(self.time)
+        return self
 
 
 class LapTimeDeleteInput(BaseModel):
@@ -164,6 +160,46 @@ class DriverResponse(BaseModel):
     world_z: Optional[float] = Field(None, description="World Z coordinate of the car")
 
 
+class LapRecordResponse(BaseModel):
+    """One lap from a driver's lap history."""
+
+    index: int = Field(..., description="Position in the driver's history, from 0")
+    lap_number: int = Field(0, description="In-game lap number; 0 for manual entries")
+    time: str
+    time_ms: int
+    sector1_ms: Optional[int] = None
+    sector2_ms: Optional[int] = None
+    sector3_ms: Optional[int] = None
+    invalid: bool = False
+    captured: bool = False
+    deleted: bool = False
+    personal_best: bool = Field(False, description="Best valid lap at the time it was set")
+
+
+class LapHistoryResponse(BaseModel):
+    """A page of a driver's lap history, oldest first."""
+
+    name: str
+    total: int = Field(..., description="Laps matching the filters")
+    offset: int
+    limit: int
+    laps: List[LapRecordResponse] = Field(default_factory=list)
+
+
+class LapStatsResponse(BaseModel):
+    """Running stats over a driver's valid laps."""
+
+    name: str
+    laps: int = Field(..., description="All recorded laps, including invalid and deleted ones")
+    valid_laps: int
+    best_time: Optional[str] = None
+    best_ms: Optional[int] = None
+    mean_ms: Optional[float] = None
+    stddev_ms: Optional[float] = None
+    last: List[LapRecordResponse] = Field(default_factory=list, description="Last N valid laps")
+    last_mean_ms: Optional[float] = None
+
+
 class User(BaseModel):
     """Represents a user/driver with their assigned team."""
 
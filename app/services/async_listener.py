@@ -0,0 +1,93 @@
+"""
+asyncio UDP telemetry listener.
+
+Each port gets a datagram endpoint on the running event loop, and datagrams
+are decoded inline in ``datagram_received``; the native decoder takes tens of
+microseconds per packet, so there is no thread hop or blocking socket to wait
+on. Starting binds every port up front and stopping just closes the
+transports, so both are immediate.
+"""
+
+import asyncio
+import logging
+import socket
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryDatagramProtocol(asyncio.DatagramProtocol):
+    """Hands every datagram received on one port to the decode callback."""
+
+    def __init__(self, port: int, on_datagram: Callable[[bytes, int], None]):
+        self.port = port
+        self.on_datagram = on_datagram
+        self.packets_received = 0
+        self.last_error: Optional[str] = None
+
+    def datagram_received(self, data: bytes, addr):
+        self.packets_received += 1
+        try:
+            self.on_datagram(data, self.port)
+        except Exception as e:
+            # One bad datagram must not take the endpoint down
+            logger.exception(f"Error processing telemetry datagram on port {self.port}: {e}")
+
+    def error_received(self, exc: Exception):
+        self.last_error = f"{type(exc).__name__}: {exc}"
+        logger.debug(f"UDP error on telemetry port {self.port}: {exc}")
+
+
+class AsyncUdpListener:
+    """Listens for telemetry on one or more UDP ports from the event loop."""
+
+    def __init__(self, host: str, ports: List[int], on_datagram: Callable[[bytes, int], None]):
+        self.host = host
+        self.ports = ports
+        self.on_datagram = on_datagram
+        self.transports: Dict[int, asyncio.DatagramTransport] = {}
+        self.protocols: Dict[int, TelemetryDatagramProtocol] = {}
+
+    async def start(self):
+        """Bind every port; if any bind fails, close the ones already open and re-raise."""
+        loop = asyncio.get_running_loop()
+        try:
+            for port in self.ports:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                try:
+                    sock.bind((self.host, port))
+                except OSError:
+                    sock.close()
+                    raise
+                transport, protocol = await loop.create_datagram_endpoint(
+                    lambda port=port: TelemetryDatagramProtocol(port, self.on_datagram),
+                    sock=sock,
+                )
+                self.transports[port] = transport
+                self.protocols[port] = protocol
+        except Exception:
+            self.stop()
+            raise
+        logger.info(
+            f"asyncio UDP telemetry listener started on {self.host}, ports {', '.join(map(str, self.ports))}"
+        )
+
+    def stop(self):
+        for transport in self.transports.values():
+            transport.close()
+        self.transports.clear()
+
+    def is_alive(self) -> bool:
+        return bool(self.transports) and not any(
+            transport.is_closing() for transport in self.transports.values()
+        )
+
+    def last_error(self) -> Optional[str]:
+        for protocol in self.protocols.values():
+            if protocol.last_error:
+                return protocol.last_error
+        return None
+
+    def packets_received(self) -> Dict[int, int]:
+        return {port: protocol.packets_received for port, protocol in self.protocols.items()}
@@ -0,0 +1,222 @@
+"""
+Fixed-size history of CarTelemetry samples for every car.
+
+Each CarTelemetry packet fills one slot of a preallocated ring: the header's
+session time and frame, the 22 raw CarTelemetryData records copied verbatim
+(one memcpy, decoded only when read), and every car's lap distance and lap
+number from the latest LapData. The ring never grows, so memory use is
+constant however long a session runs; the oldest samples are overwritten.
+
+The ring and its sample counter can live in any buffer, such as a listener
+process's shared memory block. There is one writer; readers take no lock and
+instead discard any slot the writer may have reused while they were copying.
+"""
+
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.services.telemetry_decoder import (
+    CAR_TELEMETRY,
+    HEADER_SIZE,
+    MAX_CARS,
+    SESSION_TIME_AND_FRAME,
+    SESSION_TIME_OFFSET,
+)
+
+logger = logging.getLogger(__name__)
+
+# The game sends CarTelemetry at up to 60 Hz; rings are sized for that rate
+TRACE_MAX_RATE_HZ = 60
+DEFAULT_TRACE_SECONDS = 60
+MAX_TRACE_SECONDS = 600
+
+# Channels returned for each sample, besides session_time/lap_distance/lap
+TRACE_CHANNELS = CAR_TELEMETRY.names
+_CAR_BYTES = CAR_TELEMETRY.itemsize
+_ROUNDING = {"session_time": 3, "lap_distance": 2, "throttle": 3, "brake": 3, "steer": 3}
+
+TRACE_SLOT = np.dtype(
+    [
+        ("session_time", "<f4"),
+        ("frame", "<u4"),
+        ("lap_distance", "<f4", (MAX_CARS,)),
+        ("lap", "u1", (MAX_CARS,)),
+        ("cars", "u1", (MAX_CARS * _CAR_BYTES,)),  # Raw CarTelemetryData records
+    ]
+)
+_COUNTER_BYTES = 8  # Samples ever written (u64), ahead of the slots
+# Byte offsets within a slot; session_time and frame are in header order, so copied as one
+_LAP_DISTANCE = TRACE_SLOT.fields["lap_distance"][1]
+_LAP = TRACE_SLOT.fields["lap"][1]
+_CARS = TRACE_SLOT.fields["cars"][1]
+BUCKET_EPSILON = 1e-3  # Fraction of a downsampling bucket
+
+TraceColumns = Dict[str, np.ndarray]
+
+
+def get_trace_seconds() -> float:
+    """Read CAR_TELEMETRY_TRACE_SECONDS from the environment, clamped to 1-600 s."""
+    try:
+        seconds = float(os.getenv("CAR_TELEMETRY_TRACE_SECONDS", DEFAULT_TRACE_SECONDS))
+    except ValueError:
+        logger.warning("Invalid CAR_TELEMETRY_TRACE_SECONDS, using the default history")
+        seconds = DEFAULT_TRACE_SECONDS
+    return min(max(seconds, 1.0), MAX_TRACE_SECONDS)
+
+
+def trace_capacity() -> int:
+    """Slots needed to hold CAR_TELEMETRY_TRACE_SECONDS at the maximum send rate."""
+    return int(get_trace_seconds() * TRACE_MAX_RATE_HZ)
+
+
+def traces_nbytes(capacity: int) -> int:
+    return _COUNTER_BYTES + capacity * TRACE_SLOT.itemsize
+
+
+def downsample(times: np.ndarray, hz: float, after_time: Optional[float] = None) -> np.ndarray:
+    """
+    Indices of the first sample in each 1/hz bucket of ``times``.
+
+    Buckets sit on a fixed grid of session time, so consecutive calls line up;
+    the bucket holding ``after_time`` (already sent) is skipped.
+    """
+    # Session times are float32, so samples on a bucket edge can land just short of it
+    buckets = np.floor(times.astype(np.float64) * hz + BUCKET_EPSILON).astype(np.int64)
+    keep = np.ones(len(buckets), dtype=bool)
+    keep[1:] = buckets[1:] != buckets[:-1]
+    if after_time is not None and len(buckets):
+        keep &= buckets != np.floor(after_time * hz + BUCKET_EPSILON)
+    return np.flatnonzero(keep)
+
+
+def trace_columns_to_json(columns: TraceColumns) -> Dict[str, list]:
+    """Columns as plain lists, with floats rounded to a sensible precision."""
+    result = {}
+    for name, values in columns.items():
+        digits = _ROUNDING.get(name)
+        if digits is not None:
+            values = np.round(values.astype(np.float64), digits)
+        result[name] = values.tolist()
+    return result
+
+
+class CarTelemetryTraces:
+    """Ring buffer of CarTelemetry samples for all cars; one writer, lock-free readers."""
+
+    def __init__(self, capacity: Optional[int] = None, buffer=None):
+        self.capacity = capacity or trace_capacity()
+        nbytes = traces_nbytes(self.capacity)
+        if buffer is None:
+            raw = np.zeros(nbytes, dtype=np.uint8)
+        else:
+            raw = np.frombuffer(buffer, dtype=np.uint8, count=nbytes)
+        self._written = raw[:_COUNTER_BYTES].view(np.uint64)
+        self._bytes = memoryview(raw)  # Writes are plain slice copies
+        slots = raw[_COUNTER_BYTES:].view(TRACE_SLOT)
+        self._session_time = slots["session_time"]
+        self._frame = slots["frame"]
+        self._lap_distance = slots["lap_distance"]
+        self._lap = slots["lap"]
+        self._cars = slots["cars"]
+
+    @property
+    def written(self) -> int:
+        """Samples appended since the last reset (a cursor for ``read(after=...)``)."""
+        return int(self._written[0])
+
+    def reset(self):
+        self._written[0] = 0
+
+    def release(self):
+        """Drop the views of the backing buffer so shared memory can be closed."""
+        self._bytes.release()
+        self._written = self._bytes = self._session_time = self._frame = None
+        self._lap_distance = self._lap = self._cars = None
+
+    # --- Writer (listener side) ---
+
+    def append(self, data: bytes, lap_distance: np.ndarray, lap: np.ndarray):
+        """Store one CarTelemetry packet with each car's current lap distance and lap."""
+        written = int(self._written[0])
+        base = _COUNTER_BYTES + (written % self.capacity) * TRACE_SLOT.itemsize
+        buf = self._bytes
+        buf[base : base + SESSION_TIME_AND_FRAME.size] = data[
+            SESSION_TIME_OFFSET : SESSION_TIME_OFFSET + SESSION_TIME_AND_FRAME.size
+        ]
+        buf[base + _LAP_DISTANCE : base + _LAP] = lap_distance.astype("<f4", copy=False).tobytes()
+        buf[base + _LAP : base + _CARS] = lap.tobytes()
+        buf[base + _CARS : base + TRACE_SLOT.itemsize] = data[
+            HEADER_SIZE : HEADER_SIZE + MAX_CARS * _CAR_BYTES
+        ]
+        # Counted only once the slot is complete, so readers never see a partial sample
+        self._written[0] = written + 1
+
+    # --- Readers ---
+
+    def _copy(
+        self, after: Optional[int], car_index: Optional[int]
+    ) -> Tuple[int, TraceColumns, np.ndarray]:
+        """Copy out samples after ``after`` for one car (or all), dropping possibly torn slots."""
+        written = self.written
+        first = max(written - self.capacity, 0)
+        if after is not None and after <= written:
+            first = max(first, after)
+        slots = np.arange(first, written) % self.capacity
+        if car_index is None:
+            cars = slice(None)
+            records = self._cars[slots].view(CAR_TELEMETRY)  # One row of 22 cars per sample
+        else:
+            cars = car_index
+            car_bytes = slice(car_index * _CAR_BYTES, (car_index + 1) * _CAR_BYTES)
+            records = np.ascontiguousarray(self._cars[slots, car_bytes]).view(CAR_TELEMETRY)
+            records = records.reshape(-1)
+        columns: TraceColumns = {
+            "session_time": self._session_time[slots],
+            "frame": self._frame[slots],
+            "lap_distance": self._lap_distance[slots, cars],
+            "lap": self._lap[slots, cars],
+        }
+
+        # Samples whose slot the writer reached while we were copying may be torn
+        torn = max(self.written - self.capacity + 1 - first, 0)
+        keep = slice(min(torn, len(slots)), None)
+        return written, {name: values[keep] for name, values in columns.items()}, records[keep]
+
+    def read(
+        self,
+        car_index: int,
+        seconds: Optional[float] = None,
+        hz: Optional[float] = None,
+        after: Optional[int] = None,
+        after_time: Optional[float] = None,
+    ) -> Tuple[int, TraceColumns]:
+        """
+        One car's samples, oldest first, and the cursor to pass as ``after`` next time.
+
+        ``seconds`` keeps the last N seconds of session time, ``after`` only
+        samples appended since that cursor, and ``hz`` downsamples to at most
+        one sample per 1/hz seconds (skipping the bucket of ``after_time``).
+        """
+        written, columns, records = self._copy(after, car_index)
+        if seconds is not None and len(columns["session_time"]):
+            times = columns["session_time"]
+            window = np.flatnonzero(times >= times[-1] - seconds)
+            columns = {name: values[window] for name, values in columns.items()}
+            records = records[window]
+        if hz:
+            picked = downsample(columns["session_time"], hz, after_time)
+            columns = {name: values[picked] for name, values in columns.items()}
+            records = records[picked]
+        for name in TRACE_CHANNELS:
+            columns[name] = records[name]
+        return written, columns
+
+    def read_all_cars(self, after: Optional[int] = None) -> Tuple[int, TraceColumns]:
+        """Samples after ``after`` for every car: per-car columns are (samples, MAX_CARS)."""
+        written, columns, records = self._copy(after, None)
+        for name in TRACE_CHANNELS:
+            columns[name] = records[name]
+        return written, columns
@@ -1,7 +1,7 @@
 import asyncio
 import logging
 import os
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 from app.models.models import (
     LapTimeInput,
@@ -11,8 +11,11 @@ from app.models.models import (
     LapTime,
     User,
     UserResponse,
+    parse_lap_time_ms,
 )
-from app.utils.helpers import update_overall_fastest_lap
+from app.services.lap_history import LAP_CAPTURED, LAP_INVALID, LapHistory
+from app.services.leaderboard import Leaderboard
+from app.utils.helpers import ms_to_laptime_str
 
 # Load environment variables
 load_dotenv()
@@ -33,6 +36,11 @@ class AppData:
         self.drivers: Dict[str, Driver] = {}
         self.track_name: Optional[str] = None
         self.users: Dict[str, User] = {}
+        # Drivers ranked by fastest lap, kept in step with drivers[*].fastest_lap
+        self.leaderboard = Leaderboard()
+        self.fastest_driver: Optional[str] = None  # Whose lap carries is_fastest
+        # Every lap of every driver, including invalid ones
+        self.lap_history: Dict[str, LapHistory] = {}
 
 
 app_data = AppData()
@@ -115,6 +123,35 @@ async def delete_user(user_name: str) -> bool:
 # --- Driver/LapTime/Track CRUD Operations ---
 
 
+def _update_fastest_flag():
+    """
+    Keeps is_fastest on the leaderboard's fastest lap only (caller holds state_lock).
+    Touches at most the previous and the new fastest driver.
+    """
+    fastest = app_data.leaderboard.fastest()
+    previous = app_data.drivers.get(app_data.fastest_driver)
+    if previous is not None and previous.fastest_lap and app_data.fastest_driver != fastest:
+        previous.fastest_lap.is_fastest = False
+    if fastest is not None:
+        app_data.drivers[fastest].fastest_lap.is_fastest = True
+    app_data.fastest_driver = fastest
+
+
+def ranked_driver_copies() -> Dict[str, Driver]:
+    """
+    Copies of all drivers, fastest first and drivers without a lap last
+    (caller holds state_lock).
+    """
+    drivers = {
+        name: app_data.drivers[name].model_copy(deep=True)
+        for name in app_data.leaderboard.names()
+    }
+    for name, driver in app_data.drivers.items():
+        if name not in drivers:
+            drivers[name] = driver.model_copy(deep=True)
+    return drivers
+
+
 async def get_all_drivers() -> Dict[str, Driver]:
     """Returns all current drivers and their data."""
     async with state_lock:
@@ -124,78 +161,167 @@ async def get_all_drivers() -> Dict[str, Driver]:
         }
 
 
-async def add_or_update_lap_time(lap_input: LapTimeInput) -> Dict[str, Driver]:
-    """Adds or updates a lap time for a driver."""
-    global websocket_manager
-
+async def get_ranked_drivers() -> Dict[str, Driver]:
+    """Returns all current drivers in leaderboard order."""
     async with state_lock:
-        driver_name = lap_input.name
-        try:
-            new_lap = LapTime(time=lap_input.time, is_fastest=False)
-        except ValueError as e:
-            logger.error(
-                f"Invalid time format provided for {driver_name}: {lap_input.time} - {e}"
-            )
-            raise ValueError(f"Invalid time format: {lap_input.time}")
+        return ranked_driver_copies()
 
-        is_new_driver = driver_name not in app_data.drivers
-        is_faster_lap = False
 
-        if is_new_driver:
-            app_data.drivers[driver_name] = Driver(
-                name=driver_name, team=lap_input.team, fastest_lap=new_lap
+def _record_lap_history(lap_input: LapTimeInput):
+    history = app_data.lap_history.get(lap_input.name)
+    if history is None:
+        history = LapHistory()
+    history.append(
+        lap_input.time_ms,
+        lap_input.lap_number,
+        lap_input.sector1_ms,
+        lap_input.sector2_ms,
+        (LAP_INVALID if lap_input.invalid else 0) | (LAP_CAPTURED if lap_input.captured else 0),
+    )
+    # Only keep a new driver's history once the lap is in it
+    app_data.lap_history.setdefault(lap_input.name, history)
+
+
+def _apply_lap_time(lap_input: LapTimeInput, keep_team: bool = False) -> Optional[dict]:
+    """
+    Records one lap in the driver's history and applies it to app_data.drivers
+    (caller holds state_lock). Returns the broadcast data describing the change,
+    or None for an invalid lap, which only goes into the history. With
+    ``keep_team`` an existing driver's team is left as it is.
+    """
+    driver_name = lap_input.name
+    try:
+        new_lap = LapTime(time=lap_input.time, time_ms=lap_input.time_ms, is_fastest=False)
+    except ValueError as e:
+        logger.error(
+            f"Invalid time format provided for {driver_name}: {lap_input.time} - {e}"
+        )
+        raise ValueError(f"Invalid time format: {lap_input.time}")
+
+    _record_lap_history(lap_input)
+    if lap_input.invalid:
+        logger.debug(f"Recorded invalid lap {new_lap.time} for '{driver_name}' in its history only.")
+        return None
+
+    is_new_driver = driver_name not in app_data.drivers
+    is_faster_lap = False
+
+    if is_new_driver:
+        app_data.drivers[driver_name] = Driver(
+            name=driver_name, team=lap_input.team, fastest_lap=new_lap
+        )
+        app_data.leaderboard.set(driver_name, new_lap.time_ms)
+        logger.debug(
+            f"Created new driver '{driver_name}' with lap time {new_lap.time}."
+        )
+    else:
+        driver = app_data.drivers[driver_name]
+
+        if driver.team != lap_input.team and not keep_team:
+            logger.debug(
+                f"Updating team for driver '{driver_name}' from '{driver.team}' to '{lap_input.team}'."
             )
+            driver.team = lap_input.team
+
+        current_ms = app_data.leaderboard.time_ms(driver_name)
+        if current_ms is None or new_lap.time_ms < current_ms:
+            driver.fastest_lap = new_lap
+            app_data.leaderboard.set(driver_name, new_lap.time_ms)
             logger.debug(
-                f"Created new driver '{driver_name}' with lap time {new_lap.time}."
+                f"Updated fastest lap for '{driver_name}' to {new_lap.time}."
             )
+            is_faster_lap = True
         else:
-            driver = app_data.drivers[driver_name]
-            team_updated = False
+            logger.debug(
+                f"New lap time {new_lap.time} for '{driver_name}' is not faster than existing {driver.fastest_lap.time}."
+            )
 
-            if driver.team != lap_input.team:
-                logger.debug(
-                    f"Updating team for driver '{driver_name}' from '{driver.team}' to '{lap_input.team}'."
-                )
-                driver.team = lap_input.team
-                team_updated = True
-
-            if (
-                driver.fastest_lap is None
-                or new_lap.time_seconds < driver.fastest_lap.time_seconds
-            ):
-                driver.fastest_lap = new_lap
-                logger.debug(
-                    f"Updated fastest lap for '{driver_name}' to {new_lap.time}."
-                )
-                is_faster_lap = True
-            else:
-                logger.debug(
-                    f"New lap time {new_lap.time} for '{driver_name}' is not faster than existing {driver.fastest_lap.time}."
-                )
+    return {
+        "name": driver_name,
+        "team": app_data.drivers[driver_name].team,
+        "time": new_lap.time,
+        "time_seconds": new_lap.time_seconds,
+        "is_faster": is_faster_lap,
+        "is_new_driver": is_new_driver,
+        "lap": new_lap,
+    }
+
+
+async def add_or_update_lap_time(lap_input: LapTimeInput) -> Dict[str, Driver]:
+    """Adds or updates a lap time for a driver; returns all drivers in leaderboard order."""
+    global websocket_manager
 
-        update_overall_fastest_lap(app_data.drivers)
+    async with state_lock:
+        change = _apply_lap_time(lap_input)
+        _update_fastest_flag()
 
         # Broadcast the update to all connected clients
-        if websocket_manager:
+        if websocket_manager and change:
             await websocket_manager.broadcast(
                 {
                     "type": "laptime_update",
-                    "action": "add" if is_new_driver else "update",
+                    "action": "add" if change["is_new_driver"] else "update",
                     "data": {
-                        "name": driver_name,
+                        "name": change["name"],
                         "team": lap_input.team,
-                        "time": new_lap.time,
-                        "time_seconds": new_lap.time_seconds,
-                        "is_faster": is_faster_lap,
-                        "is_overall_fastest": new_lap.is_fastest,
+                        "time": change["time"],
+                        "time_seconds": change["time_seconds"],
+                        "is_faster": change["is_faster"],
+                        "is_overall_fastest": change["lap"].is_fastest,
                     },
                 }
             )
 
-        return {
-            name: driver.model_copy(deep=True)
-            for name, driver in app_data.drivers.items()
-        }
+        return ranked_driver_copies()
+
+
+async def add_lap_times(lap_inputs: List[LapTimeInput]) -> List[dict]:
+    """
+    Adds a batch of lap times captured from telemetry under one lock, with one
+    fastest-lap recalculation and one broadcast for the whole batch.
+
+    Registered users and existing drivers keep their team; the team given with
+    the lap is used only for new drivers. Invalid laps go into the lap history
+    only. Returns the broadcast entries.
+    """
+    global websocket_manager
+
+    if not lap_inputs:
+        return []
+
+    async with state_lock:
+        changes = []
+        for lap_input in lap_inputs:
+            user = app_data.users.get(lap_input.name)
+            if user is not None and user.team != lap_input.team:
+                lap_input = lap_input.model_copy(update={"team": user.team})
+            try:
+                change = _apply_lap_time(lap_input, keep_team=user is None)
+            except ValueError:
+                continue
+            if change:
+                changes.append(change)
+        _update_fastest_flag()
+
+        entries = [
+            {
+                "name": change["name"],
+                "team": change["team"],
+                "time": change["time"],
+                "time_seconds": change["time_seconds"],
+                "is_faster": change["is_faster"],
+                "is_overall_fastest": change["lap"].is_fastest,
+            }
+            for change in changes
+        ]
+        logger.debug(f"Added {len(lap_inputs)} captured laps ({len(entries)} valid).")
+
+        if websocket_manager and entries:
+            await websocket_manager.broadcast(
+                {"type": "laptime_update", "action": "batch", "data": entries}
+            )
+
+        return entries
 
 
 async def delete_driver_lap_time(delete_input: LapTimeDeleteInput) -> bool:
@@ -213,20 +339,29 @@ async def delete_driver_lap_time(delete_input: LapTimeDeleteInput) -> bool:
             driver = app_data.drivers[driver_name]
             if driver.fastest_lap:
                 try:
-                    temp_lap_for_comparison = LapTime(time=time_to_delete_str)
-                    time_to_delete_sec = temp_lap_for_comparison.time_seconds
+                    time_to_delete_ms = parse_lap_time_ms(time_to_delete_str)
                 except ValueError:
                     logger.warning(
                         f"Invalid time format '{time_to_delete_str}' provided for deletion for driver '{driver_name}'."
                     )
                     return False
 
-                if abs(driver.fastest_lap.time_seconds - time_to_delete_sec) < 0.0001:
+                if app_data.leaderboard.time_ms(driver_name) == time_to_delete_ms:
                     logger.debug(
                         f"Deleting lap time {driver.fastest_lap.time} for driver '{driver_name}'."
                     )
-                    driver.fastest_lap = None
-                    update_overall_fastest_lap(app_data.drivers)
+                    history = app_data.lap_history.get(driver_name)
+                    if history is not None:
+                        history.mark_deleted(time_to_delete_ms)
+                    if history is not None and history.valid_count:
+                        # Fall back to the driver's next best valid lap
+                        best_ms = history.best_ms
+                        driver.fastest_lap = LapTime(time=ms_to_laptime_str(best_ms), time_ms=best_ms)
+                        app_data.leaderboard.set(driver_name, best_ms)
+                    else:
+                        driver.fastest_lap = None
+                        app_data.leaderboard.remove(driver_name)
+                    _update_fastest_flag()
 
                     # Broadcast the deletion to all connected clients
                     if websocket_manager:
@@ -237,6 +372,8 @@ async def delete_driver_lap_time(delete_input: LapTimeDeleteInput) -> bool:
                                 "data": {
                                     "name": driver_name,
                                     "time": time_to_delete_str,
+                                    # The lap now standing for the driver, if any
+                                    "fastest": driver.fastest_lap.time if driver.fastest_lap else None,
                                 },
                             }
                         )
@@ -277,6 +414,9 @@ async def set_track(track_input: TrackNameInput) -> str:
             )
             app_data.track_name = new_track_name
             app_data.drivers.clear()
+            app_data.leaderboard.clear()
+            app_data.fastest_driver = None
+            app_data.lap_history.clear()
 
             # Broadcast the track update to all connected clients
             if websocket_manager:
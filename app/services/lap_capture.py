@@ -0,0 +1,151 @@
+"""
+Automatic lap time capture from LapData.
+
+A poller compares every session's published snapshot with the lap numbers it
+saw last time. A car whose currentLapNum went up has completed a lap, and its
+lastLapTimeInMS is that lap's time; the store keeps the completed lap's
+currentLapInvalid flag and sector times in last-lap columns, so a lap
+invalidated however late still goes into the driver's lap history flagged
+invalid, but never into the standings. Laps completed by any car in
+any session since the previous poll are handed to the standings as one batch,
+so a field crossing the line together costs one lock and one broadcast.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.models.models import LapTimeInput
+from app.services.live_store import LAST_LAP_INVALID, LAST_LAP_SECTOR_COLUMNS
+from app.services.telemetry_decoder import MAX_CARS
+from app.utils.helpers import ms_to_laptime_str
+
+logger = logging.getLogger(__name__)
+
+LAP_CAPTURE_POLL_SECONDS = 0.25
+
+
+def lap_capture_enabled() -> bool:
+    """Read AUTO_LAP_CAPTURE from the environment (on by default)."""
+    return os.getenv("AUTO_LAP_CAPTURE", "true").lower() in ("true", "1", "yes", "on")
+
+
+class SessionLaps:
+    """Lap numbers last seen and best valid lap of every car in one session."""
+
+    def __init__(self, instance: int):
+        self.instance = instance
+        self.version = 0
+        self.lap_num = np.zeros(MAX_CARS, dtype=np.int16)  # 0 until a car is first seen
+        self.best_ms = np.zeros(MAX_CARS, dtype=np.uint32)  # 0 until a valid lap is set
+
+
+class LapCapture:
+    """Feeds valid laps completed in every session into the standings, in batches."""
+
+    def __init__(
+        self,
+        sessions_source: Callable[[], Iterable],
+        submit: Callable[[List[LapTimeInput]], Awaitable],
+        team_names: Dict[int, str],
+        interval: float = LAP_CAPTURE_POLL_SECONDS,
+        enabled: Optional[bool] = None,
+    ):
+        self.sessions_source = sessions_source
+        self.submit = submit
+        self.team_names = team_names
+        self.interval = interval
+        self.enabled = lap_capture_enabled() if enabled is None else enabled
+        self.sessions: Dict[str, SessionLaps] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Lap capture started (standings updates {'on' if self.enabled else 'off'})"
+            )
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def best_laps(self, session_id: str) -> Optional[np.ndarray]:
+        """Best valid lap (ms, 0 for none) of every car in a session, if it is tracked."""
+        state = self.sessions.get(session_id)
+        return state.best_ms if state else None
+
+    def poll(self) -> List[LapTimeInput]:
+        """Laps completed in any session since the previous poll."""
+        laps: List[LapTimeInput] = []
+        seen = set()
+        for session in list(self.sessions_source()):
+            seen.add(session.session_id)
+            laps.extend(self._poll_session(session))
+        for session_id in set(self.sessions) - seen:
+            del self.sessions[session_id]
+        return laps
+
+    def _poll_session(self, session) -> List[LapTimeInput]:
+        state = self.sessions.get(session.session_id)
+        if state is None or state.instance != session.instance:
+            state = self.sessions[session.session_id] = SessionLaps(session.instance)
+        snapshot = session.snapshot()
+        if snapshot.version == state.version or not snapshot.lap_data_received:
+            return []
+        state.version = snapshot.version
+
+        count = snapshot.active_count() or MAX_CARS
+        lap_num = snapshot.column("current_lap_num", count).astype(np.int16)
+        previous = state.lap_num[:count]
+        # First sightings (previous 0) only set the baseline: that lap may have been credited already
+        completed = (lap_num > previous) & (previous > 0)
+        state.lap_num[:count] = lap_num
+        if not completed.any():
+            return []
+
+        lap_ms = snapshot.column("last_lap_time_ms", count)
+        timed = completed & (lap_ms > 0)
+        valid = timed & (snapshot.column(LAST_LAP_INVALID, count) == 0)
+        best = state.best_ms[:count]
+        improved = valid & ((best == 0) | (lap_ms < best))
+        best[improved] = lap_ms[improved]
+
+        team_ids = snapshot.column("team_id", count)
+        sector1_ms, sector2_ms = (snapshot.column(name, count) for name in LAST_LAP_SECTOR_COLUMNS)
+        laps = []
+        for car in np.flatnonzero(timed).tolist():
+            name = snapshot.names[car]
+            if not name:
+                continue
+            laps.append(
+                LapTimeInput(
+                    name=name,
+                    team=self.team_names.get(int(team_ids[car]), "Unknown Team"),
+                    time=ms_to_laptime_str(int(lap_ms[car])),
+                    lap_number=int(lap_num[car]) - 1,
+                    sector1_ms=int(sector1_ms[car]),
+                    sector2_ms=int(sector2_ms[car]),
+                    invalid=not valid[car],
+                    captured=True,
+                )
+            )
+        return laps
+
+    async def _run(self):
+        while True:
+            try:
+                laps = self.poll()
+                if laps and self.enabled:
+                    await self.submit(laps)
+            except Exception as e:
+                logger.exception(f"Error capturing lap times: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,273 @@
+"""
+Completed-lap telemetry resampled onto a fixed lap-distance grid.
+
+The CarTelemetry ring only covers the last minute, so a recorder per session
+drains it every LAP_TRACE_POLL_SECONDS, collects each car's samples for the
+lap in progress and, when the car's lap number goes up, resamples the lap
+onto a grid of LAP_TRACE_GRID_M metre steps. Every completed lap of every car
+then has the same layout, so comparing two laps is an element-wise array
+difference rather than a join on timestamps.
+
+Grid points store compact channels (LAP_TRACE_DTYPE, 13 bytes): the time
+since the start of the lap, speed, and throttle/brake/steering quantised to
+one byte. Laps the feed joined part-way through are not recorded.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.car_telemetry_traces import CarTelemetryTraces
+from app.services.telemetry_decoder import MAX_CARS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRID_M = 5.0
+DEFAULT_MAX_LAPS_PER_CAR = 100
+LAP_TRACE_POLL_SECONDS = 0.5
+# A lap counts as complete if its samples start and end this close to the line
+LAP_EDGE_TOLERANCE_M = 50.0
+
+LAP_TRACE_DTYPE = np.dtype(
+    [
+        ("time", "<f4"),  # Seconds since the start of the lap
+        ("speed", "<u2"),  # km/h
+        ("throttle", "u1"),  # 0-255 for 0.0-1.0
+        ("brake", "u1"),  # 0-255 for 0.0-1.0
+        ("steer", "i1"),  # -127-127 for -1.0-1.0
+        ("gear", "i1"),
+        ("engine_rpm", "<u2"),
+        ("drs", "u1"),
+    ]
+)
+_INTERPOLATED = ("time", "speed", "throttle", "brake", "steer", "engine_rpm")
+_STEPPED = ("gear", "drs")  # Held from the last sample rather than interpolated
+_SCALES = {"throttle": 255.0, "brake": 255.0, "steer": 127.0}
+# Ring columns kept for the lap in progress
+_COLLECTED = ("session_time", "lap_distance", *_INTERPOLATED[1:], *_STEPPED)
+
+
+def get_grid_step_m() -> float:
+    """Read LAP_TRACE_GRID_M from the environment (at least 1 m)."""
+    try:
+        return max(float(os.getenv("LAP_TRACE_GRID_M", DEFAULT_GRID_M)), 1.0)
+    except ValueError:
+        logger.warning("Invalid LAP_TRACE_GRID_M, using the default grid")
+        return DEFAULT_GRID_M
+
+
+def get_max_laps_per_car() -> int:
+    try:
+        return max(int(os.getenv("LAP_TRACE_MAX_LAPS", DEFAULT_MAX_LAPS_PER_CAR)), 1)
+    except ValueError:
+        logger.warning("Invalid LAP_TRACE_MAX_LAPS, using the default limit")
+        return DEFAULT_MAX_LAPS_PER_CAR
+
+
+class LapTrace:
+    """One completed lap of one car on the distance grid."""
+
+    __slots__ = ("car_index", "lap", "name", "lap_time_ms", "grid_step_m", "points")
+
+    def __init__(
+        self,
+        car_index: int,
+        lap: int,
+        name: str,
+        lap_time_ms: int,
+        grid_step_m: float,
+        points: np.ndarray,
+    ):
+        self.car_index = car_index
+        self.lap = lap
+        self.name = name
+        self.lap_time_ms = lap_time_ms
+        self.grid_step_m = grid_step_m
+        self.points = points
+
+    def channels(self, count: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Grid channels in natural units (floats for the quantised ones)."""
+        points = self.points[:count]
+        result = {}
+        for name in LAP_TRACE_DTYPE.names:
+            values = points[name]
+            scale = _SCALES.get(name)
+            result[name] = values / scale if scale else values
+        return result
+
+
+def resample_lap(samples: Dict[str, np.ndarray], grid: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Resample one lap's samples onto ``grid`` (metres from the line).
+
+    Samples must cover the grid to within LAP_EDGE_TOLERANCE_M at both ends;
+    returns None otherwise.
+    """
+    distance = samples["lap_distance"]
+    # Keep the samples where the car moved forward (drops pre-line negatives and flashback overlap)
+    forward = (distance >= 0) & (distance >= np.maximum.accumulate(distance))
+    distance, first_index = np.unique(distance[forward], return_index=True)
+    if len(distance) < 2:
+        return None
+    if distance[0] > LAP_EDGE_TOLERANCE_M or distance[-1] < grid[-1] - LAP_EDGE_TOLERANCE_M:
+        return None
+    picked = {name: values[forward][first_index] for name, values in samples.items()}
+
+    points = np.zeros(len(grid), dtype=LAP_TRACE_DTYPE)
+    times = picked["session_time"].astype(np.float64)
+    elapsed = np.interp(grid, distance, times)
+    points["time"] = elapsed - elapsed[0]
+    for name in _INTERPOLATED[1:]:
+        values = np.interp(grid, distance, picked[name].astype(np.float64))
+        points[name] = np.rint(values * _SCALES.get(name, 1.0))
+    held = np.clip(np.searchsorted(distance, grid, side="right") - 1, 0, len(distance) - 1)
+    for name in _STEPPED:
+        points[name] = picked[name][held]
+    return points
+
+
+class LapTraceRecorder:
+    """Completed-lap traces of one session, fed from its CarTelemetry ring."""
+
+    def __init__(self, grid_step_m: Optional[float] = None, max_laps_per_car: Optional[int] = None):
+        self.grid_step_m = grid_step_m or get_grid_step_m()
+        self.max_laps_per_car = max_laps_per_car or get_max_laps_per_car()
+        self.laps: Dict[int, Dict[int, LapTrace]] = {}  # car index -> lap number -> trace
+        self.fastest: Dict[int, int] = {}  # car index -> lap number of its fastest trace
+        self._source: Optional[CarTelemetryTraces] = None
+        self._cursor = 0
+        self._current_lap = [0] * MAX_CARS
+        self._chunks: List[List[Dict[str, np.ndarray]]] = [[] for _ in range(MAX_CARS)]
+
+    def _restart(self, source: CarTelemetryTraces):
+        self._source = source
+        self._cursor = 0
+        self._current_lap = [0] * MAX_CARS
+        self._chunks = [[] for _ in range(MAX_CARS)]
+
+    def update(self, traces: CarTelemetryTraces, snapshot) -> List[LapTrace]:
+        """Consume new ring samples; returns the laps completed since the last call."""
+        if traces is not self._source or traces.written < self._cursor:
+            self._restart(traces)  # New listener or a reset ring
+        self._cursor, columns = traces.read_all_cars(after=self._cursor)
+        count = len(columns["session_time"])
+        if not count:
+            return []
+
+        completed = []
+        track_length = snapshot.session.get("trackLength") or 0
+        laps = columns["lap"]
+        for car in range(snapshot.active_count() or MAX_CARS):
+            car_laps = laps[:, car]
+            bounds = [0, *(np.flatnonzero(car_laps[1:] != car_laps[:-1]) + 1), count]
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                lap = int(car_laps[start])
+                if lap != self._current_lap[car]:
+                    if self._current_lap[car] and lap == self._current_lap[car] + 1:
+                        trace = self._finish(car, self._current_lap[car], track_length, snapshot)
+                        if trace is not None:
+                            completed.append(trace)
+                    self._current_lap[car] = lap
+                    self._chunks[car] = []
+                if lap:
+                    self._chunks[car].append(
+                        {
+                            name: columns[name][start:end]
+                            if columns[name].ndim == 1
+                            else columns[name][start:end, car].copy()
+                            for name in _COLLECTED
+                        }
+                    )
+        return completed
+
+    def _finish(self, car: int, lap: int, track_length: int, snapshot) -> Optional[LapTrace]:
+        chunks = self._chunks[car]
+        if not chunks:
+            return None
+        samples = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in _COLLECTED}
+        end = track_length or float(samples["lap_distance"].max())
+        grid = np.arange(0.0, end, self.grid_step_m)
+        if len(grid) < 2:
+            return None
+        points = resample_lap(samples, grid)
+        if points is None:
+            logger.debug(f"Lap {lap} of car {car} was not fully recorded; skipping its trace")
+            return None
+
+        # LapData reports the completed lap's official time as soon as the lap number changes
+        lap_time_ms = int(snapshot.data["last_lap_time_ms"][car]) or int(
+            round((samples["session_time"][-1] - samples["session_time"][0]) * 1000)
+        )
+        name = snapshot.names[car] if car < len(snapshot.names) else ""
+        trace = LapTrace(car, lap, name, lap_time_ms, self.grid_step_m, points)
+        self._store(trace)
+        return trace
+
+    def _store(self, trace: LapTrace):
+        car_laps = self.laps.setdefault(trace.car_index, {})
+        car_laps[trace.lap] = trace
+        fastest = car_laps.get(self.fastest.get(trace.car_index))
+        if fastest is None or trace.lap_time_ms < fastest.lap_time_ms:
+            self.fastest[trace.car_index] = trace.lap
+        # Bounded memory: forget the oldest laps, but never a car's fastest
+        while len(car_laps) > self.max_laps_per_car:
+            oldest = next(lap for lap in car_laps if lap != self.fastest[trace.car_index])
+            del car_laps[oldest]
+
+    def get(self, car_index: int, lap: Optional[int] = None) -> Optional[LapTrace]:
+        """A recorded lap of a car, or its fastest when ``lap`` is None."""
+        if lap is None:
+            lap = self.fastest.get(car_index)
+        return self.laps.get(car_index, {}).get(lap)
+
+
+def compare_laps(a: LapTrace, b: LapTrace) -> Tuple[int, Dict[str, np.ndarray]]:
+    """Point count both laps share, and B minus A for time, speed, throttle and brake."""
+    count = min(len(a.points), len(b.points))
+    a_channels, b_channels = a.channels(count), b.channels(count)
+    return count, {
+        name: b_channels[name].astype(np.float64) - a_channels[name]
+        for name in ("time", "speed", "throttle", "brake")
+    }
+
+
+class LapTracePoller:
+    """Drains every session's CarTelemetry ring into its LapTraceRecorder."""
+
+    def __init__(self, sessions_source: Callable[[], Iterable], interval: float = LAP_TRACE_POLL_SECONDS):
+        self.sessions_source = sessions_source
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("Lap trace recorder started")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def poll(self):
+        for session in list(self.sessions_source()):
+            for trace in session.lap_traces.update(session.traces(), session.snapshot()):
+                logger.debug(
+                    f"Recorded lap {trace.lap} of {trace.name or f'car {trace.car_index}'} "
+                    f"in session '{session.session_id}' ({len(trace.points)} points)"
+                )
+
+    async def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.exception(f"Error recording lap traces: {e}")
+            await asyncio.sleep(self.interval)
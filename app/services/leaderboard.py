@@ -0,0 +1,67 @@
+"""
+Ranked index over the drivers' fastest laps.
+
+Each driver's fastest lap is kept as integer milliseconds in a SortedList
+of (time_ms, sequence, name) beside a name -> entry map. Adding, replacing
+or removing a lap is O(log n), the overall fastest is the first entry, and
+ranked reads are a walk over the list rather than a sort of every driver.
+Ties rank whoever set the time first.
+"""
+
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+LeaderboardEntry = Tuple[int, int, str]  # (lap time ms, insertion sequence, driver name)
+
+
+class Leaderboard:
+    """Drivers ranked by fastest lap; callers serialise access (crud.state_lock)."""
+
+    def __init__(self):
+        self._ranked: SortedList = SortedList()
+        self._entries: Dict[str, LeaderboardEntry] = {}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._ranked)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def set(self, name: str, time_ms: int):
+        """Record ``name``'s fastest lap, replacing any previous entry."""
+        self.remove(name)
+        entry = (time_ms, next(self._sequence), name)
+        self._entries[name] = entry
+        self._ranked.add(entry)
+
+    def remove(self, name: str) -> bool:
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return False
+        self._ranked.remove(entry)
+        return True
+
+    def clear(self):
+        self._ranked.clear()
+        self._entries.clear()
+
+    def time_ms(self, name: str) -> Optional[int]:
+        entry = self._entries.get(name)
+        return entry[0] if entry else None
+
+    def fastest(self) -> Optional[str]:
+        """Name of the overall fastest driver, if anyone has a lap."""
+        return self._ranked[0][2] if self._ranked else None
+
+    def position(self, name: str) -> Optional[int]:
+        """1-based rank of a driver, or None without a lap."""
+        entry = self._entries.get(name)
+        return self._ranked.index(entry) + 1 if entry else None
+
+    def names(self, limit: Optional[int] = None) -> List[str]:
+        """Driver names, fastest first."""
+        entries = self._ranked if limit is None else self._ranked.islice(0, limit)
+        return [name for _, _, name in entries]
@@ -0,0 +1,397 @@
+"""
+Columnar store for the latest per-car telemetry state.
+
+Each field is a fixed-shape NumPy column with one row per car index, all held
+in one contiguous record array. The listener writes decoded packets into this
+back buffer in place and then publishes an immutable, versioned snapshot by
+swapping a single reference, so readers on the event loop always see a
+consistent frame without taking a lock.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.car_telemetry_traces import CarTelemetryTraces
+from app.services.live_timing import GapTimer
+from app.services.telemetry_decoder import (
+    CAR_MOTION,
+    CAR_STATUS,
+    LAP_DATA,
+    MAX_CARS,
+    NUM_PACKET_IDS,
+    PARTICIPANT,
+    SESSION_TIME_AND_FRAME,
+    SESSION_TIME_OFFSET,
+    car_motion_array,
+    car_status_array,
+    decode_participant_name,
+    lap_data_array,
+    participants_array,
+    participants_num_active,
+)
+from app.services.telemetry_metrics import PacketMetrics
+
+logger = logging.getLogger(__name__)
+
+# Sector times arrive as separate minute and millisecond parts and are stored combined
+SECTOR_TIME_COLUMNS = {
+    "sector1_time_ms": ("sector1_minutes_part", "sector1_ms_part"),
+    "sector2_time_ms": ("sector2_minutes_part", "sector2_ms_part"),
+}
+_SECTOR_PARTS = {part for parts in SECTOR_TIME_COLUMNS.values() for part in parts}
+_LAP_DATA_DIRECT = [name for name in LAP_DATA.names if name not in _SECTOR_PARTS]
+# Computed from LapData by the store's GapTimer (milliseconds, -1 when unknown)
+TIMING_COLUMNS = {
+    "gap_to_leader_ms": np.dtype(np.int32),
+    "interval_ms": np.dtype(np.int32),
+    "laps_behind_leader": np.dtype(np.uint8),
+}
+# current_lap_invalid resets when a lap starts, so the completed lap's flag is kept here
+LAST_LAP_INVALID = "last_lap_invalid"
+# Likewise the completed lap's sector times (last-lap column <- current-lap column)
+LAST_LAP_SECTOR_COLUMNS = {
+    "last_lap_sector1_ms": "sector1_time_ms",
+    "last_lap_sector2_ms": "sector2_time_ms",
+}
+
+
+def _build_store_dtype() -> np.dtype:
+    fields = []
+    for layout in (CAR_MOTION, LAP_DATA, PARTICIPANT, CAR_STATUS):
+        for name in layout.names:
+            if name not in _SECTOR_PARTS:
+                fields.append((name, layout.fields[name][0].newbyteorder("=")))
+    for name in SECTOR_TIME_COLUMNS:
+        fields.append((name, np.dtype(np.uint32)))
+    fields.extend(TIMING_COLUMNS.items())
+    fields.append((LAST_LAP_INVALID, np.dtype(np.uint8)))
+    for name in LAST_LAP_SECTOR_COLUMNS:
+        fields.append((name, np.dtype(np.uint32)))
+    return np.dtype(fields)
+
+
+# One record per car; every store column is a field of this dtype
+STORE_DTYPE = _build_store_dtype()
+COLUMN_DTYPES: Dict[str, np.dtype] = {
+    name: STORE_DTYPE.fields[name][0] for name in STORE_DTYPE.names
+}
+
+# --- camelCase keys used by the JSON endpoints, mapped to store columns ---
+MOTION_KEYS = {
+    "worldPositionX": "world_x",
+    "worldPositionY": "world_y",
+    "worldPositionZ": "world_z",
+    "gForceLateral": "g_force_lateral",
+    "gForceLongitudinal": "g_force_longitudinal",
+    "gForceVertical": "g_force_vertical",
+    "yaw": "yaw",
+    "pitch": "pitch",
+    "roll": "roll",
+}
+
+LAP_DATA_KEYS = {
+    "lastLapTimeInMS": "last_lap_time_ms",
+    "lastLapInvalid": LAST_LAP_INVALID,
+    "lastLapSector1TimeInMS": "last_lap_sector1_ms",
+    "lastLapSector2TimeInMS": "last_lap_sector2_ms",
+    "currentLapTimeInMS": "current_lap_time_ms",
+    "sector1TimeInMS": "sector1_time_ms",
+    "sector2TimeInMS": "sector2_time_ms",
+    "lapDistance": "lap_distance",
+    "totalDistance": "total_distance",
+    "safetyCarDelta": "safety_car_delta",
+    "carPosition": "car_position",
+    "currentLapNum": "current_lap_num",
+    "pitStatus": "pit_status",
+    "numPitStops": "num_pit_stops",
+    "sector": "sector",
+    "currentLapInvalid": "current_lap_invalid",
+    "penalties": "penalties",
+    "totalWarnings": "total_warnings",
+    "cornerCuttingWarnings": "corner_cutting_warnings",
+    "numUnservedDriveThroughPens": "num_unserved_drive_through_pens",
+    "numUnservedStopGoPens": "num_unserved_stop_go_pens",
+    "gridPosition": "grid_position",
+    "driverStatus": "driver_status",
+    "resultStatus": "result_status",
+    "pitLaneTimerActive": "pit_lane_timer_active",
+    "pitLaneTimeInLaneInMS": "pit_lane_time_in_lane_ms",
+    "pitStopTimerInMS": "pit_stop_timer_ms",
+    "pitStopShouldServePen": "pit_stop_should_serve_pen",
+    "speedTrapFastestSpeed": "speed_trap_fastest_speed",
+    "speedTrapFastestLap": "speed_trap_fastest_lap",
+    "gapToLeaderInMS": "gap_to_leader_ms",
+    "intervalInMS": "interval_ms",
+    "lapsBehindLeader": "laps_behind_leader",
+}
+
+PARTICIPANT_KEYS = {
+    "aiControlled": "ai_controlled",
+    "driverId": "driver_id",
+    "networkId": "network_id",
+    "teamId": "team_id",
+    "myTeam": "my_team",
+    "raceNumber": "race_number",
+    "nationality": "nationality",
+    "yourTelemetry": "your_telemetry",
+}
+
+CAR_STATUS_KEYS = {
+    "fuelMix": "fuel_mix",
+    "drsAllowed": "drs_allowed",
+    "tyreCompound": "tyre_compound",
+    "vehicleFiaFlags": "vehicle_fia_flags",
+}
+
+
+def _display_name(name_bytes: bytes, race_number: int, index: int) -> str:
+    """Decode a participant name, falling back to 'Driver N' for hidden or placeholder names."""
+    try:
+        name_str = decode_participant_name(name_bytes)
+    except Exception as e:
+        logger.error(f"Error decoding participant name for index {index}: {e}")
+        name_str = ""
+    if (
+        not name_str
+        or name_str == "???????????????"
+        or name_str.lower() == "player"
+        or name_str.isspace()
+    ):
+        name_str = f"Driver {race_number if race_number != 0 else index + 1}"
+    return name_str
+
+
+class TelemetrySnapshot:
+    """
+    An immutable, consistent view of the store at one version.
+
+    The records are a read-only view over a bytes copy of the back buffer, and
+    the session dicts and names are never
+    mutated after publication, so a snapshot can be read from any thread.
+    """
+
+    __slots__ = (
+        "version",
+        "data",
+        "names",
+        "session",
+        "enhanced_session",
+        "active_drivers",
+        "motion_received",
+        "lap_data_received",
+        "participants_received",
+        "car_status_received",
+    )
+
+    def __init__(
+        self,
+        version: int,
+        data: np.ndarray,
+        names: Tuple[str, ...],
+        session: dict,
+        enhanced_session: dict,
+        active_drivers: int,
+        motion_received: bool,
+        lap_data_received: bool,
+        participants_received: bool,
+        car_status_received: bool,
+    ):
+        self.version = version
+        self.data = data
+        self.names = names
+        self.session = session
+        self.enhanced_session = enhanced_session
+        self.active_drivers = active_drivers
+        self.motion_received = motion_received
+        self.lap_data_received = lap_data_received
+        self.participants_received = participants_received
+        self.car_status_received = car_status_received
+
+    def active_count(self) -> int:
+        return min(self.active_drivers, len(self.data))
+
+    def column(self, name: str, count: Optional[int] = None) -> np.ndarray:
+        """Column slice for the first ``count`` cars (all active cars by default)."""
+        return self.data[name][: self.active_count() if count is None else count]
+
+    def records(self, keys: Dict[str, str], count: Optional[int] = None) -> List[dict]:
+        """Build per-car dicts for ``{output_key: column}`` from whole-column reads."""
+        count = self.active_count() if count is None else count
+        values = [self.data[column][:count].tolist() for column in keys.values()]
+        return [dict(zip(keys, row)) for row in zip(*values)]
+
+    def participant_records(self, count: Optional[int] = None) -> List[dict]:
+        """Participant dicts in the shape the listener used to store them."""
+        count = self.active_count() if count is None else count
+        records = self.records(PARTICIPANT_KEYS, count)
+        online = (
+            (self.data["network_id"][:count] != 0)
+            & (self.data["network_id"][:count] != 255)
+            & (self.data["driver_id"][:count] == 255)
+        ).tolist()
+        raw_names = self.data["name"][:count].tolist()
+        status = self.records(CAR_STATUS_KEYS, count) if self.car_status_received else None
+        for i, record in enumerate(records):
+            record["name"] = self.names[i]
+            record["is_online_player"] = online[i]
+            record["raw_name_bytes"] = raw_names[i].ljust(48, b"\x00").hex()
+            if status:
+                record.update(status[i])
+        return records
+
+
+class LiveTelemetryStore:
+    """
+    Latest telemetry for every car index, held as one NumPy column per field.
+
+    Only the listener thread writes to the store; everything else reads the
+    snapshot returned by ``snapshot()``.
+    """
+
+    def __init__(self, num_cars: int = MAX_CARS, traces: Optional[CarTelemetryTraces] = None):
+        self.num_cars = num_cars
+        # Back buffer written by the listener; columns are views of its fields.
+        # It is kept as raw bytes too so publishing is a single memcpy.
+        self.raw = np.zeros(num_cars * STORE_DTYPE.itemsize, dtype=np.uint8)
+        self.data = self.raw.view(STORE_DTYPE)
+        self.columns: Dict[str, np.ndarray] = {
+            name: self.data[name] for name in STORE_DTYPE.names
+        }
+        self.names: Tuple[str, ...] = ("",) * num_cars
+        # Replaced rather than updated, so published snapshots can share them
+        self.session: dict = {}
+        self.enhanced_session: dict = {}
+        self.active_drivers = 0
+        self.motion_received = False
+        self.lap_data_received = False
+        self.participants_received = False
+        self.car_status_received = False
+        # Recent CarTelemetry samples; read directly rather than through snapshots
+        self.traces = traces if traces is not None else CarTelemetryTraces()
+        # Distance->time history behind the gap and interval columns
+        self.timing = GapTimer(num_cars)
+        # Decoder counters for this feed, maintained by process_datagram
+        self.packets_processed = 0
+        self.packets_filtered = 0
+        self.metrics = PacketMetrics()
+        # When each packet type may next be decoded under the packet filter's decimation
+        self.next_decode_ns: List[int] = [0] * NUM_PACKET_IDS
+        self.version = 0
+        self._snapshot: Optional[TelemetrySnapshot] = None
+        self.publish()
+
+    def reset(self):
+        """Zero every column in place, forget session data and publish the empty state."""
+        self.data.fill(0)
+        self.names = ("",) * self.num_cars
+        self.session = {}
+        self.enhanced_session = {}
+        self.active_drivers = 0
+        self.motion_received = False
+        self.lap_data_received = False
+        self.participants_received = False
+        self.car_status_received = False
+        self.traces.reset()
+        self.timing.reset()
+        self.packets_processed = 0
+        self.packets_filtered = 0
+        self.metrics.reset()
+        self.next_decode_ns = [0] * NUM_PACKET_IDS
+        self.publish()
+
+    def publish(self) -> TelemetrySnapshot:
+        """Copy the back buffer into a new snapshot and swap it in."""
+        self.version += 1
+        snapshot = TelemetrySnapshot(
+            self.version,
+            np.frombuffer(self.raw.tobytes(), dtype=STORE_DTYPE),
+            self.names,
+            self.session,
+            self.enhanced_session,
+            self.active_drivers,
+            self.motion_received,
+            self.lap_data_received,
+            self.participants_received,
+            self.car_status_received,
+        )
+        # A single reference assignment, so readers see either the old or the new frame
+        self._snapshot = snapshot
+        return snapshot
+
+    def snapshot(self) -> TelemetrySnapshot:
+        """The most recently published snapshot."""
+        return self._snapshot
+
+    # --- Writers (listener side) ---
+
+    def _copy_fields(self, records: np.ndarray, names):
+        columns = self.columns
+        for name in names:
+            columns[name][:] = records[name]
+
+    def apply_motion(self, data: bytes):
+        self._copy_fields(car_motion_array(data), CAR_MOTION.names)
+        self.motion_received = True
+
+    def apply_lap_data(self, data: bytes):
+        records = lap_data_array(data)
+        columns = self.columns
+        lap_num = columns["current_lap_num"]
+        finished = (records["current_lap_num"] > lap_num) & (lap_num > 0)
+        if finished.any():
+            columns[LAST_LAP_INVALID][finished] = columns["current_lap_invalid"][finished]
+            for last_name, current_name in LAST_LAP_SECTOR_COLUMNS.items():
+                columns[last_name][finished] = columns[current_name][finished]
+        self._copy_fields(records, _LAP_DATA_DIRECT)
+        for column_name, (minutes_part, ms_part) in SECTOR_TIME_COLUMNS.items():
+            column = self.columns[column_name]
+            column[:] = records[minutes_part]
+            column *= 60000
+            column += records[ms_part]
+        self._update_timing(data)
+        self.lap_data_received = True
+
+    def _update_timing(self, data: bytes):
+        columns = self.columns
+        session_time = SESSION_TIME_AND_FRAME.unpack_from(data, SESSION_TIME_OFFSET)[0]
+        timing = self.timing.update(
+            session_time,
+            columns["total_distance"],
+            columns["car_position"],
+            self.session.get("trackLength") or 0,
+        )
+        if timing is None:
+            return  # Not due yet; the previous gaps stay in place
+        gap, interval, laps_behind = timing
+        columns["gap_to_leader_ms"][:] = gap
+        columns["interval_ms"][:] = interval
+        columns["laps_behind_leader"][:] = laps_behind
+
+    def apply_participants(self, data: bytes):
+        records = participants_array(data)
+        self._copy_fields(records, PARTICIPANT.names)
+        self.active_drivers = participants_num_active(data)
+
+        # Names only change when participants do, so decode them here rather than on every read
+        num_active = min(self.active_drivers, self.num_cars)
+        race_numbers = records["race_number"].tolist()
+        self.names = tuple(
+            _display_name(name_bytes, race_numbers[i], i) if i < num_active else ""
+            for i, name_bytes in enumerate(records["name"].tolist())
+        )
+        self.participants_received = True
+
+    def apply_car_status(self, data: bytes):
+        self._copy_fields(car_status_array(data), CAR_STATUS.names)
+        self.car_status_received = True
+
+    def apply_car_telemetry(self, data: bytes):
+        # Fills the trace ring only; no store column changes, so there is nothing to publish
+        columns = self.columns
+        self.traces.append(data, columns["lap_distance"], columns["current_lap_num"])
+
+    def set_session(self, session: dict, enhanced_session: dict):
+        self.session = session
+        self.enhanced_session = enhanced_session
@@ -0,0 +1,169 @@
+"""
+Live gap-to-leader and interval timing from LapData.
+
+Every car's total race distance is divided into TIMING_STEP_M "timing loops".
+On each LapData packet the session time at which each car crossed any new
+loops (interpolated between packets) is written into a per-car ring indexed
+by loop number, so the history is a fixed (cars x loops) array that is never
+scanned. A car's gap to another car is then one lookup: the current session
+time minus the time the other car passed the loop this car is at now.
+
+All 22 cars are handled with whole-array operations, so an update costs the
+same few dozen NumPy calls whatever the field spread.
+"""
+
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.services.telemetry_decoder import MAX_CARS
+
+DEFAULT_TIMING_STEP_M = 10.0
+# Loop history kept per car; must exceed the distance between leader and last car that
+# should still get a time gap (lapped cars beyond it only report laps behind)
+DEFAULT_TIMING_HISTORY_M = 25000.0
+# Jumps longer than this (flashbacks, teleports to the pits) restart a car's interpolation
+MAX_INTERPOLATED_LOOPS = 50
+# Loop crossings are recorded on every LapData packet, but gaps are recomputed at most
+# this often (session time); LapData can arrive at 60 Hz and gaps are shown to the ms
+GAP_REFRESH_SECONDS = 0.1
+
+UNKNOWN_GAP = -1  # Stored in the gap columns when no time gap is available
+
+
+def get_timing_step_m() -> float:
+    try:
+        return max(float(os.getenv("LIVE_TIMING_STEP_M", DEFAULT_TIMING_STEP_M)), 1.0)
+    except ValueError:
+        return DEFAULT_TIMING_STEP_M
+
+
+class GapTimer:
+    """Per-car distance->time history and the gap/interval lookups over it."""
+
+    def __init__(
+        self,
+        num_cars: int = MAX_CARS,
+        step_m: Optional[float] = None,
+        history_m: float = DEFAULT_TIMING_HISTORY_M,
+    ):
+        self.num_cars = num_cars
+        self.step_m = step_m or get_timing_step_m()
+        self.loops = int(history_m // self.step_m)
+        self._rows = np.arange(num_cars)
+        self.reset()
+
+    def reset(self):
+        # Session time each car crossed each loop, and which loop number the entry is for
+        self.crossed_at = np.zeros((self.num_cars, self.loops), dtype=np.float64)
+        self.loop_ids = np.full((self.num_cars, self.loops), -1, dtype=np.int64)
+        self.last_loop = np.full(self.num_cars, -1, dtype=np.int64)
+        self.last_distance = np.zeros(self.num_cars, dtype=np.float64)
+        self.last_time = 0.0  # Every LapData packet carries all cars, so one time for all
+        self.computed_at: Optional[float] = None
+
+    def _record(self, now: float, distance: np.ndarray):
+        loop = (distance // self.step_m).astype(np.int64)
+        crossed = loop - self.last_loop
+        # First sighting, a jump or going backwards: start from the current loop
+        restart = (self.last_loop < 0) | (crossed < 0) | (crossed > MAX_INTERPOLATED_LOOPS)
+        if restart.any():
+            rows = self._rows[restart]
+            slots = loop[restart] % self.loops
+            self.crossed_at[rows, slots] = now
+            self.loop_ids[rows, slots] = loop[restart]
+
+        moving = ~restart & (crossed > 0)
+        if moving.any():
+            rows = self._rows[moving]
+            first_loop = self.last_loop[moving] + 1
+            from_distance = self.last_distance[moving]
+            travelled = np.maximum(distance[moving] - from_distance, 1e-6)
+            elapsed = now - self.last_time
+            passed = crossed[moving]
+            # Time each loop passed since the previous packet by linear interpolation;
+            # usually one step, as a car covers a loop or less between packets
+            for step in range(int(passed.max())):
+                passing = passed > step
+                target = first_loop[passing] + step
+                fraction = (target * self.step_m - from_distance[passing]) / travelled[passing]
+                slots = target % self.loops
+                self.crossed_at[rows[passing], slots] = self.last_time + fraction * elapsed
+                self.loop_ids[rows[passing], slots] = target
+
+        self.last_loop = loop
+        self.last_distance = distance
+        self.last_time = now
+
+    def _time_at(self, rows: np.ndarray, distance: np.ndarray) -> np.ndarray:
+        """When cars ``rows`` passed ``distance`` (NaN where no longer or not yet in the history)."""
+        position = distance / self.step_m
+        loop = np.floor(position).astype(np.int64)
+        # Flat indices into the (cars x loops) arrays; cheaper than 2-D fancy indexing
+        flat = rows * self.loops
+        slot, next_slot = flat + loop % self.loops, flat + (loop + 1) % self.loops
+        loop_ids, crossed_at = self.loop_ids.ravel(), self.crossed_at.ravel()
+        t0 = np.where(loop_ids[slot] == loop, crossed_at[slot], np.nan)
+        t1 = crossed_at[next_slot]
+        # The car ahead may not have reached the next loop yet; fall back to the loop itself
+        return np.where(loop_ids[next_slot] == loop + 1, t0 + (position - loop) * (t1 - t0), t0)
+
+    def update(
+        self,
+        now: float,
+        total_distance: np.ndarray,
+        position: np.ndarray,
+        track_length: float = 0.0,
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Record one LapData packet and return (gap to leader ms, interval ms, laps behind).
+
+        ``total_distance`` and ``position`` hold one entry per car; cars with no
+        race position are ignored. Gaps are UNKNOWN_GAP where no time is available.
+        Returns None when the gaps were recomputed less than GAP_REFRESH_SECONDS ago.
+        """
+        count = len(total_distance)
+        distance = np.zeros(self.num_cars, dtype=np.float64)
+        distance[:count] = np.maximum(total_distance, 0.0)
+        positions = np.zeros(self.num_cars, dtype=np.int64)
+        positions[:count] = position
+        self._record(now, distance)
+        # A session time going backwards (flashback, restart) always recomputes
+        if self.computed_at is not None and 0 <= now - self.computed_at < GAP_REFRESH_SECONDS:
+            return None
+        self.computed_at = now
+
+        gap = np.full(self.num_cars, UNKNOWN_GAP, dtype=np.int32)
+        interval = np.full(self.num_cars, UNKNOWN_GAP, dtype=np.int32)
+        laps_behind = np.zeros(self.num_cars, dtype=np.uint8)
+        placed = positions > 0
+        if not placed.any():
+            return gap, interval, laps_behind
+
+        # Car index at each race position (position 0 unused)
+        by_position = np.full(self.num_cars + 2, -1, dtype=np.int64)
+        by_position[positions[placed]] = self._rows[placed]
+        leader = by_position[1]
+        if leader < 0:
+            return gap, interval, laps_behind
+
+        # Gap to the leader and to the car ahead in one lookup over both sets of rows
+        rows = self._rows[placed]
+        ahead = by_position[positions[rows] - 1]
+        has_ahead = ahead >= 0
+        targets = np.concatenate((np.full(len(rows), leader), ahead[has_ahead]))
+        at = np.concatenate((distance[rows], distance[rows][has_ahead]))
+        gaps = now - self._time_at(targets, at)
+        leader_gap = gaps[: len(rows)]
+        ahead_gap = np.full(len(rows), np.nan)
+        ahead_gap[has_ahead] = gaps[len(rows) :]
+
+        gap[rows] = np.where(np.isnan(leader_gap), UNKNOWN_GAP, np.rint(leader_gap * 1000))
+        gap[leader] = 0
+        interval[rows] = np.where(np.isnan(ahead_gap), UNKNOWN_GAP, np.rint(ahead_gap * 1000))
+        interval[leader] = 0
+        if track_length:
+            behind = (distance[leader] - distance[rows]) // track_length
+            laps_behind[rows] = np.clip(behind, 0, 255)
+        return gap, interval, laps_behind
@@ -0,0 +1,114 @@
+"""
+Runtime packet filter: which packet types are decoded, and at most how often.
+
+Decisions are made from the packet ID byte of the raw header, before any
+decoding: a disabled type is one list lookup, a decimated type one comparison
+against the next time it may be decoded. Decimation keeps to a fixed schedule
+(every 1/rate seconds) rather than "at least 1/rate since the last one", so a
+60 Hz feed limited to 20 Hz yields every third packet instead of every fourth.
+
+The configuration is shared by every feed; decimation schedules are per feed
+(``LiveTelemetryStore.next_decode_ns``). ``to_bytes()``/``load()`` carry the
+configuration into listener processes.
+"""
+
+import math
+import struct
+from typing import Dict, Iterable, List, Optional
+
+from app.services.telemetry_decoder import NUM_PACKET_IDS
+
+# A packet this close (as a fraction of the interval) before its slot still counts, to absorb jitter
+DECIMATION_TOLERANCE = 0.25
+
+# generation, enabled flags, minimum interval in ns per packet ID
+FILTER_STATE = struct.Struct(f"<Q{NUM_PACKET_IDS}B{NUM_PACKET_IDS}Q")
+_MAX_INTERVAL_NS = 2**64 - 1  # Largest interval the Q fields of FILTER_STATE hold
+
+
+def _interval_ns(rate_hz: Optional[float]) -> int:
+    """Minimum decode interval for a max rate (None or 0 for no limit); ValueError if unusable."""
+    if not rate_hz:
+        return 0
+    if not math.isfinite(rate_hz) or rate_hz < 0:
+        raise ValueError("Packet rates must be positive and finite")
+    interval = 1e9 / rate_hz
+    if interval > _MAX_INTERVAL_NS:
+        raise ValueError(f"Packet rate {rate_hz:g} Hz is too low")
+    return int(interval)
+
+
+class PacketFilter:
+    """Enabled packet IDs and per-type decimation, changeable while listeners run."""
+
+    def __init__(self, enabled_ids: Iterable[int], max_rates_hz: Optional[Dict[int, float]] = None):
+        self.enabled: List[bool] = [False] * NUM_PACKET_IDS
+        self.min_interval_ns: List[int] = [0] * NUM_PACKET_IDS
+        self.generation = 0  # Bumped on every change
+        self.configure(enabled_ids, rates_hz=max_rates_hz)
+        self.generation = 0
+
+    def max_rate_hz(self, packet_id: int) -> Optional[float]:
+        interval = self.min_interval_ns[packet_id]
+        return round(1e9 / interval, 3) if interval else None
+
+    def enabled_ids(self) -> List[int]:
+        return [packet_id for packet_id, enabled in enumerate(self.enabled) if enabled]
+
+    def configure(
+        self,
+        enable: Iterable[int] = (),
+        disable: Iterable[int] = (),
+        rates_hz: Optional[Dict[int, Optional[float]]] = None,
+    ):
+        """
+        Enable/disable packet IDs and set max decode rates (None or 0 removes the limit).
+        Raises ValueError, changing nothing, if any ID or rate is invalid.
+        """
+        enable, disable = list(enable), list(disable)
+        for packet_id in enable + disable + list(rates_hz or {}):
+            if not 0 <= packet_id < NUM_PACKET_IDS:
+                raise ValueError(f"Packet ID {packet_id} is out of range 0-{NUM_PACKET_IDS - 1}")
+        intervals = {packet_id: _interval_ns(rate) for packet_id, rate in (rates_hz or {}).items()}
+        for packet_id in enable:
+            self.enabled[packet_id] = True
+        for packet_id in disable:
+            self.enabled[packet_id] = False
+        for packet_id, interval in intervals.items():
+            self.min_interval_ns[packet_id] = interval
+        self.generation += 1
+
+    def allows(self, packet_id: int, now_ns: int, next_decode_ns: List[int]) -> bool:
+        """Whether to decode a packet arriving at ``now_ns``, advancing the feed's schedule if so."""
+        if packet_id >= NUM_PACKET_IDS or not self.enabled[packet_id]:
+            return False
+        interval = self.min_interval_ns[packet_id]
+        if not interval:
+            return True
+        due = next_decode_ns[packet_id]
+        if now_ns < due - interval * DECIMATION_TOLERANCE:
+            return False
+        # Stay on schedule, but start a new one after a pause instead of catching up
+        slot = due if now_ns - due < interval else now_ns
+        next_decode_ns[packet_id] = slot + interval
+        return True
+
+    # --- Process handoff ---
+
+    def to_bytes(self) -> bytes:
+        return FILTER_STATE.pack(self.generation, *self.enabled, *self.min_interval_ns)
+
+    def load(self, data: bytes):
+        values = FILTER_STATE.unpack(data)
+        self.generation = values[0]
+        self.enabled = [bool(flag) for flag in values[1 : 1 + NUM_PACKET_IDS]]
+        self.min_interval_ns = list(values[1 + NUM_PACKET_IDS :])
+
+
+def parse_packet_rates(spec: str) -> Dict[int, float]:
+    """Parse ``"0:20,6:10"`` (packet ID: max Hz) as used by TELEMETRY_PACKET_RATES."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        packet_id, rate = item.split(":")
+        rates[int(packet_id)] = float(rate)
+    return rates
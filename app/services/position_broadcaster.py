@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.position_codec import Bounds, PositionDeltaEncoder
+from app.services.websocket import COALESCE, ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+POSITIONS_CHANNEL = "positions"
+
+# Tick rate for live position frames pushed over /ws
+DEFAULT_POSITIONS_HZ = 30
+MAX_POSITIONS_HZ = 60
+# Cars that moved less than this since they were last sent are left out of delta frames
+DEFAULT_DELTA_THRESHOLD_M = 0.25
+
+# (car indices, world_x, world_z) for every car to draw
+Positions = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def get_positions_rate_hz() -> float:
+    """Read LIVE_POSITIONS_HZ from the environment, clamped to 1-60 Hz."""
+    try:
+        rate = float(os.getenv("LIVE_POSITIONS_HZ", DEFAULT_POSITIONS_HZ))
+    except ValueError:
+        logger.warning("Invalid LIVE_POSITIONS_HZ, using the default rate")
+        rate = DEFAULT_POSITIONS_HZ
+    return min(max(rate, 1.0), MAX_POSITIONS_HZ)
+
+
+def get_delta_threshold_m() -> float:
+    """Read LIVE_POSITIONS_DELTA_M from the environment."""
+    try:
+        return max(float(os.getenv("LIVE_POSITIONS_DELTA_M", DEFAULT_DELTA_THRESHOLD_M)), 0.0)
+    except ValueError:
+        logger.warning("Invalid LIVE_POSITIONS_DELTA_M, using the default threshold")
+        return DEFAULT_DELTA_THRESHOLD_M
+
+
+class PositionBroadcaster:
+    """
+    Samples live car positions at a fixed rate and pushes binary position
+    frames (see position_codec) to clients subscribed to the positions channel.
+
+    A keyframe with every car goes out once a second, when a client subscribes,
+    or when the roster or track changes; other ticks send only the cars that
+    moved. Names and teams go out in a separate JSON roster message.
+    """
+
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        positions_source: Callable[[], Positions],
+        roster_source: Callable[[], List[dict]],
+        rate_hz: Optional[float] = None,
+        bounds_source: Optional[Callable[[], Optional[Bounds]]] = None,
+    ):
+        self.manager = manager
+        self.positions_source = positions_source
+        self.roster_source = roster_source
+        self.bounds_source = bounds_source
+        self.rate_hz = rate_hz or get_positions_rate_hz()
+        self.encoder = PositionDeltaEncoder(
+            keyframe_interval=round(self.rate_hz), threshold_m=get_delta_threshold_m()
+        )
+        self._task: Optional[asyncio.Task] = None
+        self._last_roster: Optional[List[dict]] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Live position broadcaster started at {self.rate_hz:g} Hz")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def request_roster(self):
+        """Resend the roster and a keyframe on the next tick (e.g. for a new subscriber)."""
+        self._last_roster = None
+        self.encoder.request_keyframe()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.rate_hz
+        next_tick = loop.time()
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.exception(f"Error broadcasting live positions: {e}")
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # Fell behind (e.g. slow clients); skip missed ticks instead of bursting
+                next_tick = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    async def tick(self):
+        if not self.manager.has_subscribers(POSITIONS_CHANNEL):
+            return
+
+        roster = self.roster_source()
+        if roster != self._last_roster:
+            self._last_roster = roster
+            self.encoder.request_keyframe()
+            await self.manager.broadcast(
+                {"type": "roster", "cars": roster}, channel=POSITIONS_CHANNEL
+            )
+
+        if self.bounds_source:
+            self.encoder.set_bounds(self.bounds_source())
+
+        frame = self.encoder.encode(*self.positions_source())
+        if frame is None:
+            return  # Nothing moved (paused game or stopped listener)
+        # Slow clients only ever hold the newest frame of each kind rather than a
+        # backlog; a dropped delta is repaired by the next keyframe
+        kind = "keyframe" if self.encoder.last_was_keyframe else "delta"
+        await self.manager.broadcast(
+            frame,
+            channel=POSITIONS_CHANNEL,
+            policy=COALESCE,
+            key=f"{POSITIONS_CHANNEL}:{kind}",
+        )
@@ -0,0 +1,132 @@
+"""
+Binary, delta-encoded live position frames for the track map.
+
+Frame layout (little-endian):
+
+    u8   frame type (FRAME_TYPE_POSITIONS)
+    u8   flags (bit 0: keyframe)
+    u16  sequence number (wraps)
+    u8   number of car records
+    -- keyframes only --
+    f32  origin x, f32 origin z, f32 metres per quantisation step
+    -- then per car --
+    u8   car index, i16 x, i16 z   (position = origin + value * scale)
+
+Keyframes carry every car and replace the client's state; delta frames only
+carry cars that moved more than the threshold since they were last sent.
+"""
+
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.services.telemetry_decoder import MAX_CARS
+
+FRAME_TYPE_POSITIONS = 1
+FLAG_KEYFRAME = 0x01
+
+FRAME_HEADER = struct.Struct("<BBHB")
+KEYFRAME_BOUNDS = struct.Struct("<fff")
+CAR_RECORD = np.dtype([("idx", "u1"), ("x", "<i2"), ("z", "<i2")])  # 5 bytes, packed
+
+QUANT_LIMIT = 32767
+# Game coordinates don't line up exactly with the GeoJSON outline, so leave room around it
+BOUNDS_MARGIN_FRACTION = 0.5
+MIN_BOUNDS_MARGIN_M = 500.0
+# Used until a track outline is available: +/-2 km around the origin (~6 cm steps)
+DEFAULT_HALF_EXTENT_M = 2000.0
+
+Bounds = Tuple[float, float, float, float]  # min_x, max_x, min_z, max_z (game world axes)
+
+
+class PositionDeltaEncoder:
+    """Quantises car positions to int16 and emits keyframes or delta frames."""
+
+    def __init__(self, keyframe_interval: int = 30, threshold_m: float = 0.25):
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.threshold_m = threshold_m
+        self.sequence = 0
+        self.origin_x = 0.0
+        self.origin_z = 0.0
+        self.scale = DEFAULT_HALF_EXTENT_M / QUANT_LIMIT
+        self._bounds: Optional[Bounds] = None
+        self._last_x = np.zeros(MAX_CARS, dtype=np.int16)
+        self._last_z = np.zeros(MAX_CARS, dtype=np.int16)
+        self._sent = np.zeros(MAX_CARS, dtype=bool)
+        self._frames_since_keyframe = 0
+        self._force_keyframe = True
+        self.last_was_keyframe = False
+
+    def request_keyframe(self):
+        self._force_keyframe = True
+
+    def set_bounds(self, bounds: Optional[Bounds]):
+        """Fit the quantisation grid to the track; a change forces a keyframe."""
+        if bounds == self._bounds:
+            return
+        self._bounds = bounds
+        if bounds is None:
+            self.origin_x = self.origin_z = 0.0
+            half_extent = DEFAULT_HALF_EXTENT_M
+        else:
+            min_x, max_x, min_z, max_z = bounds
+            self.origin_x = (min_x + max_x) / 2
+            self.origin_z = (min_z + max_z) / 2
+            half_extent = max(max_x - min_x, max_z - min_z) / 2
+            half_extent += max(half_extent * BOUNDS_MARGIN_FRACTION, MIN_BOUNDS_MARGIN_M)
+        self.scale = half_extent / QUANT_LIMIT
+        self._force_keyframe = True
+
+    def _quantise(self, values: np.ndarray, origin: float) -> np.ndarray:
+        steps = np.rint((values.astype(np.float64) - origin) / self.scale)
+        return np.clip(steps, -QUANT_LIMIT, QUANT_LIMIT).astype(np.int16)
+
+    def encode(
+        self, indices: np.ndarray, xs: np.ndarray, zs: np.ndarray
+    ) -> Optional[bytes]:
+        """Encode the current positions; returns None when no car moved past the threshold."""
+        qx = self._quantise(xs, self.origin_x)
+        qz = self._quantise(zs, self.origin_z)
+
+        keyframe = (
+            self._force_keyframe or self._frames_since_keyframe >= self.keyframe_interval
+        )
+        if keyframe:
+            selected = slice(None)
+            self._sent[:] = False
+        else:
+            threshold = self.threshold_m / self.scale
+            changed = (
+                ~self._sent[indices]
+                | (np.abs(qx.astype(np.int32) - self._last_x[indices]) > threshold)
+                | (np.abs(qz.astype(np.int32) - self._last_z[indices]) > threshold)
+            )
+            if not changed.any():
+                self._frames_since_keyframe += 1
+                return None
+            selected = changed
+
+        records = np.empty(len(indices[selected]), dtype=CAR_RECORD)
+        records["idx"] = indices[selected]
+        records["x"] = qx[selected]
+        records["z"] = qz[selected]
+
+        self._last_x[records["idx"]] = records["x"]
+        self._last_z[records["idx"]] = records["z"]
+        self._sent[records["idx"]] = True
+
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        self.last_was_keyframe = keyframe
+        if keyframe:
+            self._force_keyframe = False
+            self._frames_since_keyframe = 0
+            header = FRAME_HEADER.pack(
+                FRAME_TYPE_POSITIONS, FLAG_KEYFRAME, self.sequence, len(records)
+            ) + KEYFRAME_BOUNDS.pack(self.origin_x, self.origin_z, self.scale)
+        else:
+            self._frames_since_keyframe += 1
+            header = FRAME_HEADER.pack(
+                FRAME_TYPE_POSITIONS, 0, self.sequence, len(records)
+            )
+        return header + records.tobytes()
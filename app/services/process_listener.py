@@ -0,0 +1,473 @@
+"""
+Process-based UDP telemetry listener with a shared-memory handoff.
+
+The child process owns the socket, decodes every datagram into its own
+LiveTelemetryStore and, instead of building snapshots, copies the store's
+back buffer into a ``multiprocessing.shared_memory`` block guarded by a
+sequence lock. The API process rebuilds an immutable TelemetrySnapshot from
+that block on demand, so packet parsing never competes with request handling
+for the GIL.
+
+Shared block layout:
+
+    header (SHM_HEADER)  seq, version, published_at, packets processed/filtered,
+                         active drivers, received flags, meta version, meta length
+    store records        LiveTelemetryStore.raw (num_cars * STORE_DTYPE.itemsize)
+    meta                 JSON names and session dicts, rewritten only when they change
+    metrics              per-packet-type counters (METRICS_DTYPE), refreshed a few times a second
+    packet filter        written by the API process (own sequence word), polled by the child
+    car telemetry traces CarTelemetryTraces ring, written in place by the child and
+                         read lock-free by the API process
+"""
+
+import json
+import logging
+import multiprocessing
+import queue
+import socket
+import struct
+import time
+import traceback
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from app.services.car_telemetry_traces import CarTelemetryTraces, trace_capacity, traces_nbytes
+from app.services.live_store import STORE_DTYPE, LiveTelemetryStore, TelemetrySnapshot
+from app.services.packet_filter import FILTER_STATE, PacketFilter
+from app.services.telemetry_capture import CaptureWriter
+from app.services.telemetry_metrics import METRICS_BYTES, METRICS_DTYPE
+from app.services.telemetry_decoder import MAX_CARS, RECV_BUFFER_SIZE
+
+logger = logging.getLogger(__name__)
+
+# seq (odd while the child is writing), version, published_at (time.time()),
+# packets_processed, packets_filtered, active_drivers, flags, meta_version, meta_length
+SHM_HEADER = struct.Struct("<QQdQQIIQI")
+SEQ = struct.Struct("<Q")
+STORE_BYTES = MAX_CARS * STORE_DTYPE.itemsize
+META_CAPACITY = 16384
+FILTER_BYTES = SEQ.size + FILTER_STATE.size
+# Sized from CAR_TELEMETRY_TRACE_SECONDS, which the spawned child inherits
+TRACE_CAPACITY = trace_capacity()
+TRACES_BYTES = traces_nbytes(TRACE_CAPACITY)
+SHM_SIZE = (
+    SHM_HEADER.size + STORE_BYTES + META_CAPACITY + METRICS_BYTES + FILTER_BYTES + TRACES_BYTES
+)
+
+_STORE_OFFSET = SHM_HEADER.size
+_META_OFFSET = _STORE_OFFSET + STORE_BYTES
+_METRICS_OFFSET = _META_OFFSET + META_CAPACITY
+_FILTER_OFFSET = _METRICS_OFFSET + METRICS_BYTES
+_TRACES_OFFSET = _FILTER_OFFSET + FILTER_BYTES
+
+FLAG_MOTION = 0x01
+FLAG_LAP_DATA = 0x02
+FLAG_PARTICIPANTS = 0x04
+FLAG_CAR_STATUS = 0x08
+
+# Spawned interpreters import the app afresh, which takes a moment
+STARTUP_TIMEOUT_SECONDS = 15.0
+STOP_TIMEOUT_SECONDS = 3.0
+SEQLOCK_RETRIES = 1000
+# Smoothing factor for the average IPC lag
+LAG_EWMA_ALPHA = 0.1
+# Metrics are copied into the block at most this often
+METRICS_PUBLISH_INTERVAL_SECONDS = 0.25
+# The child checks for a new packet filter every this many datagrams, and when idle
+FILTER_SYNC_PACKETS = 64
+
+
+class SharedMemoryTelemetryStore(LiveTelemetryStore):
+    """Child-side store whose ``publish()`` writes into the shared block."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, num_cars: int = MAX_CARS):
+        self.shm = shm
+        self._seq = 0
+        self._meta_version = 0
+        self._meta_length = 0
+        self._meta_source: Optional[tuple] = None
+        self._metrics_published_at = 0.0
+        self._filter_seq = 0
+        super().__init__(num_cars, traces=_shared_traces(shm))
+
+    def _encode_meta(self):
+        # names and session dicts are replaced, never mutated, so identity tells us they changed
+        source = (self.names, self.session, self.enhanced_session)
+        if self._meta_source is not None and all(
+            a is b for a, b in zip(source, self._meta_source)
+        ):
+            return None
+        self._meta_source = source
+        meta = json.dumps(
+            {
+                "names": self.names,
+                "session": self.session,
+                "enhanced_session": self.enhanced_session,
+            }
+        ).encode("utf-8")
+        if len(meta) > META_CAPACITY:
+            logger.warning(f"Telemetry metadata of {len(meta)} bytes does not fit shared memory")
+            return None
+        return meta
+
+    def publish(self):
+        self.version += 1
+        meta = self._encode_meta()
+        flags = (
+            (FLAG_MOTION if self.motion_received else 0)
+            | (FLAG_LAP_DATA if self.lap_data_received else 0)
+            | (FLAG_PARTICIPANTS if self.participants_received else 0)
+            | (FLAG_CAR_STATUS if self.car_status_received else 0)
+        )
+        buf = self.shm.buf
+        now = time.time()
+        metrics = None
+        if now - self._metrics_published_at >= METRICS_PUBLISH_INTERVAL_SECONDS:
+            self._metrics_published_at = now
+            metrics = self.metrics.to_records()
+
+        # Seqlock write: odd sequence while the block is inconsistent
+        self._seq += 1
+        SEQ.pack_into(buf, 0, self._seq)
+        if meta is not None:
+            self._meta_version += 1
+            self._meta_length = len(meta)
+            buf[_META_OFFSET : _META_OFFSET + len(meta)] = meta
+        buf[_STORE_OFFSET:_META_OFFSET] = self.raw
+        if metrics is not None:
+            buf[_METRICS_OFFSET : _METRICS_OFFSET + METRICS_BYTES] = metrics.view(np.uint8)
+        self._seq += 1
+        SHM_HEADER.pack_into(
+            buf,
+            0,
+            self._seq,
+            self.version,
+            now,
+            self.packets_processed,
+            self.packets_filtered,
+            self.active_drivers,
+            flags,
+            self._meta_version,
+            self._meta_length,
+        )
+        return None
+
+    def flush_metrics(self):
+        """Copy the metrics out without publishing a new snapshot, e.g. while the feed is idle."""
+        self._metrics_published_at = time.time()
+        metrics = self.metrics.to_records()
+        buf = self.shm.buf
+        self._seq += 1
+        SEQ.pack_into(buf, 0, self._seq)
+        buf[_METRICS_OFFSET : _METRICS_OFFSET + METRICS_BYTES] = metrics.view(np.uint8)
+        self._seq += 1
+        SEQ.pack_into(buf, 0, self._seq)
+
+    def sync_packet_filter(self, packet_filter: PacketFilter):
+        """Load the filter the API process last wrote, if it changed."""
+        buf = self.shm.buf
+        seq = SEQ.unpack_from(buf, _FILTER_OFFSET)[0]
+        if seq == self._filter_seq or seq & 1:
+            return
+        state = bytes(buf[_FILTER_OFFSET + SEQ.size : _FILTER_OFFSET + FILTER_BYTES])
+        if SEQ.unpack_from(buf, _FILTER_OFFSET)[0] == seq:
+            packet_filter.load(state)
+            self._filter_seq = seq
+
+
+def _shared_traces(shm: shared_memory.SharedMemory) -> CarTelemetryTraces:
+    return CarTelemetryTraces(
+        TRACE_CAPACITY, shm.buf[_TRACES_OFFSET : _TRACES_OFFSET + TRACES_BYTES]
+    )
+
+
+def write_packet_filter(buf, seq: int, state: bytes) -> int:
+    """Seqlock-write a packet filter state into the block; returns the new sequence."""
+    SEQ.pack_into(buf, _FILTER_OFFSET, seq + 1)
+    buf[_FILTER_OFFSET + SEQ.size : _FILTER_OFFSET + FILTER_BYTES] = state
+    SEQ.pack_into(buf, _FILTER_OFFSET, seq + 2)
+    return seq + 2
+
+
+def listener_process_main(
+    host: str,
+    port: int,
+    shm_name: str,
+    stop_event,
+    status_queue,
+    capture_path: Optional[str] = None,
+):
+    """Entry point of the listener process."""
+    # Imported here so the spawned interpreter pulls in the decode path only
+    from app.api import telemetry
+    from app.services.telemetry_sessions import open_telemetry_socket
+
+    shm = None
+    store = None
+    sock = None
+    capture = None
+    try:
+        # Spawned children share the parent's resource tracker, so the block is unlinked once, by the parent
+        shm = shared_memory.SharedMemory(name=shm_name)
+        store = SharedMemoryTelemetryStore(shm)
+
+        store.sync_packet_filter(telemetry.packet_filter)
+
+        sock = open_telemetry_socket(host, port)
+        if capture_path:
+            capture = CaptureWriter(capture_path)
+        status_queue.put(("ready", None))
+
+        received = 0
+        while not stop_event.is_set():
+            try:
+                data = sock.recv(RECV_BUFFER_SIZE)
+            except socket.timeout:
+                store.flush_metrics()
+                store.sync_packet_filter(telemetry.packet_filter)
+                continue
+            received += 1
+            if received % FILTER_SYNC_PACKETS == 0:
+                store.sync_packet_filter(telemetry.packet_filter)
+            if capture is not None:
+                capture.write(data, port)
+            telemetry.process_datagram(data, store)
+    except Exception as e:
+        traceback.print_exc()
+        status_queue.put(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        if sock:
+            sock.close()
+        if capture:
+            capture.close()
+        if store is not None:
+            store.traces.release()  # The block can't be closed while arrays view it
+        if shm:
+            shm.close()
+
+
+class ProcessListener:
+    """Parent-side handle: starts the listener process and reads its shared snapshots."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        capture_path: Optional[str] = None,
+        filter_state: Optional[bytes] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.capture_path = capture_path  # Recorded by the child, which owns the socket
+        self.filter_state = filter_state  # PacketFilter.to_bytes() to start the child with
+        self._filter_seq = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._process = None
+        self._stop_event = None
+        self._status_queue = None
+        self.error: Optional[str] = None
+        self._seq = -1
+        self._meta_version = -1
+        self._meta = {"names": [""] * MAX_CARS, "session": {}, "enhanced_session": {}}
+        self._snapshot: Optional[TelemetrySnapshot] = None
+        self.traces: Optional[CarTelemetryTraces] = None  # The child's trace ring, while running
+        self._closing = (None, None)  # Traces and shared memory detached but not yet closed
+        self.packets_processed = 0
+        self.packets_filtered = 0
+        self.published_at: Optional[float] = None  # When the child last published, time.time()
+        # Age of each newly published snapshot when this process first read it
+        self.ipc_lag_ms: Optional[float] = None
+        self.ipc_lag_avg_ms: Optional[float] = None
+
+    def start(self, timeout: float = STARTUP_TIMEOUT_SECONDS):
+        """Spawn the listener and wait until its socket is bound; raises RuntimeError on failure."""
+        self._shm = shared_memory.SharedMemory(create=True, size=SHM_SIZE)
+        self._shm.buf[:SHM_HEADER.size] = bytes(SHM_HEADER.size)
+        self._shm.buf[_FILTER_OFFSET:_FILTER_OFFSET + SEQ.size] = bytes(SEQ.size)
+        self.traces = _shared_traces(self._shm)
+        self.traces.reset()
+        if self.filter_state is not None:
+            self.push_packet_filter(self.filter_state)
+        self._stop_event = self._context.Event()
+        self._status_queue = self._context.Queue()
+        self._process = self._context.Process(
+            target=listener_process_main,
+            args=(
+                self.host,
+                self.port,
+                self._shm.name,
+                self._stop_event,
+                self._status_queue,
+                self.capture_path,
+            ),
+            name=f"telemetry-listener-{self.port}",
+            daemon=True,
+        )
+        self._process.start()
+
+        try:
+            status, detail = self._status_queue.get(timeout=timeout)
+        except queue.Empty:
+            status, detail = "error", "listener process did not start in time"
+        if status != "ready":
+            self.error = detail
+            self.stop()
+            raise RuntimeError(detail)
+        logger.info(
+            f"Telemetry listener process {self._process.pid} started on {self.host}:{self.port}"
+        )
+
+    def push_packet_filter(self, state: bytes):
+        """Hand a new packet filter to the child, which picks it up within a few packets."""
+        self.filter_state = state
+        shm = self._shm
+        if shm is not None:
+            self._filter_seq = write_packet_filter(shm.buf, self._filter_seq, state)
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def poll_error(self) -> Optional[str]:
+        """Pick up an error reported by the child, if any."""
+        if self._status_queue is not None:
+            try:
+                while True:
+                    status, detail = self._status_queue.get_nowait()
+                    if status == "error":
+                        self.error = f"Error in telemetry worker: {detail}"
+            except (queue.Empty, OSError, ValueError):
+                pass
+        return self.error
+
+    def stop(self, timeout: float = STOP_TIMEOUT_SECONDS):
+        """Stop the child and free the shared memory, blocking until it exits."""
+        self.detach()
+        self.join(timeout)
+        self.close()
+
+    def detach(self):
+        """
+        Signal the child to stop and take the shared memory away from readers.
+
+        Call on the thread that reads snapshots and traces (the event loop),
+        then ``join()`` elsewhere and ``close()`` back on that thread.
+        """
+        if self._stop_event is not None:
+            self._stop_event.set()
+        self._closing = (self.traces, self._shm)
+        self.traces = None
+        self._shm = None
+
+    def join(self, timeout: float = STOP_TIMEOUT_SECONDS):
+        """Wait for the child to exit, terminating it after ``timeout``."""
+        if self._process is not None:
+            self._process.join(timeout)
+            if self._process.is_alive():
+                logger.warning("Telemetry listener process did not stop in time; terminating it")
+                self._process.terminate()
+                self._process.join(1.0)
+
+    def close(self):
+        """Release the queue and shared memory once the child has exited."""
+        self.poll_error()
+        if self._status_queue is not None:
+            self._status_queue.close()
+            self._status_queue = None
+        traces, shm = self._closing
+        self._closing = (None, None)
+        if traces is not None:
+            traces.release()
+        if shm is not None:
+            try:
+                shm.close()
+            except BufferError:
+                # A reader still holds a view; the mapping goes when it does
+                logger.warning("Telemetry listener shared memory is still in use; unlinking it")
+            finally:
+                shm.unlink()
+
+    def read_metrics(self) -> Optional[np.ndarray]:
+        """Per-packet-type counters last copied out by the child (METRICS_DTYPE records)."""
+        shm = self._shm
+        if shm is None:
+            return None
+        buf = shm.buf
+        for _ in range(SEQLOCK_RETRIES):
+            seq = SEQ.unpack_from(buf, 0)[0]
+            if seq & 1:
+                continue
+            raw = bytes(buf[_METRICS_OFFSET : _METRICS_OFFSET + METRICS_BYTES])
+            if SEQ.unpack_from(buf, 0)[0] == seq:
+                return np.frombuffer(raw, dtype=METRICS_DTYPE)
+        return None
+
+    def snapshot(self) -> Optional[TelemetrySnapshot]:
+        """Latest snapshot published by the child (cached until its sequence moves)."""
+        shm = self._shm
+        if shm is None:
+            return self._snapshot
+        buf = shm.buf
+        if SEQ.unpack_from(buf, 0)[0] == self._seq:
+            return self._snapshot
+
+        for _ in range(SEQLOCK_RETRIES):
+            header = SHM_HEADER.unpack_from(buf, 0)
+            seq = header[0]
+            if seq & 1:
+                continue  # Child is mid-write
+            raw = bytes(buf[_STORE_OFFSET:_META_OFFSET])
+            meta_version, meta_length = header[7], header[8]
+            meta_bytes = (
+                bytes(buf[_META_OFFSET : _META_OFFSET + meta_length])
+                if meta_version != self._meta_version
+                else None
+            )
+            if SEQ.unpack_from(buf, 0)[0] == seq:
+                break
+        else:
+            return self._snapshot
+
+        (
+            _,
+            version,
+            published_at,
+            self.packets_processed,
+            self.packets_filtered,
+            active_drivers,
+            flags,
+            _,
+            _,
+        ) = header
+        if meta_bytes is not None:
+            if meta_bytes:
+                self._meta = json.loads(meta_bytes)
+            self._meta_version = meta_version
+        self._seq = seq
+        new_version = self._snapshot is None or version != self._snapshot.version
+
+        if published_at and new_version:
+            self.published_at = published_at
+            lag_ms = max(time.time() - published_at, 0.0) * 1000
+            self.ipc_lag_ms = lag_ms
+            self.ipc_lag_avg_ms = (
+                lag_ms
+                if self.ipc_lag_avg_ms is None
+                else self.ipc_lag_avg_ms + LAG_EWMA_ALPHA * (lag_ms - self.ipc_lag_avg_ms)
+            )
+
+        self._snapshot = TelemetrySnapshot(
+            version,
+            np.frombuffer(raw, dtype=STORE_DTYPE),
+            tuple(self._meta["names"]),
+            self._meta["session"],
+            self._meta["enhanced_session"],
+            active_drivers,
+            bool(flags & FLAG_MOTION),
+            bool(flags & FLAG_LAP_DATA),
+            bool(flags & FLAG_PARTICIPANTS),
+            bool(flags & FLAG_CAR_STATUS),
+        )
+        return self._snapshot
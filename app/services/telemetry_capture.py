@@ -0,0 +1,174 @@
+"""
+Capture raw telemetry datagrams to disk and replay them.
+
+A capture is a small file header followed by one record per datagram:
+
+    header   magic, format version, capture start (time.time())
+    record   f64 seconds since the capture started, u16 UDP port,
+             u16 payload length, then the datagram bytes
+
+The writer maps the file into memory and grows it in large chunks, so
+recording a datagram is a struct pack and a slice copy with no system call.
+Closing truncates the file to what was written; a capture cut short by a
+crash ends at the first zero-length record.
+
+Replays feed the records to any ``on_datagram(data, port)`` callback, such as
+a listener's routing entry point, paced at the recorded rate, N times faster,
+or as fast as the callback can take them.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_MAGIC = b"F1CAP\x00\x00\x00"
+CAPTURE_FORMAT_VERSION = 1
+CAPTURE_HEADER = struct.Struct("<8sHxxd")  # magic, version, started_at
+RECORD_HEADER = struct.Struct("<dHH")  # seconds since start, port, payload length
+CAPTURE_EXTENSION = ".f1cap"
+# Files grow this much at a time; a race produces roughly 1 MB of telemetry per second
+CAPTURE_CHUNK_BYTES = 16 * 1024 * 1024
+
+CaptureRecord = Tuple[float, int, bytes]  # seconds since start, port, datagram
+
+
+class CaptureWriter:
+    """Appends timestamped datagrams to a memory-mapped capture file; thread-safe."""
+
+    def __init__(self, path: str, chunk_bytes: int = CAPTURE_CHUNK_BYTES):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+        self.records = 0
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "w+b")
+        try:
+            self._file.truncate(chunk_bytes)
+            self._mm: Optional[mmap.mmap] = mmap.mmap(self._file.fileno(), chunk_bytes)
+        except Exception:
+            self._file.close()
+            raise
+        CAPTURE_HEADER.pack_into(
+            self._mm, 0, CAPTURE_MAGIC, CAPTURE_FORMAT_VERSION, self.started_at
+        )
+        self._offset = CAPTURE_HEADER.size
+        logger.info(f"Recording telemetry capture to {path}")
+
+    @property
+    def size_bytes(self) -> int:
+        return self._offset
+
+    def write(self, data: bytes, port: int, timestamp: Optional[float] = None):
+        """Append one datagram, stamped now unless a timestamp is given; ignored once closed."""
+        length = len(data)
+        if timestamp is None:
+            timestamp = time.perf_counter() - self._start
+        with self._lock:
+            if self._mm is None:
+                return
+            end = self._offset + RECORD_HEADER.size + length
+            if end > len(self._mm):
+                self._mm.resize(len(self._mm) + max(self.chunk_bytes, end - len(self._mm)))
+            RECORD_HEADER.pack_into(self._mm, self._offset, timestamp, port, length)
+            self._mm[self._offset + RECORD_HEADER.size : end] = data
+            self._offset = end
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            if self._mm is None:
+                return
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+            self._file.truncate(self._offset)
+            self._file.close()
+        logger.info(f"Telemetry capture {self.path} closed: {self.records} datagrams, {self._offset} bytes")
+
+
+class CaptureReader:
+    """Reads a capture file through a read-only memory map."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < CAPTURE_HEADER.size:
+                raise ValueError(f"{path} is not a telemetry capture")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.started_at = CAPTURE_HEADER.unpack_from(self._mm, 0)
+        if magic != CAPTURE_MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a telemetry capture")
+        if version != CAPTURE_FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"Unsupported capture format version {version} in {path}")
+        self.size_bytes = size
+
+    def __iter__(self) -> Iterator[CaptureRecord]:
+        mm = self._mm
+        offset = CAPTURE_HEADER.size
+        end = len(mm)
+        while offset + RECORD_HEADER.size <= end:
+            timestamp, port, length = RECORD_HEADER.unpack_from(mm, offset)
+            start = offset + RECORD_HEADER.size
+            if length == 0 or start + length > end:
+                break  # Unused tail of a capture that was never closed
+            yield timestamp, port, mm[start : start + length]
+            offset = start + length
+
+    def read_all(self) -> List[CaptureRecord]:
+        return list(self)
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self) -> "CaptureReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def replay_capture(
+    records,
+    on_datagram: Callable[[bytes, int], None],
+    speed: Optional[float] = 1.0,
+    stop_event: Optional[threading.Event] = None,
+) -> int:
+    """
+    Feed capture records to ``on_datagram(data, port)``; returns how many were fed.
+
+    ``speed`` scales the recorded timing (2.0 replays twice as fast); None or 0
+    replays as fast as possible.
+    """
+    fed = 0
+    start = time.perf_counter()
+    first: Optional[float] = None  # Idle time before the first datagram is not replayed
+    for timestamp, port, data in records:
+        if stop_event is not None and stop_event.is_set():
+            break
+        if first is None:
+            first = timestamp
+        if speed:
+            delay = (timestamp - first) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                if stop_event is not None:
+                    if stop_event.wait(delay):
+                        break
+                else:
+                    time.sleep(delay)
+        on_datagram(data, port)
+        fed += 1
+    return fed
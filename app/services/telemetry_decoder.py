@@ -0,0 +1,289 @@
+"""
+Native decoder for F1 24 UDP telemetry packets.
+
+Single-record layouts (header, session) are precompiled ``struct.Struct``
+objects; per-car arrays are NumPy structured dtypes viewed straight over the
+datagram buffer. Both mirror the F1 24 UDP specification and skip fields the
+stores never read, so no intermediate packet objects are ever built.
+"""
+
+import logging
+import struct
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Fall back to the f1_24_telemetry library only for packet types we don't decode natively
+try:
+    from f1_24_telemetry.packets import HEADER_FIELD_TO_PACKET_TYPE, PacketHeader
+
+    LIBRARY_FALLBACK_AVAILABLE = True
+except ImportError:
+    HEADER_FIELD_TO_PACKET_TYPE = None  # type: ignore
+    PacketHeader = None  # type: ignore
+    LIBRARY_FALLBACK_AVAILABLE = False
+
+PACKET_FORMAT_2024 = 2024
+MAX_CARS = 22
+RECV_BUFFER_SIZE = 2048
+
+# --- Packet IDs (F1 24) ---
+PACKET_MOTION = 0
+PACKET_SESSION = 1
+PACKET_LAP_DATA = 2
+PACKET_EVENT = 3
+PACKET_PARTICIPANTS = 4
+PACKET_CAR_SETUPS = 5
+PACKET_CAR_TELEMETRY = 6
+PACKET_CAR_STATUS = 7
+PACKET_FINAL_CLASSIFICATION = 8
+PACKET_LOBBY_INFO = 9
+PACKET_CAR_DAMAGE = 10
+PACKET_SESSION_HISTORY = 11
+PACKET_TYRE_SETS = 12
+PACKET_MOTION_EX = 13
+PACKET_TIME_TRIAL = 14
+NUM_PACKET_IDS = 16  # Packet IDs fit in 0-15
+
+PACKET_NAMES = {
+    PACKET_MOTION: "motion",
+    PACKET_SESSION: "session",
+    PACKET_LAP_DATA: "lap_data",
+    PACKET_EVENT: "event",
+    PACKET_PARTICIPANTS: "participants",
+    PACKET_CAR_SETUPS: "car_setups",
+    PACKET_CAR_TELEMETRY: "car_telemetry",
+    PACKET_CAR_STATUS: "car_status",
+    PACKET_FINAL_CLASSIFICATION: "final_classification",
+    PACKET_LOBBY_INFO: "lobby_info",
+    PACKET_CAR_DAMAGE: "car_damage",
+    PACKET_SESSION_HISTORY: "session_history",
+    PACKET_TYRE_SETS: "tyre_sets",
+    PACKET_MOTION_EX: "motion_ex",
+    PACKET_TIME_TRIAL: "time_trial",
+    15: "lap_positions",
+}
+
+# --- Header ---
+# packetFormat, gameYear, gameMajorVersion, gameMinorVersion, packetVersion, packetId,
+# sessionUID, sessionTime, frameIdentifier, overallFrameIdentifier,
+# playerCarIndex, secondaryPlayerCarIndex
+HEADER = struct.Struct("<HBBBBBQfIIBB")
+HEADER_SIZE = HEADER.size  # 29 bytes
+PACKET_FORMAT = struct.Struct("<H")
+PACKET_ID_OFFSET = 6
+SESSION_UID = struct.Struct("<Q")
+SESSION_UID_OFFSET = 7
+OVERALL_FRAME_IDENTIFIER = struct.Struct("<I")
+OVERALL_FRAME_IDENTIFIER_OFFSET = 23
+SESSION_TIME_AND_FRAME = struct.Struct("<fI")  # sessionTime, frameIdentifier
+SESSION_TIME_OFFSET = 15
+
+# --- Per-car layouts ---
+# NumPy structured dtypes view the 22-car arrays in place, so a whole packet is
+# decoded with one frombuffer call and copied into store columns field by field.
+# Fields the stores never read (velocities, direction vectors, deltas...) are left out.
+
+
+def _car_layout(itemsize: int, *fields: Tuple[str, str, int]) -> np.dtype:
+    names, formats, offsets = zip(*fields)
+    return np.dtype(
+        {
+            "names": list(names),
+            "formats": list(formats),
+            "offsets": list(offsets),
+            "itemsize": itemsize,
+        }
+    )
+
+
+CAR_MOTION = _car_layout(
+    60,
+    ("world_x", "<f4", 0),
+    ("world_y", "<f4", 4),
+    ("world_z", "<f4", 8),
+    ("g_force_lateral", "<f4", 36),
+    ("g_force_longitudinal", "<f4", 40),
+    ("g_force_vertical", "<f4", 44),
+    ("yaw", "<f4", 48),
+    ("pitch", "<f4", 52),
+    ("roll", "<f4", 56),
+)
+
+LAP_DATA = _car_layout(
+    57,
+    ("last_lap_time_ms", "<u4", 0),
+    ("current_lap_time_ms", "<u4", 4),
+    ("sector1_ms_part", "<u2", 8),
+    ("sector1_minutes_part", "u1", 10),
+    ("sector2_ms_part", "<u2", 11),
+    ("sector2_minutes_part", "u1", 13),
+    ("lap_distance", "<f4", 20),
+    ("total_distance", "<f4", 24),
+    ("safety_car_delta", "<f4", 28),
+    ("car_position", "u1", 32),
+    ("current_lap_num", "u1", 33),
+    ("pit_status", "u1", 34),
+    ("num_pit_stops", "u1", 35),
+    ("sector", "u1", 36),
+    ("current_lap_invalid", "u1", 37),
+    ("penalties", "u1", 38),
+    ("total_warnings", "u1", 39),
+    ("corner_cutting_warnings", "u1", 40),
+    ("num_unserved_drive_through_pens", "u1", 41),
+    ("num_unserved_stop_go_pens", "u1", 42),
+    ("grid_position", "u1", 43),
+    ("driver_status", "u1", 44),
+    ("result_status", "u1", 45),
+    ("pit_lane_timer_active", "u1", 46),
+    ("pit_lane_time_in_lane_ms", "<u2", 47),
+    ("pit_stop_timer_ms", "<u2", 49),
+    ("pit_stop_should_serve_pen", "u1", 51),
+    ("speed_trap_fastest_speed", "<f4", 52),
+    ("speed_trap_fastest_lap", "u1", 56),
+)
+
+PARTICIPANT = _car_layout(
+    60,
+    ("ai_controlled", "u1", 0),
+    ("driver_id", "u1", 1),
+    ("network_id", "u1", 2),
+    ("team_id", "u1", 3),
+    ("my_team", "u1", 4),
+    ("race_number", "u1", 5),
+    ("nationality", "u1", 6),
+    ("name", "S48", 7),
+    ("your_telemetry", "u1", 55),
+)
+
+CAR_TELEMETRY = _car_layout(
+    60,
+    ("speed", "<u2", 0),  # km/h
+    ("throttle", "<f4", 2),  # 0.0-1.0
+    ("steer", "<f4", 6),  # -1.0 (full left) to 1.0 (full right)
+    ("brake", "<f4", 10),  # 0.0-1.0
+    ("clutch", "u1", 14),  # 0-100
+    ("gear", "i1", 15),  # -1 reverse, 0 neutral
+    ("engine_rpm", "<u2", 16),
+    ("drs", "u1", 18),
+)
+
+CAR_STATUS = _car_layout(
+    55,
+    ("fuel_mix", "u1", 2),
+    ("drs_allowed", "u1", 22),
+    ("tyre_compound", "u1", 25),  # actualTyreCompound
+    ("vehicle_fia_flags", "i1", 28),
+)
+
+# --- Session layout (single record, offsets relative to the end of the header) ---
+# sessionType, trackId, sessionTimeLeft, sessionDuration, pitSpeedLimit,
+# gamePaused, networkGame, sessionLinkIdentifier
+SESSION = struct.Struct("<6xBbxHHBB110xB523xI")
+# totalLaps, trackLength (metres), read separately so SESSION's field order stays put
+SESSION_TRACK = struct.Struct("<3xBH")
+
+# Minimum datagram length for each natively decoded packet type
+PACKET_SIZES = {
+    PACKET_MOTION: HEADER_SIZE + CAR_MOTION.itemsize * MAX_CARS,  # 1349
+    PACKET_SESSION: HEADER_SIZE + SESSION.size,
+    PACKET_LAP_DATA: HEADER_SIZE + LAP_DATA.itemsize * MAX_CARS,
+    PACKET_PARTICIPANTS: HEADER_SIZE + 1 + PARTICIPANT.itemsize * MAX_CARS,  # 1350
+    # Followed by the MFD panel indices and suggested gear
+    PACKET_CAR_TELEMETRY: HEADER_SIZE + CAR_TELEMETRY.itemsize * MAX_CARS + 3,  # 1352
+    PACKET_CAR_STATUS: HEADER_SIZE + CAR_STATUS.itemsize * MAX_CARS,  # 1239
+}
+
+NATIVE_PACKET_IDS = frozenset(PACKET_SIZES)
+
+
+def peek_packet_id(data: bytes) -> int:
+    """Read the packet ID straight from the header byte without unpacking the header."""
+    return data[PACKET_ID_OFFSET]
+
+
+def peek_session_uid(data: bytes) -> int:
+    """Read the header's sessionUID without unpacking the rest of the header."""
+    return SESSION_UID.unpack_from(data, SESSION_UID_OFFSET)[0]
+
+
+def peek_overall_frame_identifier(data: bytes) -> int:
+    """Read the header's overallFrameIdentifier (unlike frameIdentifier, it survives flashbacks)."""
+    return OVERALL_FRAME_IDENTIFIER.unpack_from(data, OVERALL_FRAME_IDENTIFIER_OFFSET)[0]
+
+
+def unpack_header(data: bytes) -> Tuple:
+    """Unpack the full packet header."""
+    return HEADER.unpack_from(data)
+
+
+def is_native_packet(data: bytes, packet_id: int) -> bool:
+    """Check whether a datagram can be decoded by the native layouts."""
+    expected_size = PACKET_SIZES.get(packet_id)
+    return (
+        expected_size is not None
+        and len(data) >= expected_size
+        and PACKET_FORMAT.unpack_from(data)[0] == PACKET_FORMAT_2024
+    )
+
+
+def _car_array(data: bytes, layout: np.dtype, offset: int = HEADER_SIZE) -> np.ndarray:
+    return np.frombuffer(data, dtype=layout, count=MAX_CARS, offset=offset)
+
+
+def car_motion_array(data: bytes) -> np.ndarray:
+    """View the 22 CarMotionData records of a Motion packet."""
+    return _car_array(data, CAR_MOTION)
+
+
+def lap_data_array(data: bytes) -> np.ndarray:
+    """View the 22 LapData records of a LapData packet."""
+    return _car_array(data, LAP_DATA)
+
+
+def participants_num_active(data: bytes) -> int:
+    """Read numActiveCars from a ParticipantsData packet."""
+    return data[HEADER_SIZE]
+
+
+def participants_array(data: bytes) -> np.ndarray:
+    """View the 22 ParticipantData records of a ParticipantsData packet."""
+    return _car_array(data, PARTICIPANT, HEADER_SIZE + 1)
+
+
+def car_status_array(data: bytes) -> np.ndarray:
+    """View the 22 CarStatusData records of a CarStatus packet."""
+    return _car_array(data, CAR_STATUS)
+
+
+def unpack_session(data: bytes) -> Tuple:
+    """Unpack the SessionData fields listed on ``SESSION``."""
+    return SESSION.unpack_from(data, HEADER_SIZE)
+
+
+def unpack_session_track(data: bytes) -> Tuple[int, int]:
+    """Unpack totalLaps and trackLength from a SessionData packet."""
+    return SESSION_TRACK.unpack_from(data, HEADER_SIZE)
+
+
+def decode_participant_name(name_bytes: bytes) -> str:
+    """Decode a NUL-padded participant name."""
+    return name_bytes.split(b"\x00", 1)[0].decode("utf-8", errors="replace").strip()
+
+
+def decode_with_library(data: bytes) -> Optional[Any]:
+    """Decode a packet through f1_24_telemetry; used only for packet types without a native layout."""
+    if not LIBRARY_FALLBACK_AVAILABLE:
+        return None
+    try:
+        header = PacketHeader.from_buffer_copy(data)
+        key = (header.packet_format, header.packet_version, header.packet_id)
+        packet_type = HEADER_FIELD_TO_PACKET_TYPE.get(key)
+        if packet_type is None:
+            return None
+        return packet_type.unpack(data)
+    except Exception as e:
+        logger.debug(f"Library fallback could not decode packet: {e}")
+        return None
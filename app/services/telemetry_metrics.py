@@ -0,0 +1,383 @@
+"""
+Per-packet-type ingest metrics for a telemetry feed.
+
+Every datagram is counted under its packet ID: datagrams, bytes, filtered,
+processing time (decode plus snapshot publish) and the interval since the
+previous packet of the same type, the last two as histograms. Inter-arrival
+jitter is smoothed as in RFC 3550. For the packet types the game sends every
+frame, gaps in the header's overallFrameIdentifier estimate how many
+datagrams never arrived, and the kernel's receive queue and drop counters for
+the listening socket (/proc/net/udp, Linux only) show whether we fell behind.
+Together they tell a stutter caused by the game, the network or the decoder
+apart.
+
+Counting happens on plain Python lists in the decode loop; ``to_records()``
+packs them into a METRICS_DTYPE array for the API, the Prometheus endpoint
+and the process listener's shared-memory handoff.
+"""
+
+import logging
+import math
+import os
+import struct
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.telemetry_decoder import (
+    NUM_PACKET_IDS,
+    PACKET_CAR_STATUS,
+    PACKET_CAR_TELEMETRY,
+    PACKET_LAP_DATA,
+    PACKET_MOTION,
+    PACKET_MOTION_EX,
+    PACKET_NAMES,
+    SESSION_UID_OFFSET,
+)
+
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds; each histogram has one more bucket for larger values
+DECODE_BUCKETS_US = (2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+INTERVAL_BUCKETS_MS = (1, 5, 10, 17, 20, 34, 50, 100, 250, 500, 1000, 5000)
+_DECODE_BUCKETS_NS = tuple(bound * 1000 for bound in DECODE_BUCKETS_US)
+_INTERVAL_BUCKETS_NS = tuple(bound * 1_000_000 for bound in INTERVAL_BUCKETS_MS)
+
+# Sent once per frame at the game's UDP rate, so frame identifier gaps mean lost datagrams
+PER_FRAME_PACKET_IDS = frozenset(
+    {PACKET_MOTION, PACKET_LAP_DATA, PACKET_CAR_TELEMETRY, PACKET_CAR_STATUS, PACKET_MOTION_EX}
+)
+# Frames between packets depend on the send rate; the smallest recent gap is taken as
+# the normal step and re-learnt when no gap has matched it for this many packets
+FRAME_STEP_WINDOW = 300
+JITTER_GAIN = 1 / 16
+# sessionUID and overallFrameIdentifier in one unpack (sessionTime and frameIdentifier skipped)
+_UID_AND_FRAME = struct.Struct("<Q8xI")
+
+METRICS_DTYPE = np.dtype(
+    [
+        ("received", "<i8"),
+        ("bytes", "<i8"),
+        ("filtered", "<i8"),
+        ("decoded", "<i8"),
+        ("decode_ns_sum", "<i8"),
+        ("decode_hist", "<i8", (len(DECODE_BUCKETS_US) + 1,)),
+        ("interval_count", "<i8"),
+        ("interval_ns_sum", "<i8"),
+        ("interval_hist", "<i8", (len(INTERVAL_BUCKETS_MS) + 1,)),
+        ("jitter_ns", "<f8"),
+        ("frames_missed", "<i8"),
+        ("frames_reordered", "<i8"),
+    ]
+)
+METRICS_BYTES = NUM_PACKET_IDS * METRICS_DTYPE.itemsize
+
+
+class PacketMetrics:
+    """Counters for one feed, indexed by packet ID; written only by the decode loop."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        n = NUM_PACKET_IDS
+        self.received = [0] * n
+        self.bytes = [0] * n
+        self.filtered = [0] * n
+        self.decoded = [0] * n
+        self.decode_ns_sum = [0] * n
+        self.decode_hist = [[0] * (len(DECODE_BUCKETS_US) + 1) for _ in range(n)]
+        self.interval_count = [0] * n
+        self.interval_ns_sum = [0] * n
+        self.interval_hist = [[0] * (len(INTERVAL_BUCKETS_MS) + 1) for _ in range(n)]
+        self.jitter_ns = [0.0] * n
+        self.frames_missed = [0] * n
+        self.frames_reordered = [0] * n
+        self._last_arrival_ns = [0] * n
+        self._last_interval_ns = [0] * n
+        self._session_uid: Optional[int] = None
+        self._reset_frames()
+
+    def _reset_frames(self):
+        n = NUM_PACKET_IDS
+        self._last_frame = [-1] * n
+        self._frame_step = [0] * n
+        self._step_age = [0] * n
+
+    def on_packet(self, data: bytes, packet_id: int, arrival_ns: int):
+        """Count a datagram with a full header as it arrives, before filtering."""
+        if packet_id >= NUM_PACKET_IDS:
+            return
+        self.received[packet_id] += 1
+        self.bytes[packet_id] += len(data)
+
+        last_arrival = self._last_arrival_ns
+        last = last_arrival[packet_id]
+        last_arrival[packet_id] = arrival_ns
+        if last:
+            interval = arrival_ns - last
+            self.interval_count[packet_id] += 1
+            self.interval_ns_sum[packet_id] += interval
+            self.interval_hist[packet_id][bisect_left(_INTERVAL_BUCKETS_NS, interval)] += 1
+            last_interval = self._last_interval_ns
+            previous = last_interval[packet_id]
+            if previous:
+                jitter = self.jitter_ns
+                jitter[packet_id] += (abs(interval - previous) - jitter[packet_id]) * JITTER_GAIN
+            last_interval[packet_id] = interval
+
+        if packet_id in PER_FRAME_PACKET_IDS:
+            self._track_frame(data, packet_id)
+
+    def _track_frame(self, data: bytes, packet_id: int):
+        session_uid, frame = _UID_AND_FRAME.unpack_from(data, SESSION_UID_OFFSET)
+        if session_uid != self._session_uid:
+            self._session_uid = session_uid
+            self._reset_frames()
+        last = self._last_frame[packet_id]
+        if last < 0:
+            self._last_frame[packet_id] = frame
+            return
+        gap = frame - last
+        if gap <= 0:
+            self.frames_reordered[packet_id] += 1
+            return
+        self._last_frame[packet_id] = frame
+
+        step = self._frame_step[packet_id]
+        if not step or gap <= step:
+            self._frame_step[packet_id] = step = gap
+            self._step_age[packet_id] = 0
+            return
+        self._step_age[packet_id] += 1
+        if self._step_age[packet_id] > FRAME_STEP_WINDOW:
+            # The send rate changed; adopt the new cadence
+            self._frame_step[packet_id] = gap
+            self._step_age[packet_id] = 0
+            return
+        missed = round(gap / step) - 1
+        if missed > 0:
+            self.frames_missed[packet_id] += missed
+
+    def on_filtered(self, packet_id: int):
+        if packet_id < NUM_PACKET_IDS:
+            self.filtered[packet_id] += 1
+
+    def on_decoded(self, packet_id: int, elapsed_ns: int):
+        if packet_id >= NUM_PACKET_IDS:
+            return
+        self.decoded[packet_id] += 1
+        self.decode_ns_sum[packet_id] += elapsed_ns
+        self.decode_hist[packet_id][bisect_left(_DECODE_BUCKETS_NS, elapsed_ns)] += 1
+
+    def to_records(self) -> np.ndarray:
+        """Copy the counters into a METRICS_DTYPE array, one record per packet ID."""
+        records = np.zeros(NUM_PACKET_IDS, dtype=METRICS_DTYPE)
+        for name in METRICS_DTYPE.names:
+            records[name] = getattr(self, name)
+        return records
+
+
+# --- Reading ---
+
+
+def histogram_quantile(bounds: Tuple[float, ...], counts: np.ndarray, q: float) -> Optional[float]:
+    """Upper bound of the bucket holding the q-quantile (the largest bound for the overflow bucket)."""
+    total = int(counts.sum())
+    if not total:
+        return None
+    index = int(np.searchsorted(np.cumsum(counts), q * total))
+    return float(bounds[min(index, len(bounds) - 1)])
+
+
+def packet_summaries(records: np.ndarray) -> List[dict]:
+    """One dict per packet type that has been received, in packet ID order."""
+    summaries = []
+    for packet_id in np.flatnonzero(records["received"]):
+        row = records[packet_id]
+        received = int(row["received"])
+        decoded = int(row["decoded"])
+        intervals = int(row["interval_count"])
+        missed = int(row["frames_missed"])
+        per_frame = int(packet_id) in PER_FRAME_PACKET_IDS
+        summaries.append(
+            {
+                "packet_id": int(packet_id),
+                "name": PACKET_NAMES.get(int(packet_id), f"packet_{packet_id}"),
+                "received": received,
+                "bytes": int(row["bytes"]),
+                "filtered": int(row["filtered"]),
+                "decoded": decoded,
+                "decode_us_avg": row["decode_ns_sum"] / decoded / 1000 if decoded else None,
+                "decode_us_p50": histogram_quantile(DECODE_BUCKETS_US, row["decode_hist"], 0.5),
+                "decode_us_p99": histogram_quantile(DECODE_BUCKETS_US, row["decode_hist"], 0.99),
+                "decode_histogram_us": _bucket_counts(DECODE_BUCKETS_US, row["decode_hist"]),
+                "interval_ms_avg": row["interval_ns_sum"] / intervals / 1e6 if intervals else None,
+                "interval_histogram_ms": _bucket_counts(INTERVAL_BUCKETS_MS, row["interval_hist"]),
+                "jitter_ms": float(row["jitter_ns"]) / 1e6,
+                "frames_missed": missed if per_frame else None,
+                "frames_reordered": int(row["frames_reordered"]) if per_frame else None,
+                "estimated_loss": missed / (received + missed) if per_frame else None,
+            }
+        )
+    return summaries
+
+
+def _bucket_counts(bounds: Tuple[float, ...], counts: np.ndarray) -> Dict[str, int]:
+    labels = [f"{bound:g}" for bound in bounds] + ["+Inf"]
+    return dict(zip(labels, counts.tolist()))
+
+
+def udp_socket_queues(ports: Iterable[int]) -> Dict[int, Tuple[int, int]]:
+    """
+    Kernel receive queue (bytes) and drop counter of the UDP sockets bound to ``ports``.
+
+    Read from /proc/net/udp{,6}; empty where that isn't available.
+    """
+    wanted = set(ports)
+    queues: Dict[int, Tuple[int, int]] = {}
+    for table in ("/proc/net/udp", "/proc/net/udp6"):
+        if not wanted or not os.path.exists(table):
+            continue
+        try:
+            with open(table) as f:
+                lines = f.readlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            fields = line.split()
+            port = int(fields[1].rsplit(":", 1)[1], 16)
+            if port not in wanted:
+                continue
+            rx_queue = int(fields[4].split(":")[1], 16)
+            drops = int(fields[-1])
+            queued, dropped = queues.get(port, (0, 0))
+            queues[port] = (queued + rx_queue, dropped + drops)
+    return queues
+
+
+# --- Prometheus text exposition ---
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _value(value) -> str:
+    # Full precision: ":g" keeps 6 significant digits, which flattens large counters
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+class PrometheusWriter:
+    """Collects samples by metric family and renders the text exposition format."""
+
+    def __init__(self, prefix: str = "f1_telemetry"):
+        self.prefix = prefix
+        self._families: Dict[str, Tuple[str, str, List[str]]] = {}
+
+    def _family(self, name: str, kind: str, help_text: str) -> List[str]:
+        name = f"{self.prefix}_{name}"
+        if name not in self._families:
+            self._families[name] = (kind, help_text, [])
+        return self._families[name][2]
+
+    def sample(self, name: str, kind: str, help_text: str, labels: Dict[str, str], value: float):
+        full_name = f"{self.prefix}_{name}"
+        self._family(name, kind, help_text).append(f"{full_name}{_labels(labels)} {_value(value)}")
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Dict[str, str],
+        bounds: Tuple[float, ...],
+        counts: np.ndarray,
+        total: float,
+        scale: float,
+    ):
+        """Per-bucket ``counts`` with upper ``bounds`` given in units of ``scale`` seconds."""
+        lines = self._family(name, "histogram", help_text)
+        full_name = f"{self.prefix}_{name}"
+        cumulative = np.cumsum(counts).tolist()
+        for bound, count in zip(bounds, cumulative):
+            lines.append(f"{full_name}_bucket{_labels({**labels, 'le': f'{bound * scale:g}'})} {count}")
+        lines.append(f"{full_name}_bucket{_labels({**labels, 'le': '+Inf'})} {cumulative[-1]}")
+        lines.append(f"{full_name}_sum{_labels(labels)} {_value(total)}")
+        lines.append(f"{full_name}_count{_labels(labels)} {cumulative[-1]}")
+
+    def add_packet_metrics(self, session_id: str, records: np.ndarray):
+        for packet_id in np.flatnonzero(records["received"]):
+            row = records[packet_id]
+            labels = {
+                "session": session_id,
+                "packet": PACKET_NAMES.get(int(packet_id), f"packet_{packet_id}"),
+            }
+            self.sample("packets_received_total", "counter", "Datagrams received", labels, row["received"])
+            self.sample("packet_bytes_total", "counter", "Bytes received", labels, row["bytes"])
+            self.sample(
+                "packets_filtered_total", "counter", "Datagrams skipped by the packet filter", labels, row["filtered"]
+            )
+            self.histogram(
+                "decode_seconds",
+                "Time to decode a datagram and publish the snapshot",
+                labels,
+                DECODE_BUCKETS_US,
+                row["decode_hist"],
+                row["decode_ns_sum"] / 1e9,
+                1e-6,
+            )
+            self.histogram(
+                "packet_interval_seconds",
+                "Time between consecutive datagrams of the same type",
+                labels,
+                INTERVAL_BUCKETS_MS,
+                row["interval_hist"],
+                row["interval_ns_sum"] / 1e9,
+                1e-3,
+            )
+            self.sample(
+                "packet_jitter_seconds", "gauge", "Smoothed inter-arrival jitter (RFC 3550)", labels, row["jitter_ns"] / 1e9
+            )
+            if int(packet_id) in PER_FRAME_PACKET_IDS:
+                self.sample(
+                    "frames_missed_total",
+                    "counter",
+                    "Datagrams estimated lost from frame identifier gaps",
+                    labels,
+                    row["frames_missed"],
+                )
+                self.sample(
+                    "frames_reordered_total",
+                    "counter",
+                    "Datagrams that arrived after a later frame",
+                    labels,
+                    row["frames_reordered"],
+                )
+
+    def add_socket_queues(self, queues: Dict[int, Tuple[int, int]]):
+        for port, (queued, drops) in sorted(queues.items()):
+            labels = {"port": str(port)}
+            self.sample("socket_rx_queue_bytes", "gauge", "Bytes waiting in the UDP receive queue", labels, queued)
+            self.sample("socket_drops_total", "counter", "Datagrams the kernel dropped on a full receive queue", labels, drops)
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help_text, samples) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
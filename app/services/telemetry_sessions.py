@@ -0,0 +1,500 @@
+"""
+Registry of concurrent telemetry sessions, one per simulator rig.
+
+A listener binds one or more UDP ports with one of the ingest backends and
+routes every datagram to a session: by the port it arrived on, or by the
+game's sessionLinkIdentifier so several rigs can share a port. Each session
+owns its own LiveTelemetryStore and packet counters, and each listener its own
+thread, process or datagram endpoints, so feeds never block one another.
+
+Listeners can record what they receive to a capture file, and a replay
+listener feeds a capture back through the same routing and decode path.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.services.async_listener import AsyncUdpListener
+from app.services.car_telemetry_traces import CarTelemetryTraces
+from app.services.lap_traces import LapTraceRecorder
+from app.services.live_store import LiveTelemetryStore, TelemetrySnapshot
+from app.services.packet_filter import PacketFilter
+from app.services.process_listener import ProcessListener
+from app.services.telemetry_capture import CaptureReader, CaptureWriter, replay_capture
+from app.services.telemetry_decoder import (
+    HEADER_SIZE,
+    PACKET_SESSION,
+    RECV_BUFFER_SIZE,
+    is_native_packet,
+    peek_packet_id,
+    peek_session_uid,
+    unpack_session,
+)
+
+logger = logging.getLogger(__name__)
+
+# Ingest backends: a decoder thread in this process, a separate process that
+# hands its per-car arrays over through shared memory (keeps decoding off our GIL),
+# or asyncio datagram endpoints on the event loop (instant start/stop, several ports)
+LISTENER_MODES = ("thread", "process", "asyncio")
+# Mode of listeners that read a capture file instead of a socket
+REPLAY_MODE = "replay"
+# How datagrams are assigned to sessions
+ROUTING_MODES = ("port", "link")
+
+THREAD_JOIN_TIMEOUT_SECONDS = 3.0
+
+# Stamped on every new session so its snapshot versions can't be confused with a predecessor's
+_session_instances = itertools.count(1)
+
+ProcessDatagram = Callable[[bytes, LiveTelemetryStore], Optional[bool]]
+
+
+def open_telemetry_socket(host: str, port: int) -> socket.socket:
+    """Bind the UDP socket the game sends telemetry to."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.settimeout(1.0)  # Lets the worker notice the stop event
+    try:
+        sock.bind((host, port))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class TelemetrySession:
+    """Live state of one game feed."""
+
+    def __init__(self, session_id: str, port: int, listener: "TelemetryListener"):
+        self.session_id = session_id
+        self.port = port
+        self.listener = listener
+        self.instance = next(_session_instances)
+        self.store = LiveTelemetryStore()
+        self.lap_traces = LapTraceRecorder()  # Fed by the LapTracePoller
+        self.link_identifier: Optional[int] = None
+        self.created_at = time.time()
+        self._last_packet_at: Optional[float] = None
+
+    def handle_datagram(self, data: bytes):
+        self._last_packet_at = time.time()
+        self.listener.process_datagram(data, self.store)
+
+    @property
+    def last_packet_at(self) -> Optional[float]:
+        if self.listener.process is not None:
+            return self.listener.process.published_at
+        return self._last_packet_at
+
+    def snapshot(self) -> TelemetrySnapshot:
+        if self.listener.process is not None:
+            snapshot = self.listener.process.snapshot()
+            if snapshot is not None:
+                return snapshot
+        return self.store.snapshot()
+
+    def metrics(self) -> np.ndarray:
+        """Per-packet-type counters of this feed (METRICS_DTYPE records)."""
+        if self.listener.process is not None:
+            records = self.listener.process.read_metrics()
+            if records is not None:
+                return records
+        return self.store.metrics.to_records()
+
+    def traces(self) -> CarTelemetryTraces:
+        """Recent CarTelemetry samples of this feed."""
+        process = self.listener.process
+        traces = process.traces if process is not None else None
+        return traces if traces is not None else self.store.traces
+
+    @property
+    def packets_processed(self) -> int:
+        if self.listener.process is not None:
+            self.listener.process.snapshot()  # Refreshes the counters read from shared memory
+            return self.listener.process.packets_processed
+        return self.store.packets_processed
+
+    @property
+    def packets_filtered(self) -> int:
+        if self.listener.process is not None:
+            return self.listener.process.packets_filtered
+        return self.store.packets_filtered
+
+
+class TelemetryListener:
+    """One ingest backend bound to one or more ports, feeding its sessions."""
+
+    def __init__(
+        self,
+        registry: "TelemetrySessionRegistry",
+        host: str,
+        ports: List[int],
+        mode: str,
+        routing: str,
+    ):
+        self.registry = registry
+        self.process_datagram = registry.process_datagram
+        self.host = host
+        self.ports = ports
+        self.mode = mode
+        self.routing = routing
+        self.error: Optional[str] = None
+        self.sessions: List[TelemetrySession] = []
+        self.packets_unrouted = 0
+        self._sessions_by_port: Dict[int, TelemetrySession] = {}
+        self._sessions_by_uid: Dict[int, TelemetrySession] = {}
+        # Backend handles; only the one for ``mode`` is ever set
+        self.threads: List[threading.Thread] = []
+        self.stop_event: Optional[threading.Event] = None
+        self.process: Optional[ProcessListener] = None
+        self.udp: Optional[AsyncUdpListener] = None
+        # Recording of live datagrams (process mode records in the child instead)
+        self.capture: Optional[CaptureWriter] = None
+        self.capture_path: Optional[str] = None
+        # Replay source; port routing sends every replayed datagram to default_session
+        self.replay: Optional[CaptureReader] = None
+        self.replay_speed: Optional[float] = None
+        self.replay_loop = False
+        self.packets_replayed = 0
+        self.default_session: Optional[TelemetrySession] = None
+
+    # --- Routing ---
+
+    def _route(self, data: bytes, port: int) -> Optional[TelemetrySession]:
+        if self.routing == "port":
+            return self._sessions_by_port.get(port, self.default_session)
+
+        if len(data) < HEADER_SIZE:
+            return None
+        session_uid = peek_session_uid(data)
+        session = self._sessions_by_uid.get(session_uid)
+        if session is None:
+            # A game session is only placed once its SessionData names the link identifier
+            if peek_packet_id(data) != PACKET_SESSION or not is_native_packet(data, PACKET_SESSION):
+                return None
+            link_identifier = unpack_session(data)[7]
+            session_id = (
+                f"link-{link_identifier}" if link_identifier else f"uid-{session_uid:016x}"
+            )
+            session = self.registry.get_or_create_session(session_id, port, self)
+            session.link_identifier = link_identifier
+            self._sessions_by_uid[session_uid] = session
+        return session
+
+    def on_datagram(self, data: bytes, port: int):
+        if self.capture is not None:
+            self.capture.write(data, port)
+        session = self._route(data, port)
+        if session is None:
+            self.packets_unrouted += 1
+            return
+        session.handle_datagram(data)
+
+    # --- Backends ---
+
+    def _run_thread(self, sock: socket.socket, port: int, stop_event: threading.Event):
+        try:
+            logger.info(f"UDP Telemetry listener started on {self.host}:{port}")
+            while not stop_event.is_set():
+                try:
+                    data = sock.recv(RECV_BUFFER_SIZE)
+                    self.on_datagram(data, port)
+                except socket.timeout:
+                    continue
+                except Exception as e:
+                    if stop_event.is_set():
+                        logger.info(
+                            "Telemetry worker: socket error during stop signal, likely normal."
+                        )
+                        break
+                    self.error = f"Error in telemetry worker: {type(e).__name__}: {e}"
+                    logger.exception(self.error)
+                    break
+            logger.info("UDP Telemetry listener worker signaled to stop or errored.")
+        finally:
+            logger.info("Closing telemetry listener socket.")
+            sock.close()
+            logger.info("Telemetry listener worker finished.")
+
+    def _run_replay(self, stop_event: threading.Event):
+        try:
+            logger.info(
+                f"Replaying telemetry capture {self.replay.path} at "
+                f"{f'{self.replay_speed:g}x' if self.replay_speed else 'maximum'} speed"
+            )
+            while not stop_event.is_set():
+                self.packets_replayed += replay_capture(
+                    self.replay, self.on_datagram, self.replay_speed, stop_event
+                )
+                if not self.replay_loop:
+                    break
+            logger.info(f"Telemetry replay finished after {self.packets_replayed} datagrams")
+        except Exception as e:
+            self.error = f"Error in telemetry replay: {type(e).__name__}: {e}"
+            logger.exception(self.error)
+
+    def start_capture(self, path: str):
+        """Record every datagram this listener receives to ``path``."""
+        self.capture_path = path
+        if self.mode != "process":
+            self.capture = CaptureWriter(path)
+
+    async def start(self):
+        """Bind the ports and start the backend; raises OSError/RuntimeError on failure."""
+        if self.mode == REPLAY_MODE:
+            self.stop_event = threading.Event()
+            thread = threading.Thread(
+                target=self._run_replay,
+                args=(self.stop_event,),
+                name="telemetry-replay",
+                daemon=True,
+            )
+            thread.start()
+            self.threads.append(thread)
+        elif self.mode == "asyncio":
+            self.udp = AsyncUdpListener(self.host, self.ports, self.on_datagram)
+            await self.udp.start()
+        elif self.mode == "process":
+            packet_filter = self.registry.packet_filter
+            process = ProcessListener(
+                self.host,
+                self.ports[0],
+                self.capture_path,
+                packet_filter.to_bytes() if packet_filter else None,
+            )
+            # Blocks until the child has bound its socket, so keep it off the event loop
+            await asyncio.to_thread(process.start)
+            self.process = process
+        else:
+            # Bind up front so a bad host/port fails the request instead of the thread
+            sockets = []
+            try:
+                for port in self.ports:
+                    sockets.append(open_telemetry_socket(self.host, port))
+            except OSError:
+                for sock in sockets:
+                    sock.close()
+                raise
+            self.stop_event = threading.Event()
+            for port, sock in zip(self.ports, sockets):
+                thread = threading.Thread(
+                    target=self._run_thread,
+                    args=(sock, port, self.stop_event),
+                    name=f"telemetry-listener-{port}",
+                    daemon=True,
+                )
+                thread.start()
+                self.threads.append(thread)
+
+    async def stop(self):
+        if self.udp is not None:
+            self.error = self.error or self.udp.last_error()
+            self.udp.stop()
+        if self.process is not None:
+            # Readers on the loop fall back to the parent store before the memory goes away
+            self.process.detach()
+            await asyncio.to_thread(self.process.join)
+            self.process.close()
+            self.error = self.error or self.process.error
+        if self.stop_event is not None:
+            self.stop_event.set()
+            for thread in self.threads:
+                await asyncio.to_thread(thread.join, THREAD_JOIN_TIMEOUT_SECONDS)
+                if thread.is_alive():
+                    # Daemon thread; it exits at its next socket timeout
+                    logger.warning(
+                        "Telemetry listener thread did not stop gracefully after timeout."
+                    )
+        if self.capture is not None:
+            self.capture.close()
+        if self.replay is not None and not any(thread.is_alive() for thread in self.threads):
+            self.replay.close()
+
+    def is_alive(self) -> bool:
+        if self.udp is not None:
+            return self.udp.is_alive()
+        if self.process is not None:
+            return self.process.is_alive()
+        return any(thread.is_alive() for thread in self.threads)
+
+    def poll_error(self) -> Optional[str]:
+        if self.process is not None and self.process.poll_error():
+            self.error = self.error or self.process.error
+        return self.error
+
+
+class TelemetrySessionRegistry:
+    """All running listeners and the sessions they feed, keyed by session ID."""
+
+    def __init__(
+        self, process_datagram: ProcessDatagram, packet_filter: Optional[PacketFilter] = None
+    ):
+        self.process_datagram = process_datagram
+        # Shared by every feed; listener processes get a copy that apply_packet_filter refreshes
+        self.packet_filter = packet_filter
+        self.listeners: List[TelemetryListener] = []
+        # Written by listener threads when routing=link creates a session; read
+        # it through list_sessions()/get_session() rather than iterating it
+        self.sessions: Dict[str, TelemetrySession] = {}
+        self._sessions_lock = threading.Lock()
+        # Answers reads while no session exists, so endpoints report empty data
+        self.idle_store = LiveTelemetryStore()
+
+    def get_session(self, session_id: Optional[str] = None) -> Optional[TelemetrySession]:
+        """A session by ID, or the oldest active session when no ID is given."""
+        if session_id is None:
+            with self._sessions_lock:
+                return next(iter(self.sessions.values()), None)
+        return self.sessions.get(session_id)
+
+    def list_sessions(self) -> List[TelemetrySession]:
+        """Every active session, oldest first (a copy, safe to iterate on the loop)."""
+        with self._sessions_lock:
+            return list(self.sessions.values())
+
+    def snapshot(self, session_id: Optional[str] = None) -> TelemetrySnapshot:
+        session = self.get_session(session_id)
+        return session.snapshot() if session else self.idle_store.snapshot()
+
+    def traces(self, session_id: Optional[str] = None) -> CarTelemetryTraces:
+        session = self.get_session(session_id)
+        return session.traces() if session else self.idle_store.traces
+
+    def get_or_create_session(
+        self, session_id: str, port: int, listener: TelemetryListener
+    ) -> TelemetrySession:
+        """Called from listener threads as well as the loop."""
+        with self._sessions_lock:
+            session = self.sessions.get(session_id)
+            if session is not None and session.listener is not listener:
+                # Another listener already owns this ID; keep the stores separate
+                session_id = f"{session_id}@{port}"
+                session = self.sessions.get(session_id)
+            if session is None:
+                session = TelemetrySession(session_id, port, listener)
+                self.sessions[session_id] = session
+                # Replaced rather than appended so a reader's list never changes under it
+                listener.sessions = listener.sessions + [session]
+                logger.info(f"Telemetry session '{session_id}' created for port {port}")
+        return session
+
+    def apply_packet_filter(self):
+        """Push the current packet filter to listener processes (in-process feeds share it)."""
+        if self.packet_filter is None:
+            return
+        state = self.packet_filter.to_bytes()
+        for listener in self.listeners:
+            if listener.process is not None:
+                listener.process.push_packet_filter(state)
+
+    def listener_for_port(self, port: int) -> Optional[TelemetryListener]:
+        for listener in self.listeners:
+            if port in listener.ports:
+                return listener
+        return None
+
+    async def start_listener(
+        self,
+        host: str,
+        ports: List[int],
+        mode: str,
+        routing: str = "port",
+        capture_path: Optional[str] = None,
+    ) -> TelemetryListener:
+        """Start a listener; ValueError for a bad request, OSError/RuntimeError if it can't bind."""
+        if mode not in LISTENER_MODES:
+            raise ValueError(
+                f"Unknown listener mode '{mode}'. Choose one of: {', '.join(LISTENER_MODES)}"
+            )
+        if routing not in ROUTING_MODES:
+            raise ValueError(
+                f"Unknown routing '{routing}'. Choose one of: {', '.join(ROUTING_MODES)}"
+            )
+        if mode == "process" and (len(ports) > 1 or routing != "port"):
+            raise ValueError("mode=process listens on a single port with routing=port")
+        for port in ports:
+            owner = self.listener_for_port(port)
+            if owner is not None and owner.is_alive():
+                raise ValueError(f"Telemetry listener is already running on port {port}")
+            if owner is not None:
+                await self.stop_listener(owner)  # Clean up a listener that died on its own
+
+        listener = TelemetryListener(self, host, ports, mode, routing)
+        if routing == "port":
+            for port in ports:
+                listener._sessions_by_port[port] = self.get_or_create_session(
+                    str(port), port, listener
+                )
+        try:
+            if capture_path:
+                listener.start_capture(capture_path)
+            await listener.start()
+        except Exception:
+            if listener.capture is not None:
+                listener.capture.close()
+            self._forget(listener)
+            raise
+        self.listeners.append(listener)
+        return listener
+
+    async def start_replay(
+        self,
+        path: str,
+        speed: Optional[float] = 1.0,
+        loop: bool = False,
+        routing: str = "port",
+        session_id: Optional[str] = None,
+    ) -> TelemetryListener:
+        """
+        Replay a capture file as a listener of its own.
+
+        With port routing every datagram feeds one session (``session_id``,
+        default ``replay-<file name>``); link routing splits rigs as it would live.
+        Raises OSError/ValueError if the capture can't be opened.
+        """
+        if routing not in ROUTING_MODES:
+            raise ValueError(
+                f"Unknown routing '{routing}'. Choose one of: {', '.join(ROUTING_MODES)}"
+            )
+        reader = CaptureReader(path)
+        listener = TelemetryListener(self, os.path.basename(path), [], REPLAY_MODE, routing)
+        listener.replay = reader
+        listener.replay_speed = speed
+        listener.replay_loop = loop
+        if routing == "port":
+            name = os.path.splitext(os.path.basename(path))[0]
+            listener.default_session = self.get_or_create_session(
+                session_id or f"replay-{name}", 0, listener
+            )
+        await listener.start()
+        self.listeners.append(listener)
+        return listener
+
+    def _forget(self, listener: TelemetryListener):
+        with self._sessions_lock:
+            for session in listener.sessions:
+                if self.sessions.get(session.session_id) is session:
+                    del self.sessions[session.session_id]
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    async def stop_listener(self, listener: TelemetryListener):
+        """Stop a listener and drop the sessions it fed."""
+        await listener.stop()
+        self._forget(listener)
+
+    async def stop_listeners(self, listeners: List[TelemetryListener]):
+        """Stop several listeners concurrently."""
+        await asyncio.gather(*(self.stop_listener(listener) for listener in listeners))
+
+    async def stop_all(self):
+        await self.stop_listeners(list(self.listeners))
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+from typing import Callable, List, Optional
+
+from app.services.websocket import COALESCE, ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+TIMING_CHANNEL = "timing"
+
+# How often the timing tower is checked for changes and pushed over /ws
+DEFAULT_TIMING_HZ = 5
+MAX_TIMING_HZ = 20
+
+
+def get_timing_rate_hz() -> float:
+    """Read LIVE_TIMING_HZ from the environment, clamped to 1-20 Hz."""
+    try:
+        rate = float(os.getenv("LIVE_TIMING_HZ", DEFAULT_TIMING_HZ))
+    except ValueError:
+        logger.warning("Invalid LIVE_TIMING_HZ, using the default rate")
+        rate = DEFAULT_TIMING_HZ
+    return min(max(rate, 1.0), MAX_TIMING_HZ)
+
+
+class TimingBroadcaster:
+    """
+    Pushes the live timing tower (gap to leader and interval per car) to /ws
+    clients subscribed to the timing channel.
+
+    A tower goes out only when it differs from the last one sent, and slow
+    clients only ever hold the newest tower.
+    """
+
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        timing_source: Callable[[], List[dict]],
+        rate_hz: Optional[float] = None,
+    ):
+        self.manager = manager
+        self.timing_source = timing_source
+        self.rate_hz = rate_hz or get_timing_rate_hz()
+        self._task: Optional[asyncio.Task] = None
+        self._last_tower: Optional[List[dict]] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Live timing broadcaster started at {self.rate_hz:g} Hz")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def request_tower(self):
+        """Resend the tower on the next tick (e.g. for a new subscriber)."""
+        self._last_tower = None
+
+    async def _run(self):
+        interval = 1.0 / self.rate_hz
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.exception(f"Error broadcasting live timing: {e}")
+            await asyncio.sleep(interval)
+
+    async def tick(self):
+        if not self.manager.has_subscribers(TIMING_CHANNEL):
+            self._last_tower = None
+            return
+
+        tower = self.timing_source()
+        if tower == self._last_tower:
+            return
+        self._last_tower = tower
+        await self.manager.broadcast(
+            {"type": "timing", "cars": tower},
+            channel=TIMING_CHANNEL,
+            policy=COALESCE,
+            key=TIMING_CHANNEL,
+        )
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+from typing import Callable, Dict, Optional, Tuple
+
+from app.services.car_telemetry_traces import (
+    TRACE_MAX_RATE_HZ,
+    CarTelemetryTraces,
+    trace_columns_to_json,
+)
+from app.services.telemetry_decoder import MAX_CARS
+from app.services.websocket import DROP_OLDEST, ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+TRACES_CHANNEL = "car_telemetry"
+
+# How often new samples are batched out to subscribers
+DEFAULT_TRACE_BATCH_HZ = 10
+MAX_TRACE_BATCH_HZ = 30
+# Sample rate of a subscription that doesn't ask for one
+DEFAULT_TRACE_SAMPLE_HZ = 20
+
+
+def get_trace_batch_rate_hz() -> float:
+    """Read CAR_TELEMETRY_STREAM_HZ from the environment, clamped to 1-30 Hz."""
+    try:
+        rate = float(os.getenv("CAR_TELEMETRY_STREAM_HZ", DEFAULT_TRACE_BATCH_HZ))
+    except ValueError:
+        logger.warning("Invalid CAR_TELEMETRY_STREAM_HZ, using the default rate")
+        rate = DEFAULT_TRACE_BATCH_HZ
+    return min(max(rate, 1.0), MAX_TRACE_BATCH_HZ)
+
+
+def trace_channel(car_index: int, hz: float) -> str:
+    return f"{TRACES_CHANNEL}:{car_index}:{hz:g}"
+
+
+def parse_trace_channel(channel: str) -> Optional[Tuple[int, float]]:
+    """(car index, sample rate) of a channel built by ``trace_channel``."""
+    parts = channel.split(":")
+    if len(parts) != 3 or parts[0] != TRACES_CHANNEL:
+        return None
+    return int(parts[1]), float(parts[2])
+
+
+def trace_channel_for(message: dict) -> Optional[str]:
+    """Channel for a ``{"channel": "car_telemetry", "car": 3, "hz": 10}`` message, if valid."""
+    try:
+        car_index = int(message["car"])
+        hz = float(message.get("hz") or DEFAULT_TRACE_SAMPLE_HZ)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not 0 <= car_index < MAX_CARS:
+        return None
+    return trace_channel(car_index, min(max(hz, 1.0), TRACE_MAX_RATE_HZ))
+
+
+class TraceBroadcaster:
+    """
+    Streams CarTelemetry traces to /ws clients subscribed to a car.
+
+    Each subscription names a car and a sample rate; every batch carries the
+    samples that arrived since the previous one, downsampled to that rate, as
+    parallel arrays. Clients that share a car and rate share one message.
+    """
+
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        traces_source: Callable[[], CarTelemetryTraces],
+        rate_hz: Optional[float] = None,
+    ):
+        self.manager = manager
+        self.traces_source = traces_source
+        self.rate_hz = rate_hz or get_trace_batch_rate_hz()
+        self._task: Optional[asyncio.Task] = None
+        # channel -> (trace ring, cursor, session time of the last sample sent)
+        self._cursors: Dict[str, Tuple[CarTelemetryTraces, int, Optional[float]]] = {}
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Car telemetry trace broadcaster started at {self.rate_hz:g} Hz")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        interval = 1.0 / self.rate_hz
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.exception(f"Error broadcasting car telemetry traces: {e}")
+            await asyncio.sleep(interval)
+
+    async def tick(self):
+        channels = self.manager.subscribed_channels(TRACES_CHANNEL + ":")
+        for channel in list(self._cursors):
+            if channel not in channels:
+                del self._cursors[channel]
+        if not channels:
+            return
+
+        traces = self.traces_source()
+        for channel in channels:
+            car_index, hz = parse_trace_channel(channel)
+            source, cursor, last_time = self._cursors.get(channel, (None, None, None))
+            if source is not traces or cursor is None or cursor > traces.written:
+                # New subscription, new session or a reset ring: start from now
+                self._cursors[channel] = (traces, traces.written, None)
+                continue
+            cursor, columns = traces.read(car_index, hz=hz, after=cursor, after_time=last_time)
+            times = columns["session_time"]
+            self._cursors[channel] = (traces, cursor, float(times[-1]) if len(times) else last_time)
+            if not len(times):
+                continue
+            await self.manager.broadcast(
+                {
+                    "type": "car_telemetry",
+                    "car": car_index,
+                    "hz": hz,
+                    "samples": trace_columns_to_json(columns),
+                },
+                channel=channel,
+                policy=DROP_OLDEST,
+            )
@@ -0,0 +1,199 @@
+"""
+On-disk binary cache of the compiled GeoJSON circuits.
+
+Every circuit's geometry is stored in one .npy file of TRACK_POINT records,
+next to a JSON index. For each circuit the index holds its slice of the array,
+its track_info and rotation, and the source file's mtime, size and SHA-256. At
+startup the array is memory-mapped, and each circuit that is still current
+becomes a TrackGeometry over a view of it, so no GeoJSON is read or projected.
+A source whose mtime or size changed is hashed, and it is parsed again only if
+the hash (or its rotation, or the cache format) differs. The cache is then
+rewritten atomically.
+
+Build it ahead of a deploy with:
+
+    python -m app.services.track_cache [--rebuild]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.services.track_service import GEOJSON_DIR, TrackGeometry, TrackService
+
+logger = logging.getLogger(__name__)
+
+TRACK_CACHE_DIR = os.getenv("TRACK_CACHE_DIR", ".track_cache")  # Empty disables the disk cache
+CACHE_FORMAT = 1  # Bump when the parser's output changes
+
+TRACK_POINT = np.dtype(
+    [("x", "<f8"), ("z", "<f8"), ("dist", "<f8"), ("sector", "<i4")]
+)
+_POINTS_FILE = "tracks.npy"
+_INDEX_FILE = "tracks.json"
+
+
+def _file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class TrackCache:
+    """Compiled circuits for one GeoJSON directory, kept in ``cache_dir``."""
+
+    def __init__(self, cache_dir: Path, source_dir: Path = GEOJSON_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.source_dir = Path(source_dir)
+
+    def load(self, service: TrackService, rebuild: bool = False) -> Dict[str, TrackGeometry]:
+        """
+        Every circuit in the source directory, keyed by file stem.
+
+        Current circuits come from the memory-mapped cache; the rest are
+        parsed with ``service`` and the cache is rewritten to include them.
+        """
+        index, points = ({}, None) if rebuild else self._read()
+        tracks: Dict[str, TrackGeometry] = {}
+        entries: Dict[str, dict] = {}
+        stale = False
+
+        for source in sorted(self.source_dir.glob("*.geojson")):
+            name = source.stem
+            stat = source.stat()
+            entry = index.get(name)
+            sha256 = None
+            current = (
+                entry is not None
+                and points is not None
+                and entry["rotation"] == service.track_rotation(name)
+            )
+            if current and (entry["mtime_ns"], entry["size"]) != (stat.st_mtime_ns, stat.st_size):
+                # Touched (e.g. by a checkout); still current if the content is the same
+                sha256 = _file_hash(source)
+                current = sha256 == entry["sha256"]
+                stale = True  # Record the new mtime either way
+            if current:
+                view = points[entry["offset"] : entry["offset"] + entry["count"]]
+                tracks[name] = TrackGeometry(
+                    name, entry["track_info"], view["x"], view["z"], view["dist"], view["sector"]
+                )
+            else:
+                track = service.parse_track_file(source)
+                stale = True
+                if track is None:
+                    continue
+                tracks[name] = track
+            entries[name] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": sha256 or (entry["sha256"] if current else _file_hash(source)),
+                "rotation": service.track_rotation(name),
+                "track_info": tracks[name].track_info,
+            }
+
+        if stale or set(index) != set(entries):
+            points = None  # Release the old mapping so its file can be replaced
+            tracks = self._write(tracks, entries)
+        return tracks
+
+    def _read(self):
+        index_path = self.cache_dir / _INDEX_FILE
+        points_path = self.cache_dir / _POINTS_FILE
+        try:
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+            if index.get("format") != CACHE_FORMAT:
+                logger.info("Track cache format changed; rebuilding")
+                return {}, None
+            points = np.load(points_path, mmap_mode="r")
+            if points.dtype != TRACK_POINT:
+                return {}, None
+            return index["tracks"], points
+        except FileNotFoundError:
+            return {}, None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable track cache in {self.cache_dir}: {e}")
+            return {}, None
+
+    def _write(
+        self, tracks: Dict[str, TrackGeometry], entries: Dict[str, dict]
+    ) -> Dict[str, TrackGeometry]:
+        # Copy everything out of the old mapping first so the files can be replaced
+        offset = 0
+        points = np.empty(sum(len(track) for track in tracks.values()), dtype=TRACK_POINT)
+        for name, track in tracks.items():
+            view = points[offset : offset + len(track)]
+            view["x"], view["z"], view["dist"], view["sector"] = (
+                track.x, track.z, track.dist, track.sector
+            )
+            entries[name].update(offset=offset, count=len(track))
+            offset += len(track)
+        tracks.clear()  # Drops the last views into the old mapping
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            points_tmp = self.cache_dir / f"{_POINTS_FILE}.tmp"
+            index_tmp = self.cache_dir / f"{_INDEX_FILE}.tmp"
+            with open(points_tmp, "wb") as file:
+                np.save(file, points)
+            index_tmp.write_text(
+                json.dumps({"format": CACHE_FORMAT, "tracks": entries}), encoding="utf-8"
+            )
+            os.replace(points_tmp, self.cache_dir / _POINTS_FILE)
+            os.replace(index_tmp, self.cache_dir / _INDEX_FILE)
+            logger.info(f"Wrote track cache for {len(entries)} circuits to {self.cache_dir}")
+        except OSError as e:
+            # Serve from memory; the next start tries again
+            logger.warning(f"Could not write track cache to {self.cache_dir}: {e}")
+
+        for name, entry in entries.items():
+            view = points[entry["offset"] : entry["offset"] + entry["count"]]
+            tracks[name] = TrackGeometry(
+                name, entry["track_info"], view["x"], view["z"], view["dist"], view["sector"]
+            )
+        return tracks
+
+
+def prewarm_track_cache(service: TrackService, cache_dir: Optional[str] = None) -> int:
+    """
+    Fill ``service.track_cache`` with every circuit, and its levels of detail,
+    before the first request.
+    Uses the on-disk cache unless TRACK_CACHE_DIR is empty. Returns the number of circuits.
+    """
+    cache_dir = TRACK_CACHE_DIR if cache_dir is None else cache_dir
+    start = time.perf_counter()
+    if cache_dir:
+        tracks = TrackCache(Path(cache_dir)).load(service)
+    else:
+        tracks = {}
+        for source in sorted(GEOJSON_DIR.glob("*.geojson")):
+            track = service.parse_track_file(source)
+            if track:
+                tracks[source.stem] = track
+    for track in tracks.values():
+        track.lods()
+    service.track_cache.update(tracks)
+    logger.info(
+        f"Prewarmed {len(tracks)} circuits in {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    return len(tracks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile every GeoJSON circuit into the track cache.")
+    parser.add_argument("--cache-dir", default=TRACK_CACHE_DIR or ".track_cache")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the existing cache")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    tracks = TrackCache(Path(args.cache_dir)).load(TrackService(), rebuild=args.rebuild)
+    print(f"{len(tracks)} circuits cached in {args.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
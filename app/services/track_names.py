@@ -0,0 +1,285 @@
+"""
+Track name resolution over a prebuilt index.
+
+TrackNameIndex is built once from the GeoJSON file stems and TRACK_ALIASES.
+It holds compact alias -> track, lowercase name -> track, cleaned name
+(without "circuit", "track", ...) -> track, and a trigram inverted index for
+fuzzy matching. Resolution tries, in order: an alias, the exact name, a
+substring in either direction, the cleaned name, and finally the closest
+trigram match (for names of TRACK_FUZZY_MIN_LENGTH characters or more).
+Results, misses included, are memoised in a bounded LRU. A new index (with an
+empty LRU) replaces the old one whenever the geojson directory changes.
+"""
+
+import logging
+import math
+import os
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRACK_NAME_CACHE_SIZE = 256
+# Dice similarity of character trigrams a fuzzy match needs (0-1)
+TRACK_FUZZY_MIN_SIMILARITY = 0.5
+# Shorter names (after dropping stopwords) share a trigram or two with too many circuits
+TRACK_FUZZY_MIN_LENGTH = 4
+_CLEANED_WORDS = ("circuit", "track", "street", "international")
+# Also left out of fuzzy matching: too common across circuit names to tell them apart
+_FUZZY_STOPWORDS = _CLEANED_WORDS + ("autodromo", "autodrome", "autodrom", "grand_prix", "city")
+
+
+def get_fuzzy_min_similarity() -> float:
+    """
+    Read TRACK_FUZZY_MIN_SIMILARITY from the environment (at least 0).
+    "off" or a value above 1 turns fuzzy matching off (returns infinity).
+    """
+    configured = os.getenv("TRACK_FUZZY_MIN_SIMILARITY", "").strip().lower()
+    if not configured:
+        return TRACK_FUZZY_MIN_SIMILARITY
+    if configured == "off":
+        return math.inf
+    try:
+        value = float(configured)
+    except ValueError:
+        logger.warning("Invalid TRACK_FUZZY_MIN_SIMILARITY, using the default similarity")
+        return TRACK_FUZZY_MIN_SIMILARITY
+    if math.isnan(value):
+        return TRACK_FUZZY_MIN_SIMILARITY
+    return math.inf if value > 1 else max(value, 0.0)
+
+
+# Common names (country, circuit, city) -> GeoJSON file stem
+TRACK_ALIASES = {
+    # Country/Location based aliases
+    "australia": "melbourne",
+    "australian": "melbourne",
+    "austria": "austria",
+    "austrian": "austria",
+    "azerbaijan": "baku",
+    "bahrain": "bahrain",
+    "bahraini": "bahrain",
+    "belgium": "spa",
+    "belgian": "spa",
+    "brazil": "brazil",
+    "brazilian": "brazil",
+    "canada": "canada",
+    "canadian": "canada",
+    "china": "shanghai",
+    "chinese": "shanghai",
+    "france": "paul_ricard",
+    "french": "paul_ricard",
+    "germany": "hungaroring",  # Note: No German GP in current files
+    "hungary": "hungaroring",
+    "hungarian": "hungaroring",
+    "italy": "monza",
+    "italian": "monza",
+    "japan": "suzuka",
+    "japanese": "suzuka",
+    "mexico": "mexico",
+    "mexican": "mexico",
+    "netherlands": "zandvoort",
+    "dutch": "zandvoort",
+    "qatar": "losail",
+    "russia": "sochi",
+    "russian": "sochi",
+    "saudi_arabia": "jeddah",
+    "saudi": "jeddah",
+    "singapore": "singapore",
+    "spain": "catalunya",
+    "spanish": "catalunya",
+    "uk": "silverstone",
+    "britain": "silverstone",
+    "british": "silverstone",
+    "england": "silverstone",
+    "usa": "texas",
+    "united_states": "texas",
+    "america": "texas",
+    "american": "texas",
+    "uae": "abu_dhabi",
+    "emirates": "abu_dhabi",
+    "vietnam": "hanoi",
+    "vietnamese": "hanoi",
+    # Circuit/Track name aliases
+    "albert_park": "melbourne",
+    "red_bull_ring": "austria",
+    "spielberg": "austria",
+    "baku_city_circuit": "baku",
+    "bahrain_international_circuit": "bahrain",
+    "spa_francorchamps": "spa",
+    "francorchamps": "spa",
+    "interlagos": "brazil",
+    "sao_paulo": "brazil",
+    "gilles_villeneuve": "canada",
+    "montreal": "canada",
+    "shanghai_international_circuit": "shanghai",
+    "circuit_paul_ricard": "paul_ricard",
+    "le_castellet": "paul_ricard",
+    "hungaroring": "hungaroring",
+    "budapest": "hungaroring",
+    "autodromo_nazionale_monza": "monza",
+    "suzuka_circuit": "suzuka",
+    "autodromo_hermanos_rodriguez": "mexico",
+    "mexico_city": "mexico",
+    "circuit_zandvoort": "zandvoort",
+    "losail_international_circuit": "losail",
+    "doha": "losail",
+    "sochi_autodrom": "sochi",
+    "jeddah_corniche_circuit": "jeddah",
+    "marina_bay": "singapore",
+    "singapore_street_circuit": "singapore",
+    "circuit_de_catalunya": "catalunya",
+    "barcelona": "catalunya",
+    "silverstone_circuit": "silverstone",
+    "yas_marina": "abu_dhabi",
+    "yas_marina_circuit": "abu_dhabi",
+    "hanoi_street_circuit": "hanoi",
+    "circuit_of_the_americas": "texas",
+    "cota": "texas",
+    "austin": "texas",
+    "imola_circuit": "imola",
+    "autodromo_enzo_e_dino_ferrari": "imola",
+    "san_marino": "imola",
+    "las_vegas_strip": "las_vegas",
+    "vegas": "las_vegas",
+    "strip": "las_vegas",
+    "miami_international_autodrome": "miami",
+    "hard_rock_stadium": "miami",
+    "monaco_street_circuit": "monaco",
+    "monte_carlo": "monaco",
+    "circuit_de_monaco": "monaco",
+    "sakhir_circuit": "sakhir",
+}
+
+
+def normalize_track_name(name: str) -> str:
+    return name.lower().replace(" ", "_").replace("-", "_")
+
+
+def _cleaned(normalized: str) -> str:
+    for word in _CLEANED_WORDS:
+        normalized = normalized.replace(word, "")
+    return normalized.strip("_")
+
+
+def _fuzzy_key(normalized: str) -> str:
+    for word in _FUZZY_STOPWORDS:
+        normalized = normalized.replace(word, "")
+    return normalized.replace("_", "")
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TrackNameIndex:
+    """Lookup tables over one listing of the available tracks (file stems)."""
+
+    def __init__(self, tracks: List[str], min_similarity: Optional[float] = None):
+        self.tracks = sorted(tracks)
+        self.min_similarity = get_fuzzy_min_similarity() if min_similarity is None else min_similarity
+        by_lower: Dict[str, str] = {}
+        for track in self.tracks:
+            by_lower.setdefault(track.lower(), track)
+        self.by_name = by_lower
+
+        # An alias matches its own spelling with or without underscores; the first listed wins
+        self.by_alias: Dict[str, str] = {}
+        for alias, target in TRACK_ALIASES.items():
+            track = by_lower.get(target.lower())
+            if track:
+                self.by_alias.setdefault(alias.replace("_", ""), track)
+
+        self.normalized: List[Tuple[str, str]] = [
+            (normalize_track_name(track), track) for track in self.tracks
+        ]
+        self.by_cleaned: Dict[str, str] = {}
+        for track in self.tracks:
+            self.by_cleaned.setdefault(_cleaned(track.lower()), track)
+
+        # Fuzzy fallback over cleaned track names and aliases, so shared words
+        # like "street_circuit" don't count towards the similarity
+        self._fuzzy_keys: List[Tuple[str, str, int]] = []  # (key, track, trigram count)
+        self._postings: Dict[str, List[int]] = {}
+        keys: Dict[str, str] = {}
+        for normalized, track in self.normalized:
+            keys.setdefault(_fuzzy_key(normalized), track)
+        for alias, target in TRACK_ALIASES.items():
+            track = by_lower.get(target.lower())
+            if track:
+                keys.setdefault(_fuzzy_key(alias), track)
+        keys.pop("", None)
+        for key, track in keys.items():
+            grams = _trigrams(key)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(len(self._fuzzy_keys))
+            self._fuzzy_keys.append((key, track, len(grams)))
+
+        self.resolve = lru_cache(maxsize=TRACK_NAME_CACHE_SIZE)(self._resolve)
+
+    def _resolve(self, input_track_name: str) -> Optional[str]:
+        input_normalized = normalize_track_name(input_track_name)
+
+        # First try alias matching
+        track = self.by_alias.get(input_normalized.replace("_", ""))
+        if track:
+            logger.debug(f"Alias match found for '{input_track_name}' -> '{track}'")
+            return track
+
+        # Second, try exact match (case-insensitive)
+        track = self.by_name.get(input_normalized)
+        if track:
+            logger.debug(f"Exact match found for '{input_track_name}': '{track}'")
+            return track
+
+        # Third, try partial matching - check if input is contained in any track name
+        for track_normalized, track in self.normalized:
+            if input_normalized in track_normalized or track_normalized in input_normalized:
+                logger.debug(f"Partial match found for '{input_track_name}': '{track}'")
+                return track
+
+        # Fourth, try matching without common prefixes/suffixes
+        track = self.by_cleaned.get(_cleaned(input_normalized))
+        if track:
+            logger.debug(f"Cleaned match found for '{input_track_name}': '{track}'")
+            return track
+
+        # Last, the closest name or alias by trigram similarity (typos, missing letters)
+        key = _fuzzy_key(input_normalized)
+        if self.min_similarity <= 1 and len(key) >= TRACK_FUZZY_MIN_LENGTH:
+            track, similarity = self.fuzzy(key)
+        else:
+            track, similarity = None, 0.0
+        if track and similarity >= self.min_similarity:
+            logger.debug(
+                f"Fuzzy match found for '{input_track_name}': '{track}' ({similarity:.2f})"
+            )
+            return track
+
+        logger.warning(
+            f"No matching track found for '{input_track_name}' in available tracks: {self.tracks}"
+        )
+        return None
+
+    def fuzzy(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        Track whose cleaned name or alias, starting with the same letter, is
+        closest to ``text`` (Dice over trigrams), and the score.
+        """
+        if not text:
+            return None, 0.0
+        grams = _trigrams(text)
+        shared = Counter(
+            key_index for gram in grams for key_index in self._postings.get(gram, ())
+        )
+        best, best_score = None, 0.0
+        for key_index in sorted(shared):  # Ties go to the earliest key, whatever the set order
+            key, track, key_grams = self._fuzzy_keys[key_index]
+            if key[0] != text[0]:
+                continue  # Typos rarely hit the first letter; "trip" isn't "strip"
+            score = 2 * shared[key_index] / (len(grams) + key_grams)
+            if score > best_score:
+                best, best_score = track, score
+        return best, best_score
@@ -1,3 +1,4 @@
+import asyncio
 import csv
 import json
 import os
@@ -5,20 +6,183 @@ import logging
 from pathlib import Path
 from typing import Optional, List, Dict, Tuple
 from app.models.models import TrackData, TrackPoint
+from app.services.track_names import TrackNameIndex
+from app.utils.helpers import EncodedJSON
 import math
 
+import numpy as np
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # GeoJSON directory
 GEOJSON_DIR = Path("geojson")
 
+# How often the geojson directory is checked for added, removed or edited circuits
+TRACK_WATCH_INTERVAL_SECONDS = 2.0
+
+# Rotation of the projected racing line, in degrees
+DEFAULT_TRACK_ROTATION = 90
+NO_ROTATION_TRACKS = {"portimao"}  # Tracks that shouldn't be rotated
+FIFTEEN_ROTATION_TRACKS = {"abu_dhabi"}  # unsure yet
+
+# Douglas-Peucker tolerance of each level of detail, in metres (level 0 is every vertex)
+TRACK_LOD_TOLERANCES_M = (0.0, 1.0, 3.0, 8.0, 20.0)
+
+
+def simplify_polyline(x: np.ndarray, z: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Ramer-Douglas-Peucker: indices of the vertices to keep so that no dropped
+    vertex is further than ``tolerance`` from the simplified line. The ends are always kept.
+    """
+    count = len(x)
+    if count < 3 or tolerance <= 0:
+        return np.arange(count)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx = x[end] - x[start]
+        dz = z[end] - z[start]
+        px = x[start + 1 : end] - x[start]
+        pz = z[start + 1 : end] - z[start]
+        length = math.hypot(dx, dz)
+        if length > 0:
+            distances = np.abs(px * dz - pz * dx) / length
+        else:  # Closed loop: the chord is a point
+            distances = np.hypot(px, pz)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return np.flatnonzero(keep)
+
+
+class TrackGeometry:
+    """
+    A parsed racing line held as contiguous arrays (x, z, dist, sector).
+
+    GeoJSON has no elevation or DRS data, so pos_y and drs are always 0. The
+    TrackData model, the JSON-ready dict and the encoded JSON body are only
+    built when first asked for.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        track_info: str,
+        x: np.ndarray,
+        z: np.ndarray,
+        dist: np.ndarray,
+        sector: np.ndarray,
+    ):
+        self.name = name
+        self.track_info = track_info
+        self.x = x
+        self.z = z
+        self.dist = dist
+        self.sector = sector
+        self._bounds: Optional[Tuple[float, float, float, float]] = None
+        self._dict: Optional[dict] = None
+        self._track_data: Optional[TrackData] = None
+        self._encoded: Optional[EncodedJSON] = None
+        self._lods: Optional[List["TrackGeometry"]] = None
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def lods(self) -> List["TrackGeometry"]:
+        """
+        This line simplified at each TRACK_LOD_TOLERANCES_M tolerance, most detailed
+        first (computed once). Kept vertices keep their original dist and sector.
+        """
+        if self._lods is None:
+            self._lods = []
+            for tolerance in TRACK_LOD_TOLERANCES_M:
+                if tolerance <= 0:
+                    self._lods.append(self)
+                    continue
+                kept = simplify_polyline(self.x, self.z, tolerance)
+                self._lods.append(
+                    TrackGeometry(
+                        self.name,
+                        self.track_info,
+                        self.x[kept],
+                        self.z[kept],
+                        self.dist[kept],
+                        self.sector[kept],
+                    )
+                )
+        return self._lods
+
+    def lod(self, level: Optional[int] = None, max_points: Optional[int] = None) -> Tuple[int, "TrackGeometry"]:
+        """
+        A level of detail by index, or the most detailed one with at most
+        ``max_points`` points (the coarsest if none is that small). Returns (level, line).
+        """
+        lods = self.lods()
+        if level is not None:
+            return level, lods[level]
+        if max_points is not None:
+            for level, line in enumerate(lods):
+                if len(line) <= max_points:
+                    return level, line
+            return len(lods) - 1, lods[-1]
+        return 0, self
+
+    def position_bounds(self) -> Tuple[float, float, float, float]:
+        """Bounds in game world axes (min_x, max_x, min_z, max_z); see TrackService.get_position_bounds."""
+        if self._bounds is None:
+            self._bounds = (
+                float(self.z.min()),
+                float(self.z.max()),
+                float(self.x.min()),
+                float(self.x.max()),
+            )
+        return self._bounds
+
+    def to_dict(self) -> dict:
+        """The track in the TrackData JSON shape, built from whole-array reads."""
+        if self._dict is None:
+            points = [
+                {"dist": dist, "pos_x": x, "pos_y": 0.0, "pos_z": z, "drs": 0, "sector": sector}
+                for dist, x, z, sector in zip(
+                    self.dist.tolist(), self.x.tolist(), self.z.tolist(), self.sector.tolist()
+                )
+            ]
+            self._dict = {"name": self.name, "track_info": self.track_info, "points": points}
+        return self._dict
+
+    def encoded_json(self) -> EncodedJSON:
+        """to_dict() serialised and precompressed once, for /api/track/data."""
+        if self._encoded is None:
+            self._encoded = EncodedJSON(self.to_dict())
+        return self._encoded
+
+    def track_data(self) -> TrackData:
+        """The track as a TrackData model (built once, on first use)."""
+        if self._track_data is None:
+            self._track_data = TrackData(
+                name=self.name,
+                track_info=self.track_info,
+                points=[TrackPoint(**point) for point in self.to_dict()["points"]],
+            )
+        return self._track_data
+
 
 class TrackService:
     """Service for loading and parsing track data files."""
 
     def __init__(self):
-        self.track_cache: Dict[str, TrackData] = {}
+        self.track_cache: Dict[str, TrackGeometry] = {}
+        self._name_index: Optional[TrackNameIndex] = None
+        self._directory_signature: Tuple[Tuple[str, int, int], ...] = ()
+        self._watch_task: Optional[asyncio.Task] = None
 
     @staticmethod
     def lat_lng_to_local_coordinates(
@@ -73,22 +237,144 @@ class TrackService:
 
         return x, z
 
-    def get_available_tracks(self) -> List[str]:
-        """Get list of available track names from geojson directory."""
-        available_tracks = []
+    @staticmethod
+    def project_coordinates(
+        lats: np.ndarray,
+        lngs: np.ndarray,
+        center_lat: float,
+        center_lng: float,
+        scale: float = 1000,
+        rotation_degrees: float = 0,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Array form of lat_lng_to_local_coordinates: (x, z) arrays for all points at once."""
+        R = 6371000
+        center_lat_rad = math.radians(center_lat)
+        x = np.radians(lngs) - math.radians(center_lng)
+        x *= R * math.cos(center_lat_rad) * scale / 1000
+        z = np.radians(lats) - center_lat_rad
+        z *= R * scale / 1000
+
+        if rotation_degrees != 0:
+            rotation_rad = math.radians(rotation_degrees)
+            cos_rot = math.cos(rotation_rad)
+            sin_rot = math.sin(rotation_rad)
+            x, z = x * cos_rot - z * sin_rot, x * sin_rot + z * cos_rot
+
+        return x, z
+
+    @staticmethod
+    def track_rotation(track_name: str) -> float:
+        """Rotation applied to a track's projected coordinates, in degrees."""
+        name = track_name.lower()
+        if name in NO_ROTATION_TRACKS:
+            return 0
+        if name in FIFTEEN_ROTATION_TRACKS:
+            return 15
+        return DEFAULT_TRACK_ROTATION
+
+    @classmethod
+    def build_geometry(
+        cls, lats: np.ndarray, lngs: np.ndarray, rotation_degrees: float = 0
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Project, rotate and measure a racing line in one pass.
+
+        Returns (x, z, dist, sector) arrays, or None with fewer than three points
+        (too short to split into sectors).
+        """
+        count = len(lats)
+        if count < 3:
+            return None
+
+        # Center the projection on the middle of the bounding box
+        center_lat = (lats.min() + lats.max()) / 2
+        center_lng = (lngs.min() + lngs.max()) / 2
+        logger.debug(f"Track center: lat={center_lat}, lng={center_lng}")
+        x, z = cls.project_coordinates(
+            lats, lngs, float(center_lat), float(center_lng), rotation_degrees=rotation_degrees
+        )
 
-        # Get tracks from .geojson files
-        if GEOJSON_DIR.exists():
-            for file_path in GEOJSON_DIR.glob("*.geojson"):
-                track_name = file_path.stem
-                available_tracks.append(track_name)
+        # Cumulative distance along the line
+        dist = np.empty(count, dtype=np.float64)
+        dist[0] = 0.0
+        np.cumsum(np.hypot(np.diff(x), np.diff(z)), out=dist[1:])
+
+        # Divide into 3 sectors roughly (a remainder of points spills into a 4th, as before)
+        sector = (np.arange(count) // (count // 3) + 1).astype(np.int32)
+        return x, z, dist, sector
+
+    def _scan_directory(self) -> Tuple[Tuple[str, int, int], ...]:
+        """(file name, mtime_ns, size) of every GeoJSON file, sorted."""
+        if not GEOJSON_DIR.is_dir():
+            return ()
+        entries = []
+        with os.scandir(GEOJSON_DIR) as scan:
+            for entry in scan:
+                if entry.name.endswith(".geojson") and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(entries))
+
+    @property
+    def name_index(self) -> TrackNameIndex:
+        """The current track name index, built on first use."""
+        return self._name_index or self.refresh_track_index()
+
+    def refresh_track_index(
+        self, signature: Optional[Tuple[Tuple[str, int, int], ...]] = None
+    ) -> TrackNameIndex:
+        """
+        Rebuild the name index (and its LRU) from the geojson directory, and
+        drop cached geometry of circuits whose file changed or disappeared.
+        """
+        signature = self._scan_directory() if signature is None else signature
+        stale = {
+            Path(name).stem for name, _, _ in set(self._directory_signature) - set(signature)
+        }
+        if stale:
+            for key, track in list(self.track_cache.items()):
+                if track.name in stale:
+                    del self.track_cache[key]
+            logger.info(f"Track files changed: {sorted(stale)}")
+        index = TrackNameIndex([Path(name).stem for name, _, _ in signature])
+        self._name_index = index
+        self._directory_signature = signature
+        return index
+
+    def start_watching(self, interval: float = TRACK_WATCH_INTERVAL_SECONDS):
+        """Watch the geojson directory and rebuild the index when it changes."""
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch(interval))
+
+    async def stop_watching(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # A couple of dozen stat calls; cheaper than a thread hop
+                signature = self._scan_directory()
+                if signature != self._directory_signature:
+                    logger.info("GeoJSON directory changed; rebuilding the track name index")
+                    self.refresh_track_index(signature)
+            except Exception as e:
+                logger.warning(f"Error watching {GEOJSON_DIR}: {e}")
 
-        return sorted(available_tracks)
+    def get_available_tracks(self) -> List[str]:
+        """Get list of available track names from geojson directory."""
+        return list(self.name_index.tracks)
 
     def find_matching_track_name(self, input_track_name: str) -> Optional[str]:
         """
         Find the best matching track name from available tracks using case-insensitive matching
-        with comprehensive alias support.
+        with comprehensive alias support, falling back to the closest name by trigram similarity.
 
         Args:
             input_track_name: The track name to match (can be any case)
@@ -98,194 +384,26 @@ class TrackService:
         """
         if not input_track_name:
             return None
-
-        available_tracks = self.get_available_tracks()
-        input_normalized = input_track_name.lower().replace(" ", "_").replace("-", "_")
-
-        # Track aliases mapping - common names to actual track file names
-        track_aliases = {
-            # Country/Location based aliases
-            "australia": "melbourne",
-            "australian": "melbourne",
-            "austria": "austria",
-            "austrian": "austria",
-            "azerbaijan": "baku",
-            "bahrain": "bahrain",
-            "bahraini": "bahrain",
-            "belgium": "spa",
-            "belgian": "spa",
-            "brazil": "brazil",
-            "brazilian": "brazil",
-            "canada": "canada",
-            "canadian": "canada",
-            "china": "shanghai",
-            "chinese": "shanghai",
-            "france": "paul_ricard",
-            "french": "paul_ricard",
-            "germany": "hungaroring",  # Note: No German GP in current files
-            "hungary": "hungaroring",
-            "hungarian": "hungaroring",
-            "italy": "monza",
-            "italian": "monza",
-            "japan": "suzuka",
-            "japanese": "suzuka",
-            "mexico": "mexico",
-            "mexican": "mexico",
-            "netherlands": "zandvoort",
-            "dutch": "zandvoort",
-            "qatar": "losail",
-            "russia": "sochi",
-            "russian": "sochi",
-            "saudi_arabia": "jeddah",
-            "saudi": "jeddah",
-            "singapore": "singapore",
-            "spain": "catalunya",
-            "spanish": "catalunya",
-            "uk": "silverstone",
-            "britain": "silverstone",
-            "british": "silverstone",
-            "england": "silverstone",
-            "usa": "texas",
-            "united_states": "texas",
-            "america": "texas",
-            "american": "texas",
-            "uae": "abu_dhabi",
-            "emirates": "abu_dhabi",
-            "vietnam": "hanoi",
-            "vietnamese": "hanoi",
-            # Circuit/Track name aliases
-            "albert_park": "melbourne",
-            "red_bull_ring": "austria",
-            "spielberg": "austria",
-            "baku_city_circuit": "baku",
-            "bahrain_international_circuit": "bahrain",
-            "spa_francorchamps": "spa",
-            "francorchamps": "spa",
-            "interlagos": "brazil",
-            "sao_paulo": "brazil",
-            "gilles_villeneuve": "canada",
-            "montreal": "canada",
-            "shanghai_international_circuit": "shanghai",
-            "circuit_paul_ricard": "paul_ricard",
-            "le_castellet": "paul_ricard",
-            "hungaroring": "hungaroring",
-            "budapest": "hungaroring",
-            "autodromo_nazionale_monza": "monza",
-            "suzuka_circuit": "suzuka",
-            "autodromo_hermanos_rodriguez": "mexico",
-            "mexico_city": "mexico",
-            "circuit_zandvoort": "zandvoort",
-            "losail_international_circuit": "losail",
-            "doha": "losail",
-            "sochi_autodrom": "sochi",
-            "jeddah_corniche_circuit": "jeddah",
-            "marina_bay": "singapore",
-            "singapore_street_circuit": "singapore",
-            "circuit_de_catalunya": "catalunya",
-            "barcelona": "catalunya",
-            "silverstone_circuit": "silverstone",
-            "yas_marina": "abu_dhabi",
-            "yas_marina_circuit": "abu_dhabi",
-            "hanoi_street_circuit": "hanoi",
-            "circuit_of_the_americas": "texas",
-            "cota": "texas",
-            "austin": "texas",
-            "imola_circuit": "imola",
-            "autodromo_enzo_e_dino_ferrari": "imola",
-            "san_marino": "imola",
-            "las_vegas_strip": "las_vegas",
-            "vegas": "las_vegas",
-            "strip": "las_vegas",
-            "miami_international_autodrome": "miami",
-            "hard_rock_stadium": "miami",
-            "monaco_street_circuit": "monaco",
-            "monte_carlo": "monaco",
-            "circuit_de_monaco": "monaco",
-            "sakhir_circuit": "sakhir",
-        }
-
-        # First try alias matching
-        for alias, actual_track in track_aliases.items():
-            if input_normalized == alias or input_normalized.replace(
-                "_", ""
-            ) == alias.replace("_", ""):
-                # Check if the actual track exists in available tracks
-                for track in available_tracks:
-                    if track.lower() == actual_track.lower():
-                        logger.debug(
-                            f"Alias match found for '{input_track_name}' -> '{alias}' -> '{track}'"
-                        )
-                        return track
-
-        # Second, try exact match (case-insensitive)
-        for track in available_tracks:
-            if track.lower() == input_normalized:
-                logger.debug(f"Exact match found for '{input_track_name}': '{track}'")
-                return track
-
-        # Third, try partial matching - check if input is contained in any track name
-        for track in available_tracks:
-            track_normalized = track.lower().replace(" ", "_").replace("-", "_")
-            if (
-                input_normalized in track_normalized
-                or track_normalized in input_normalized
-            ):
-                logger.debug(f"Partial match found for '{input_track_name}': '{track}'")
-                return track
-
-        # Fourth, try matching without common prefixes/suffixes
-        cleaned_input = (
-            input_normalized.replace("circuit", "")
-            .replace("track", "")
-            .replace("street", "")
-            .replace("international", "")
-            .strip("_")
-        )
-        for track in available_tracks:
-            cleaned_track = (
-                track.lower()
-                .replace("circuit", "")
-                .replace("track", "")
-                .replace("street", "")
-                .replace("international", "")
-                .strip("_")
-            )
-            if cleaned_input == cleaned_track:
-                logger.debug(f"Cleaned match found for '{input_track_name}': '{track}'")
-                return track
-
-        logger.warning(
-            f"No matching track found for '{input_track_name}' in available tracks: {available_tracks}"
-        )
-        return None
+        return self.name_index.resolve(input_track_name)
 
     def find_track_file(self, track_name: str) -> Optional[Path]:
         """Find the GeoJSON file for a given track name."""
         # Normalize track name (lowercase, replace spaces with underscores)
-        normalized_name = track_name.lower().replace(" ", "_")
-
-        # Find GeoJSON files
-        if GEOJSON_DIR.exists():
-            geojson_patterns = [
-                f"{normalized_name}.geojson",
-                f"{track_name.lower()}.geojson",
-            ]
-
-            for pattern in geojson_patterns:
-                file_path = GEOJSON_DIR / pattern
-                if file_path.exists():
-                    logger.debug(
-                        f"Found GeoJSON track file for '{track_name}': {file_path}"
-                    )
-                    return file_path
+        by_name = self.name_index.by_name
+        for candidate in (track_name.lower().replace(" ", "_"), track_name.lower()):
+            track = by_name.get(candidate)
+            if track:
+                file_path = GEOJSON_DIR / f"{track}.geojson"
+                logger.debug(f"Found GeoJSON track file for '{track_name}': {file_path}")
+                return file_path
 
         logger.warning(
             f"No track file found for '{track_name}'. Tried GeoJSON patterns"
         )
         return None
 
-    def parse_geojson_file(self, file_path: Path) -> Optional[TrackData]:
-        """Parse a GeoJSON track file and return TrackData."""
+    def parse_geojson_file(self, file_path: Path) -> Optional["TrackGeometry"]:
+        """Parse a GeoJSON track file into TrackGeometry."""
         try:
             with open(file_path, "r", encoding="utf-8") as file:
                 geojson_data = json.load(file)
@@ -319,86 +437,31 @@ class TrackService:
             if properties.get("length"):
                 track_info += f", Length: {properties.get('length')}m"
 
-            # Calculate center point for coordinate conversion
-            lats = [coord[1] for coord in coordinates]
-            lngs = [coord[0] for coord in coordinates]
-            center_lat = (min(lats) + max(lats)) / 2
-            center_lng = (min(lngs) + max(lngs)) / 2
-
-            logger.debug(
-                f"Track center: lat={center_lat}, lng={center_lng}"
-            )  # Convert coordinates to track points
-            points = []
-            total_distance = 0.0
-
-            # Determine rotation based on track name - some tracks shouldn't be rotated
-            rotation_degrees = 90  # Default rotation
-            no_rotation_tracks = [
-                "portimao",
-            ]  # Tracks that shouldn't be rotated
-            fifteen_rotation_tracks = [  # unsure yet
-                "abu_dhabi",
-            ]
-            if track_name.lower() in no_rotation_tracks:
-                rotation_degrees = 0
-            if track_name.lower() in fifteen_rotation_tracks:
-                rotation_degrees = 15
-
-            for i, (lng, lat) in enumerate(coordinates):
-                # Convert lat/lng to local coordinates with track-specific rotation
-                x, z = self.lat_lng_to_local_coordinates(
-                    lat, lng, center_lat, center_lng, rotation_degrees=rotation_degrees
-                )  # Calculate distance along track
-                if i > 0:
-                    prev_x, prev_z = self.lat_lng_to_local_coordinates(
-                        coordinates[i - 1][1],
-                        coordinates[i - 1][0],
-                        center_lat,
-                        center_lng,
-                        rotation_degrees=rotation_degrees,  # Use same rotation for consistency
-                    )
-                    distance_increment = math.sqrt(
-                        (x - prev_x) ** 2 + (z - prev_z) ** 2
-                    )
-                    total_distance += distance_increment
-
-                # Create track point (using defaults for missing data)
-                point = TrackPoint(
-                    dist=total_distance,
-                    pos_x=x,
-                    pos_y=0.0,  # GeoJSON doesn't have elevation, default to 0
-                    pos_z=z,
-                    drs=0,  # No DRS data in GeoJSON, default to 0
-                    sector=1
-                    + (i // (len(coordinates) // 3)),  # Divide into 3 sectors roughly
-                )
-                points.append(point)
-
-            if not points:
+            # Track-specific rotation, then one vectorised pass over all coordinates
+            coords = np.asarray(coordinates, dtype=np.float64)[:, :2]
+            geometry_arrays = self.build_geometry(
+                coords[:, 1], coords[:, 0], rotation_degrees=self.track_rotation(track_name)
+            )
+            if geometry_arrays is None:
                 logger.error(f"No valid track points generated from {file_path}")
                 return None
 
-            track_data = TrackData(
-                name=track_name,
-                track_info=track_info,
-                points=points,
-            )
-
+            track = TrackGeometry(track_name, track_info, *geometry_arrays)
             logger.debug(
-                f"Successfully parsed GeoJSON track '{track_name}' with {len(points)} points"
+                f"Successfully parsed GeoJSON track '{track_name}' with {len(track)} points"
             )
-            return track_data
+            return track
 
         except Exception as e:
             logger.error(f"Error parsing GeoJSON file {file_path}: {e}")
             return None
 
-    def parse_track_file(self, file_path: Path) -> Optional[TrackData]:
-        """Parse a GeoJSON track file and return TrackData."""
+    def parse_track_file(self, file_path: Path) -> Optional["TrackGeometry"]:
+        """Parse a GeoJSON track file into TrackGeometry."""
         return self.parse_geojson_file(file_path)
 
-    async def load_track_data(self, track_name: str) -> Optional[TrackData]:
-        """Load track data for a given track name, with caching."""
+    async def load_track_geometry(self, track_name: str) -> Optional["TrackGeometry"]:
+        """Load the geometry arrays for a given track name, with caching."""
         if not track_name:
             return None
 
@@ -407,18 +470,37 @@ class TrackService:
             logger.debug(f"Returning cached track data for '{track_name}'")
             return self.track_cache[track_name]
 
-        # Find and parse track file
+        # Find the track file; prewarmed circuits are cached under its stem
         track_file = self.find_track_file(track_name)
         if not track_file:
             return None
 
-        track_data = self.parse_track_file(track_file)
-        if track_data:
+        track = self.track_cache.get(track_file.stem) or self.parse_track_file(track_file)
+        if track:
             # Cache the result
-            self.track_cache[track_name] = track_data
+            self.track_cache[track_name] = track
             logger.debug(f"Cached track data for '{track_name}'")
 
-        return track_data
+        return track
+
+    async def load_track_data(self, track_name: str) -> Optional[TrackData]:
+        """Load track data for a given track name as a TrackData model."""
+        track = await self.load_track_geometry(track_name)
+        return track.track_data() if track else None
+
+    def get_position_bounds(
+        self, track_name: Optional[str]
+    ) -> Optional[Tuple[float, float, float, float]]:
+        """
+        Bounds of an already loaded track in game world axes (min_x, max_x, min_z, max_z).
+
+        The display draws track pos_z against car world_x and track pos_x against
+        world_z, so the axes are swapped here. Returns None if the track isn't cached.
+        """
+        if not track_name:
+            return None
+        track = self.track_cache.get(track_name)
+        return track.position_bounds() if track else None
 
     def clear_cache(self):
         """Clear the track data cache."""
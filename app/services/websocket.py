@@ -1,23 +1,192 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple, Union
+
 from fastapi import WebSocket
 
+logger = logging.getLogger(__name__)
+
+# Per-client outgoing queue limits
+SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 64))
+SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT", 5))
+MAX_LAG_SECONDS = float(os.getenv("WS_MAX_LAG_SECONDS", 10))
+
+# Delivery policies for ConnectionManager.broadcast
+RELIABLE = "reliable"  # Keep every message; a client whose queue overflows is evicted
+DROP_OLDEST = "drop_oldest"  # Discard the oldest queued message to make room
+COALESCE = "coalesce"  # Replace a queued message with the same key, so only the latest is sent
+
+Payload = Union[str, bytes]
+
+
+class ClientConnection:
+    """A WebSocket client with its own bounded send queue, drained by a writer task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int = SEND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.channels: Set[str] = set()
+        self.queue: Deque[Tuple[Optional[str], Payload]] = deque()
+        self.queue_size = queue_size
+        self.ready = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+        self.behind_since: Optional[float] = None  # Set while messages are being dropped
+        self.dropped = 0
+
+    def _mark_behind(self):
+        self.dropped += 1
+        if self.behind_since is None:
+            self.behind_since = time.monotonic()
+
+    def is_lagging(self) -> bool:
+        """True once the client has been dropping messages for longer than MAX_LAG_SECONDS."""
+        return (
+            self.behind_since is not None
+            and time.monotonic() - self.behind_since > MAX_LAG_SECONDS
+        )
+
+    def enqueue(self, payload: Payload, policy: str, key: Optional[str]) -> bool:
+        """Queue a payload without blocking. Returns False if the client should be evicted."""
+        if policy == COALESCE and key is not None:
+            for i, (queued_key, _) in enumerate(self.queue):
+                if queued_key == key:
+                    self.queue[i] = (key, payload)
+                    self._mark_behind()
+                    return not self.is_lagging()
+
+        if len(self.queue) >= self.queue_size:
+            if policy == RELIABLE:
+                return False
+            self.queue.popleft()
+            self._mark_behind()
+
+        self.queue.append((key, payload))
+        self.ready.set()
+        return not self.is_lagging()
+
+    async def drain(self):
+        """Send queued payloads until cancelled; raises if a send fails or times out."""
+        websocket = self.websocket
+        while True:
+            await self.ready.wait()
+            while self.queue:
+                _, payload = self.queue.popleft()
+                if isinstance(payload, bytes):
+                    send = websocket.send_bytes(payload)
+                else:
+                    send = websocket.send_text(payload)
+                await asyncio.wait_for(send, SEND_TIMEOUT_SECONDS)
+            # Caught up: nothing was awaited since the queue emptied, so no enqueue was missed
+            self.behind_since = None
+            self.ready.clear()
+
 
 class ConnectionManager:
-    def __init__(self):
-        # Store active WebSocket connections
-        self.active_connections = []
+    def __init__(self, queue_size: int = SEND_QUEUE_SIZE):
+        self.queue_size = queue_size
+        # Active WebSocket connections and their send queues
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self._closing: Set[asyncio.Task] = set()
+
+    @property
+    def active_connections(self):
+        return list(self.clients)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, self.queue_size)
+        self.clients[websocket] = client
+        client.writer = asyncio.create_task(self._run_writer(client))
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                self.disconnect(connection)
-                print(f"Disconnected from {connection.client}")
+        client = self.clients.pop(websocket, None)
+        if client and client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    def subscribe(self, websocket: WebSocket, channel: str):
+        if websocket in self.clients:
+            self.clients[websocket].channels.add(channel)
+
+    def unsubscribe(self, websocket: WebSocket, channel: str):
+        if websocket in self.clients:
+            self.clients[websocket].channels.discard(channel)
+
+    def unsubscribe_prefix(self, websocket: WebSocket, prefix: str):
+        """Drop every channel starting with ``prefix``, e.g. all of one car's traces."""
+        if websocket in self.clients:
+            channels = self.clients[websocket].channels
+            channels.difference_update([c for c in channels if c.startswith(prefix)])
+
+    def has_subscribers(self, channel: str) -> bool:
+        return any(channel in client.channels for client in self.clients.values())
+
+    def subscribed_channels(self, prefix: str) -> Set[str]:
+        """Every channel starting with ``prefix`` that has at least one subscriber."""
+        return {
+            channel
+            for client in self.clients.values()
+            for channel in client.channels
+            if channel.startswith(prefix)
+        }
+
+    async def _run_writer(self, client: ClientConnection):
+        try:
+            await client.drain()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(
+                f"Evicting WebSocket client {client.websocket.client}: send failed ({e!r})"
+            )
+            self._evict(client)
+
+    def _evict(self, client: ClientConnection):
+        """Drop a client immediately and close its socket in the background."""
+        self.disconnect(client.websocket)
+        task = asyncio.create_task(self._close(client.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            # 1013 "try again later": the client fell too far behind
+            await asyncio.wait_for(websocket.close(code=1013), SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
+    async def broadcast(
+        self,
+        message: Union[dict, Payload],
+        channel: Optional[str] = None,
+        policy: str = RELIABLE,
+        key: Optional[str] = None,
+    ):
+        """
+        Queue a message for every connection, or only those subscribed to ``channel``.
+
+        Never waits on a client: the message is serialised once and each client's
+        writer task sends it. Clients that overflow a RELIABLE queue, or keep
+        dropping frames for longer than MAX_LAG_SECONDS, are disconnected.
+        """
+        if isinstance(message, dict):
+            payload: Payload = json.dumps(
+                message, separators=(",", ":"), ensure_ascii=False
+            )
+        else:
+            payload = message
+
+        lagging = []
+        for client in self.clients.values():
+            if channel is not None and channel not in client.channels:
+                continue
+            if not client.enqueue(payload, policy, key):
+                lagging.append(client)
+
+        for client in lagging:
+            logger.info(
+                f"Evicting WebSocket client {client.websocket.client}: too far behind ({client.dropped} messages dropped)"
+            )
+            self._evict(client)
@@ -1,20 +1,48 @@
 import csv
+import gzip
+import hashlib
 import json
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from io import StringIO
 
 import aiofiles
+from fastapi import Response
 
 from app.models.models import Driver, LapTime  # Import necessary models
 
+# Brotli is optional; without it precompressed responses offer gzip only
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Time parsing is now part of the LapTime model via computed_field
+# Lap times are parsed to milliseconds by LapTime/LapTimeInput (models.parse_lap_time_ms)
+
+
+def ms_to_laptime_str(ms: Optional[int]) -> str:
+    if (
+        ms is None or ms <= 0
+    ):  # Handle cases where lap time might be 0, None, or invalid
+        # Depending on requirements, could return None, an empty string, or a placeholder
+        return (
+            "0:00.000"  # Or perhaps better to indicate no valid time, e.g., "--:--.---"
+        )
+
+    total_seconds = ms / 1000.0
+    minutes = int(total_seconds // 60)
+    seconds = int(total_seconds % 60)
+    milliseconds = int(round((total_seconds - (minutes * 60) - seconds) * 1000))
+    # Ensure milliseconds don't round up to 1000, which would break formatting
+    if milliseconds >= 1000:
+        milliseconds = 999
+    return f"{minutes}:{seconds:02d}.{milliseconds:03d}"
 
 
 def update_overall_fastest_lap(drivers: Dict[str, Driver]):
@@ -22,17 +50,16 @@ def update_overall_fastest_lap(drivers: Dict[str, Driver]):
     Finds the single fastest lap across all drivers and updates the
     is_fastest flag on the corresponding LapTime object.
     """
-    overall_fastest_time = float("inf")
+    overall_fastest_ms: int | None = None
     fastest_driver_name: str | None = None
     fastest_lap_ref: LapTime | None = None
 
     # First pass: find the minimum time value
     for name, driver in drivers.items():
-        if (
-            driver.fastest_lap
-            and driver.fastest_lap.time_seconds < overall_fastest_time
+        if driver.fastest_lap and (
+            overall_fastest_ms is None or driver.fastest_lap.time_ms < overall_fastest_ms
         ):
-            overall_fastest_time = driver.fastest_lap.time_seconds
+            overall_fastest_ms = driver.fastest_lap.time_ms
             fastest_driver_name = name  # Keep track of which driver had it
 
     # Second pass: reset all flags and set the fastest one
@@ -49,9 +76,12 @@ def update_overall_fastest_lap(drivers: Dict[str, Driver]):
 
 
 async def generate_csv_content(
-    drivers: Dict[str, Driver], track_name: str
+    drivers: Dict[str, Driver], track_name: str, ranked: bool = False
 ) -> Tuple[str, str]:
-    """Generates CSV content for driver lap times and returns filename and content."""
+    """
+    Generates CSV content for driver lap times and returns filename and content.
+    Pass ``ranked=True`` when ``drivers`` is already in leaderboard order to skip the sort.
+    """
     safe_track_name = track_name.replace(" ", "_").replace(
         "/", "_"
     )  # Sanitize filename
@@ -63,8 +93,9 @@ async def generate_csv_content(
         if driver.fastest_lap:
             lap_data.append((name, driver.team, driver.fastest_lap))
 
-    # Sort by lap time (fastest first) using the computed property
-    lap_data.sort(key=lambda item: item[2].time_seconds)
+    if not ranked:
+        # Sort by lap time (fastest first) on the parsed milliseconds
+        lap_data.sort(key=lambda item: item[2].time_ms)
 
     # F1 Points System (Top 10) + Fastest Lap Bonus
     points_map = {
@@ -110,3 +141,82 @@ async def generate_csv_content(
 
     logger.info(f"Successfully generated CSV content for {filename}")
     return filename, csv_string
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag.removeprefix("W/")
+        for candidate in if_none_match.split(",")
+    )
+
+
+class EncodedJSON:
+    """
+    A JSON body serialised once, with its gzip and (if available) brotli
+    encodings and a strong ETag per encoding.
+    """
+
+    def __init__(self, content):
+        # Same serialisation as JSONResponse
+        self.body = json.dumps(
+            content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.encodings: Dict[str, bytes] = {"gzip": gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.encodings["br"] = brotli.compress(self.body, quality=11)
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        # Each content-coding is a different representation, so it gets its own strong ETag
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+
+def preferred_encoding(accept_encoding: Optional[str], available) -> Optional[str]:
+    """Best of ``available`` ("br" before "gzip") allowed by an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def precompressed_response(
+    encoded: EncodedJSON,
+    accept_encoding: Optional[str],
+    if_none_match: Optional[str],
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Serve a precompressed JSON body: 304 when If-None-Match matches, otherwise
+    the best encoding the client accepts, without compressing anything per request.
+    """
+    encoding = preferred_encoding(accept_encoding, encoded.encodings)
+    headers = {
+        "ETag": encoded.etag_for(encoding),
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",  # Revalidate every time; a match costs one 304
+        **(extra_headers or {}),
+    }
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        return Response(encoded.encodings[encoding], media_type="application/json", headers=headers)
+    return Response(encoded.body, media_type="application/json", headers=headers)
@@ -0,0 +1 @@
+# Benchmarks for the telemetry ingest path; run with `python -m benchmarks.<name>`
@@ -0,0 +1,56 @@
+"""
+Packets/sec for the telemetry decode path.
+
+Compares the native decoder used by ``process_datagram`` with the
+f1_24_telemetry object decoder the listener used previously (only when the
+library is installed).
+
+    python -m benchmarks.bench_decoder [--iterations N]
+"""
+
+import argparse
+import time
+
+from app.api import telemetry
+from app.services.live_store import LiveTelemetryStore
+from app.services.telemetry_decoder import decode_with_library, LIBRARY_FALLBACK_AVAILABLE
+from benchmarks.synthetic import build_race_frame
+
+
+def _rate(func, packets, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for packet in packets:
+            func(packet)
+    elapsed = time.perf_counter() - start
+    return (len(packets) * iterations) / elapsed
+
+
+def _library_path(packet: bytes):
+    # Object decode only; the old copy-into-dicts step is not counted, so this flatters "before"
+    return decode_with_library(packet)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    store = LiveTelemetryStore()
+    packets = build_race_frame(frame=1)
+
+    native = _rate(
+        lambda packet: telemetry.process_datagram(packet, store), packets, args.iterations
+    )
+    print(f"native decoder         : {native:>12,.0f} packets/sec")
+
+    if LIBRARY_FALLBACK_AVAILABLE:
+        library = _rate(_library_path, packets, args.iterations)
+        print(f"f1_24_telemetry objects: {library:>12,.0f} packets/sec")
+        print(f"speed-up               : {native / library:>12.1f}x")
+    else:
+        print("f1_24_telemetry not installed; skipping the library comparison.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""
+End-to-end UDP ingest benchmark.
+
+Starts the API with uvicorn (or targets --url), starts a listener through
+/api/telemetry/start, then sends synthetic F1 24 race traffic for --cars
+cars at --rate frames/sec from a separate process while this one polls
+/api/drivers/live. Each frame is a Motion, LapData and CarStatus packet,
+plus Participants and Session packets once a second. Reports:
+
+  - decoded packets/sec and drop rate, from /api/telemetry/stats
+  - end-to-end latency: from sending a Motion packet until /api/drivers/live
+    first returns it (car 0's world Y carries the frame number)
+  - server CPU time per packet, when the server's PID is known
+
+    python -m benchmarks.bench_ingest [--rate 60] [--cars 22] [--duration 10] [--mode thread]
+    python -m benchmarks.bench_ingest --url http://host:8000 [--server-pid PID]
+
+--rate 0 sends as fast as possible. pytest-benchmark mode (pip install
+pytest-benchmark) tracks the decode path and a short end-to-end run:
+
+    pytest benchmarks/bench_ingest.py --benchmark-only
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.synthetic import (
+    HEADER,
+    build_car_status_packet,
+    build_car_telemetry_packet,
+    build_lap_data_packet,
+    build_motion_packet,
+    build_participants_packet,
+    build_race_frame,
+    build_session_packet,
+)
+
+SERVER_STARTUP_TIMEOUT_SECONDS = 30.0
+# Frames between Participants/Session packets when sending as fast as possible
+UNTHROTTLED_ROSTER_INTERVAL = 60
+MARKER_DRIVER = "Driver 1"  # Car 0 in benchmarks.synthetic
+MARKER_OFFSET = HEADER.size + 4  # Car 0's worldPositionY in a Motion packet
+MARKER = struct.Struct("<f")
+# Server CPU is sampled this long before traffic starts and subtracted as the idle baseline
+IDLE_BASELINE_SECONDS = 1.0
+
+
+# --- Sender (runs in its own process so it doesn't share a GIL with the poller) ---
+
+
+def send_race(host: str, port: int, rate: float, cars: int, duration: float, results):
+    """
+    Send race traffic for ``duration`` seconds.
+
+    Puts (packets sent, motion send times, seconds spent sending) on ``results``.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    roster_interval = max(1, int(rate)) if rate else UNTHROTTLED_ROSTER_INTERVAL
+    # Build one second of traffic up front so packet building doesn't cap the send rate
+    cycle = [
+        (
+            build_participants_packet(frame, cars),
+            build_session_packet(frame),
+            build_lap_data_packet(frame, cars),
+            build_car_status_packet(frame),
+            build_car_telemetry_packet(frame),
+            build_motion_packet(frame, cars),
+        )
+        for frame in range(roster_interval)
+    ]
+    send_times: List[float] = []
+    sent = 0
+    start = time.perf_counter()
+    frame = 0
+    while True:
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            break
+        if rate:
+            delay = frame / rate - elapsed
+            if delay > 0:
+                time.sleep(delay)
+        participants, session, lap_data, car_status, car_telemetry, motion = cycle[
+            frame % roster_interval
+        ]
+        packets = [lap_data, car_status, car_telemetry]
+        if frame % roster_interval == 0:
+            packets = [participants, session, *packets]
+        for packet in packets:
+            sock.sendto(packet, (host, port))
+        motion = bytearray(motion)
+        MARKER.pack_into(motion, MARKER_OFFSET, frame)
+        sock.sendto(motion, (host, port))
+        send_times.append(time.time())
+        sent += len(packets) + 1
+        frame += 1
+    elapsed = time.perf_counter() - start
+    sock.close()
+    results.put((sent, send_times, elapsed))
+
+
+# --- Server helpers ---
+
+
+def _request(method: str, url: str) -> dict:
+    request = urllib.request.Request(url, method=method)
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def _free_port(kind: int) -> int:
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server() -> Tuple[subprocess.Popen, str]:
+    """Run the app under uvicorn on a free port and wait until it answers."""
+    http_port = _free_port(socket.SOCK_STREAM)
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(http_port), "--log-level", "warning",
+        ],
+        env={**os.environ, "DEBUG": "false", "F1_TELEMETRY_LISTENER_HOST": "127.0.0.1"},
+    )
+    url = f"http://127.0.0.1:{http_port}"
+    deadline = time.time() + SERVER_STARTUP_TIMEOUT_SECONDS
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            _request("GET", f"{url}/api/telemetry/status")
+            return server, url
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start in time")
+
+
+def process_tree_cpu_seconds(pid: int) -> Optional[float]:
+    """User+system CPU of a process and its children (psutil, or /proc on Linux)."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            parent = psutil.Process(pid)
+            total = 0.0
+            for proc in [parent, *parent.children(recursive=True)]:
+                times = proc.cpu_times()
+                total += times.user + times.system
+            return total
+        except psutil.Error:
+            return None
+
+    if not os.path.isdir("/proc"):
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    stats: Dict[int, tuple] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        stats[int(entry)] = (int(fields[1]), int(fields[11]) + int(fields[12]))  # ppid, utime+stime
+    if pid not in stats:
+        return None
+    tree, total = {pid}, 0
+    for proc, (ppid, cpu) in sorted(stats.items()):
+        if proc in tree or ppid in tree:
+            tree.add(proc)
+            total += cpu
+    return total / ticks
+
+
+# --- Poller ---
+
+
+class LivePoller(threading.Thread):
+    """Polls /api/drivers/live and notes when each marked frame first shows up."""
+
+    def __init__(self, url: str, poll_hz: float):
+        super().__init__(daemon=True)
+        self.url = url
+        self.interval = 1.0 / poll_hz if poll_hz else 0.0
+        self.first_seen: Dict[int, float] = {}
+        self.polls = 0
+        self.stop_event = threading.Event()
+
+    def run(self):
+        last = -1
+        while not self.stop_event.is_set():
+            try:
+                drivers = _request("GET", self.url)
+            except (urllib.error.URLError, ConnectionError, ValueError):
+                drivers = {}
+            seen_at = time.time()
+            self.polls += 1
+            marker = (drivers.get(MARKER_DRIVER) or {}).get("world_y")
+            if marker is not None and int(marker) > last:
+                last = int(marker)
+                self.first_seen[last] = seen_at
+            if self.interval:
+                self.stop_event.wait(self.interval)
+
+
+# --- Benchmark ---
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _session_stats(url: str, session: str) -> dict:
+    return _request("GET", f"{url}/api/telemetry/stats?session={session}")
+
+
+def run_ingest_benchmark(
+    url: Optional[str] = None,
+    server_pid: Optional[int] = None,
+    udp_port: Optional[int] = None,
+    mode: str = "thread",
+    rate: float = 60,
+    cars: int = 22,
+    duration: float = 10.0,
+    poll_hz: float = 100,
+) -> dict:
+    """Run one benchmark and return its measurements."""
+    server = None
+    if url is None:
+        server, url = start_server()
+        server_pid = server.pid
+    udp_port = udp_port or _free_port(socket.SOCK_DGRAM)
+    session = str(udp_port)
+    started_listener = False
+    try:
+        try:
+            _request("POST", f"{url}/api/telemetry/start?port={udp_port}&mode={mode}")
+            started_listener = True
+        except urllib.error.HTTPError as e:
+            if e.code != 400:  # 400: a listener is already running on this port
+                raise
+        host = urllib.request.urlparse(url).hostname
+
+        poller = LivePoller(f"{url}/api/drivers/live?session={session}", poll_hz)
+        poller.start()
+        idle_cpu = process_tree_cpu_seconds(server_pid) if server_pid else None
+        time.sleep(IDLE_BASELINE_SECONDS)
+
+        before = _session_stats(url, session)
+        cpu_before = process_tree_cpu_seconds(server_pid) if server_pid else None
+        window_start = time.perf_counter()
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        sender = context.Process(
+            target=send_race, args=(host, udp_port, rate, cars, duration, results)
+        )
+        sender.start()
+        sent, send_times, send_elapsed = results.get()
+        sender.join()
+
+        # Let the listener drain its socket buffer before counting
+        after = _session_stats(url, session)
+        for _ in range(20):
+            time.sleep(0.1)
+            latest = _session_stats(url, session)
+            if latest == after:
+                break
+            after = latest
+        cpu_after = process_tree_cpu_seconds(server_pid) if server_pid else None
+        window = time.perf_counter() - window_start
+        poller.stop_event.set()
+        poller.join()
+    finally:
+        if started_listener:
+            try:
+                _request("POST", f"{url}/api/telemetry/stop?session={session}")
+            except urllib.error.URLError:
+                pass
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+
+    processed = after["packets_processed"] - before["packets_processed"]
+    delivered = processed + after["packets_filtered"] - before["packets_filtered"]
+    latencies_ms = [
+        (seen_at - send_times[frame]) * 1000
+        for frame, seen_at in poller.first_seen.items()
+        if frame < len(send_times)
+    ]
+    result = {
+        "mode": mode,
+        "cars": cars,
+        "rate_hz": rate,
+        "packets_sent": sent,
+        "packets_decoded": processed,
+        "send_rate_pps": sent / send_elapsed,
+        "decoded_pps": processed / send_elapsed,
+        "drop_rate": max(0.0, 1 - delivered / sent) if sent else 0.0,
+        "polls": poller.polls,
+        "latency_samples": len(latencies_ms),
+        "latency_p50_ms": statistics.median(latencies_ms) if latencies_ms else None,
+        "latency_p95_ms": _percentile(latencies_ms, 0.95) if latencies_ms else None,
+        "latency_max_ms": max(latencies_ms) if latencies_ms else None,
+        "cpu_us_per_packet": None,
+        "cpu_us_per_packet_net": None,
+    }
+    if None not in (idle_cpu, cpu_before, cpu_after) and processed:
+        # Raw figure includes serving the poller and the app's background tasks;
+        # net subtracts the CPU rate measured while only the poller was running
+        busy = cpu_after - cpu_before
+        idle_rate = (cpu_before - idle_cpu) / IDLE_BASELINE_SECONDS
+        result["cpu_us_per_packet"] = busy / processed * 1e6
+        result["cpu_us_per_packet_net"] = max(0.0, busy - idle_rate * window) / processed * 1e6
+    return result
+
+
+def _format(value, spec: str, unit: str = "") -> str:
+    return "n/a" if value is None else f"{value:{spec}}{unit}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", help="running server to target (default: start one)")
+    parser.add_argument("--server-pid", type=int, help="PID of --url's server, for CPU/packet")
+    parser.add_argument("--port", type=int, help="UDP port for the listener (default: a free one)")
+    parser.add_argument("--mode", default="thread", help="listener backend: thread, process or asyncio")
+    parser.add_argument("--rate", type=float, default=60, help="frames/sec, 0 for as fast as possible")
+    parser.add_argument("--cars", type=int, default=22)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of traffic")
+    parser.add_argument("--poll-hz", type=float, default=100, help="/api/drivers/live polls/sec")
+    args = parser.parse_args()
+
+    r = run_ingest_benchmark(
+        url=args.url.rstrip("/") if args.url else None,
+        server_pid=args.server_pid,
+        udp_port=args.port,
+        mode=args.mode,
+        rate=args.rate,
+        cars=args.cars,
+        duration=args.duration,
+        poll_hz=args.poll_hz,
+    )
+    rate = f"{r['rate_hz']:g} Hz" if r["rate_hz"] else "unthrottled"
+    print(f"listener mode          : {r['mode']} ({r['cars']} cars, {rate})")
+    print(f"packets sent           : {r['packets_sent']:>12,} ({r['send_rate_pps']:,.0f}/sec)")
+    print(f"decoded                : {r['decoded_pps']:>12,.0f} packets/sec")
+    print(f"drop rate              : {r['drop_rate']:>12.2%}")
+    print(
+        f"latency to drivers/live: p50 {_format(r['latency_p50_ms'], '.1f', ' ms')}, "
+        f"p95 {_format(r['latency_p95_ms'], '.1f', ' ms')}, max {_format(r['latency_max_ms'], '.1f', ' ms')} "
+        f"({r['latency_samples']} samples, {r['polls']} polls)"
+    )
+    print(
+        f"server CPU per packet  : {_format(r['cpu_us_per_packet_net'], '.1f', ' us')} net of idle "
+        f"({_format(r['cpu_us_per_packet'], '.1f', ' us')} raw)"
+    )
+
+
+# --- pytest-benchmark mode ---
+
+
+def test_decode_race_frame(benchmark):
+    from app.api import telemetry
+    from app.services.live_store import LiveTelemetryStore
+
+    store = LiveTelemetryStore()
+    packets = build_race_frame(frame=1)
+
+    def decode():
+        for packet in packets:
+            telemetry.process_datagram(packet, store)
+
+    benchmark(decode)
+
+
+def test_udp_ingest_end_to_end(benchmark):
+    result = benchmark.pedantic(
+        run_ingest_benchmark, kwargs={"duration": 3.0}, rounds=1, iterations=1
+    )
+    benchmark.extra_info.update(result)
+    assert result["drop_rate"] < 0.01
+
+
+if __name__ == "__main__":
+    main()
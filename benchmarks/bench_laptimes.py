@@ -0,0 +1,96 @@
+"""
+Lap time parse/compare/serialise cost for the standings.
+
+Compares LapTime, which parses the time string to integer milliseconds once
+when it is created, with the previous model that re-parsed the string in its
+time_seconds computed field on every comparison and every serialisation.
+
+    python -m benchmarks.bench_laptimes [--laps N] [--repeat N]
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from pydantic import BaseModel, TypeAdapter, computed_field
+
+from app.models.models import LapTime
+from app.utils.helpers import ms_to_laptime_str
+
+
+class LegacyLapTime(BaseModel):
+    """The previous LapTime: time_seconds parsed from the string on every access."""
+
+    time: str
+    is_fastest: bool = False
+
+    @computed_field
+    @property
+    def time_seconds(self) -> float:
+        time_str = self.time
+        if ":" in time_str:
+            parts = time_str.split(":")
+            return float(parts[0]) * 60.0 + float(parts[1])
+        parts = time_str.split(".")
+        if len(parts) == 3:
+            return float(parts[0]) * 60.0 + float(parts[1]) + float(f"0.{parts[2]}")
+        return float(time_str)
+
+
+def _best_ms(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _compare(laps: List) -> None:
+    # What update_overall_fastest_lap and the export sort do
+    min(laps, key=lambda lap: lap.time_seconds)
+    sorted(laps, key=lambda lap: lap.time_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--laps", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    times = [ms_to_laptime_str(rng.randint(75_000, 95_000)) for _ in range(args.laps)]
+    legacy_laps = [LegacyLapTime(time=t) for t in times]
+    laps = [LapTime(time=t) for t in times]
+    legacy_list = TypeAdapter(List[LegacyLapTime])
+    lap_list = TypeAdapter(List[LapTime])
+
+    rows = [
+        (
+            "parse (create + first read)",
+            lambda: [LegacyLapTime(time=t).time_seconds for t in times],
+            lambda: [LapTime(time=t).time_seconds for t in times],
+        ),
+        (
+            "compare (fastest + sort)",
+            lambda: _compare(legacy_laps),
+            lambda: (min(laps, key=lambda lap: lap.time_ms), sorted(laps, key=lambda lap: lap.time_ms)),
+        ),
+        (
+            "serialise (JSON)",
+            lambda: legacy_list.dump_json(legacy_laps),
+            lambda: lap_list.dump_json(laps),
+        ),
+    ]
+
+    print(f"{args.laps:,} laps, best of {args.repeat} (ms)")
+    print(f"{'':28} {'string':>10} {'int ms':>10} {'speed-up':>9}")
+    for name, legacy, current in rows:
+        before = _best_ms(legacy, args.repeat)
+        after = _best_ms(current, args.repeat)
+        print(f"{name:28} {before:>10.2f} {after:>10.2f} {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Replays a telemetry capture through the decode path.
+
+Reports packets/sec at maximum speed and, with --speed, how closely a paced
+replay kept to the recorded timing. Without a capture file a synthetic race
+is recorded first (60 Hz, 20 cars), so runs are repeatable.
+
+    python -m benchmarks.bench_replay [CAPTURE] [--speed N] [--frames N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from app.api import telemetry
+from app.services.live_store import LiveTelemetryStore
+from app.services.telemetry_capture import CaptureReader, CaptureWriter, replay_capture
+from benchmarks.synthetic import build_race_frame
+
+SYNTHETIC_PORT = 20777
+SYNTHETIC_RATE_HZ = 60
+
+
+def record_synthetic(path: str, frames: int):
+    writer = CaptureWriter(path)
+    try:
+        for frame in range(frames):
+            for packet in build_race_frame(frame, num_cars=20):
+                writer.write(packet, SYNTHETIC_PORT, timestamp=frame / SYNTHETIC_RATE_HZ)
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("capture", nargs="?", help="capture file (default: synthetic race)")
+    parser.add_argument("--frames", type=int, default=3600, help="synthetic frames to record")
+    parser.add_argument("--speed", type=float, default=0, help="also run a paced replay at N x")
+    args = parser.parse_args()
+
+    path = args.capture
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "synthetic.f1cap")
+        record_synthetic(path, args.frames)
+
+    with CaptureReader(path) as reader:
+        records = reader.read_all()
+    if not records:
+        print(f"{path} holds no datagrams.")
+        return
+    duration = records[-1][0] - records[0][0]
+    print(f"capture                : {len(records):,} datagrams, {duration:.1f} s recorded")
+
+    store = LiveTelemetryStore()
+    on_datagram = lambda data, port: telemetry.process_datagram(data, store)
+
+    start = time.perf_counter()
+    replay_capture(records, on_datagram, speed=None)
+    elapsed = time.perf_counter() - start
+    print(f"maximum speed          : {len(records) / elapsed:>12,.0f} packets/sec ({duration / elapsed:,.0f}x real time)")
+
+    if args.speed:
+        start = time.perf_counter()
+        replay_capture(records, on_datagram, speed=args.speed)
+        elapsed = time.perf_counter() - start
+        expected = duration / args.speed
+        print(f"paced at {args.speed:g}x            : {elapsed:.3f} s (expected {expected:.3f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Builders for synthetic F1 24 UDP packets using the full wire layouts."""
+
+import math
+import struct
+from typing import Optional
+
+MAX_CARS = 22
+
+HEADER = struct.Struct("<HBBBBBQfIIBB")
+CAR_MOTION = struct.Struct("<ffffffhhhhhhffffff")
+LAP_DATA = struct.Struct("<IIHBHBHBHBfffBBBBBBBBBBBBBBBHHBfB")
+PARTICIPANT = struct.Struct("<BBBBBBB48sBBHB")
+CAR_STATUS = struct.Struct("<BBBBBfffHHBBHBBBbfffBfffB")
+CAR_TELEMETRY = struct.Struct("<HfffBbHBBH4H4B4BH4f4B")
+SESSION_SIZE = 724  # F1 24 PacketSessionData body, excluding the header
+
+SESSION_UID = 0x1234_5678_9ABC_DEF0
+
+
+def build_header(packet_id: int, frame: int, session_time: float = 0.0) -> bytes:
+    return HEADER.pack(
+        2024, 24, 1, 0, 1, packet_id, SESSION_UID, session_time, frame, frame, 0, 255
+    )
+
+
+def build_motion_packet(frame: int, num_cars: int = MAX_CARS, marker: Optional[float] = None) -> bytes:
+    """``marker``, if given, replaces car 0's world Y so a reader can tell which packet it sees."""
+    cars = []
+    for i in range(MAX_CARS):
+        angle = (frame * 0.01 + i * (2 * math.pi / MAX_CARS)) % (2 * math.pi)
+        x, z = 500.0 * math.cos(angle), 300.0 * math.sin(angle)
+        y = marker if i == 0 and marker is not None else 1.5
+        if i >= num_cars:
+            x = z = 0.0
+        cars.append(
+            CAR_MOTION.pack(x, y, z, 0.0, 0.0, 0.0, 0, 0, 0, 0, 0, 0, 0.1, 0.2, 1.0, angle, 0.0, 0.0)
+        )
+    return build_header(0, frame) + b"".join(cars)
+
+
+def build_lap_data_packet(frame: int, num_cars: int = MAX_CARS) -> bytes:
+    cars = []
+    for i in range(MAX_CARS):
+        lap_distance = (frame * 1.3 + i * 40.0) % 5000.0
+        cars.append(
+            LAP_DATA.pack(
+                83456 + i * 100, int(lap_distance * 18), 25123, 0, 28456, 0, 0, 0, 0, 0,
+                lap_distance, lap_distance + 5000.0, 0.0,
+                i + 1, 2, 0, 0, 1 + int(lap_distance // 1700), 0, 0, 0, 0, 0, 0, i + 1,
+                2 if i < num_cars else 0, 2, 0, 0, 0, 0, 310.5, 1,
+            )
+        )
+    return build_header(2, frame, frame / 60) + b"".join(cars) + b"\xff\xff"
+
+
+def build_participants_packet(frame: int, num_cars: int = MAX_CARS) -> bytes:
+    cars = []
+    for i in range(MAX_CARS):
+        name = f"Driver {i + 1}".encode() if i < num_cars else b""
+        cars.append(PARTICIPANT.pack(1, i, 255, i % 10, 0, i + 1, 1, name, 1, 1, 0, 255))
+    return build_header(4, frame) + bytes([num_cars]) + b"".join(cars)
+
+
+def build_car_status_packet(frame: int) -> bytes:
+    cars = [
+        CAR_STATUS.pack(
+            1, 1, 1, 56, 0, 50.0, 110.0, 20.0, 13000, 4000, 8, 1, 0, 18, 18, 3, 0,
+            0.0, 0.0, 4e6, 1, 0.0, 0.0, 0.0, 0,
+        )
+        for _ in range(MAX_CARS)
+    ]
+    return build_header(7, frame) + b"".join(cars)
+
+
+def build_car_telemetry_packet(frame: int) -> bytes:
+    cars = []
+    for i in range(MAX_CARS):
+        # Each car brakes for a corner once every 300 frames
+        phase = (frame + i * 13) % 300
+        braking = phase >= 250
+        speed = 120 + 2 * (250 - phase) // 3 if not braking else 120 + (300 - phase) * 3
+        cars.append(
+            CAR_TELEMETRY.pack(
+                speed, 0.0 if braking else 1.0, math.sin(phase / 48), 0.9 if braking else 0.0,
+                0, min(1 + speed // 45, 8), 6000 + speed * 20, 0, 50, 0,
+                *(600,) * 4, *(95,) * 4, *(100,) * 4, 105, *(23.0,) * 4, *(0,) * 4,
+            )
+        )
+    return build_header(6, frame, frame / 60) + b"".join(cars) + bytes([255, 255, 0])
+
+
+def build_session_packet(frame: int, track_id: int = 11, session_type: int = 10) -> bytes:
+    body = bytearray(SESSION_SIZE)
+    struct.pack_into("<BbbBHBbB", body, 0, 0, 30, 22, 53, 5793, session_type, track_id, 0)
+    struct.pack_into("<HHBB", body, 9, 3600, 3600, 80, 0)
+    struct.pack_into("<I", body, 649, 42)
+    return build_header(1, frame) + bytes(body)
+
+
+def build_race_frame(frame: int, num_cars: int = MAX_CARS):
+    """One 'tick' of the essential packets a race produces."""
+    return [
+        build_motion_packet(frame, num_cars),
+        build_lap_data_packet(frame, num_cars),
+        build_car_status_packet(frame),
+        build_car_telemetry_packet(frame),
+        build_participants_packet(frame, num_cars),
+        build_session_packet(frame),
+    ]